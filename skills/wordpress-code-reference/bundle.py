@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Prebuilt offline corpus shipped with a skill.
+
+`sync.py --bundle` writes `corpus.zip` into the skill directory: the skill's
+corpus files together with their prebuilt search indexes and snapshot. Every
+member is stored uncompressed (the files are compressed in their own
+formats), and `tools/package_skill.py --with-corpus` embeds the bundle in the
+.skill archive uncompressed as well, so in either file each member is one
+contiguous run of bytes.
+
+The bundle is never extracted. It is opened with mmap, its members are
+located through the ZIP central directory, and `Bundle.member` hands out a
+zero-copy memoryview that the index and snapshot readers parse in place;
+only the pages that a lookup touches are read from disk.
+
+Offline searches and lookups fall back to a bundle for any subtype that is
+not in the local corpus (see `corpus.bundled`), so a freshly installed skill
+answers offline without running sync.py. Bundles are read-only: a subtype
+that has been synced locally is always read from the local corpus.
+
+This module is shared by the wordpress-handbook and wordpress-code-reference
+skills and must be kept identical in both skill directories.
+
+Environment:
+    WP_SKILLS_BUNDLE - Path of a corpus.zip, or of a .skill archive containing
+                       one, to use besides those in the skill directories
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import threading
+import zipfile
+
+
+BUNDLE_NAME = "corpus.zip"
+
+# Fixed timestamp of every member, so a bundle's bytes depend on its contents only.
+MEMBER_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+# Signature, versions, flags, method, time, date, CRC-32, sizes and the
+# lengths of the name and extra field (APPNOTE.TXT 4.3.7).
+_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+
+# Opened bundles by path, with the (mtime, size) they were opened at; the
+# bundle is None for a file that is not a usable bundle.
+_opened: dict[str, tuple[tuple, "Bundle" | None]] = {}
+_lock = threading.Lock()
+
+
+class _Window:
+    """A read-only, seekable file object over part of a buffer, for zipfile."""
+
+    def __init__(self, buffer, start: int, length: int):
+        self._buffer = buffer
+        self._start = start
+        self._length = length
+        self._position = 0
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        base = {os.SEEK_SET: 0, os.SEEK_CUR: self._position, os.SEEK_END: self._length}[whence]
+        self._position = min(max(base + offset, 0), self._length)
+        return self._position
+
+    def read(self, size: int = -1) -> bytes:
+        end = self._length if size is None or size < 0 else min(self._position + size, self._length)
+        data = bytes(self._buffer[self._start + self._position:self._start + end])
+        self._position = max(end, self._position)
+        return data
+
+
+def _stored_spans(buffer, start: int, length: int) -> tuple[dict[str, tuple], list[str]]:
+    """
+    Read the ZIP archive at `start` in `buffer`.
+
+    Return {name: (offset, size)} in `buffer` for its stored members, and the
+    names of its compressed members, which cannot be read in place.
+    """
+    spans = {}
+    compressed = []
+    with zipfile.ZipFile(_Window(buffer, start, length)) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            if info.compress_type != zipfile.ZIP_STORED:
+                compressed.append(info.filename)
+                continue
+            header = start + info.header_offset
+            fields = _LOCAL_HEADER.unpack_from(buffer, header)
+            if fields[0] != b"PK\x03\x04":
+                raise ValueError(f"bad local header for {info.filename}")
+            offset = header + _LOCAL_HEADER.size + fields[10] + fields[11]
+            spans[info.filename] = (offset, info.file_size)
+    return spans, compressed
+
+
+class Bundle:
+    """A memory-mapped corpus bundle, read in place."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.stamp = (st.st_mtime_ns, st.st_size)
+        self._view = memoryview(self.mm)
+        try:
+            spans, compressed = _stored_spans(self._view, 0, len(self.mm))
+            # A .skill archive carries the bundle as a stored member.
+            if BUNDLE_NAME in compressed:
+                raise ValueError(f"{BUNDLE_NAME} is compressed")
+            if BUNDLE_NAME in spans:
+                spans, compressed = _stored_spans(self._view, *spans[BUNDLE_NAME])
+            elif "SKILL.md" in spans or "SKILL.md" in compressed:
+                raise ValueError(f"the skill archive has no {BUNDLE_NAME}")
+            if compressed:
+                raise ValueError(f"{compressed[0]} is compressed; bundled files must be stored")
+        except (ValueError, zipfile.BadZipFile, struct.error) as e:
+            self._view.release()
+            self.mm.close()
+            raise ValueError(f"{path} is not a corpus bundle: {e}") from e
+        self.spans = spans
+        suffix = ".jsonl.gz"
+        self.subtypes: list[str] = sorted(name[:-len(suffix)] for name in spans if name.endswith(suffix))
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.spans
+
+    def member(self, name: str) -> memoryview | None:
+        """Return a member's bytes without copying them, or None if it is missing."""
+        span = self.spans.get(name)
+        if span is None:
+            return None
+        offset, size = span
+        return self._view[offset:offset + size]
+
+    def open(self, name: str) -> _Window:
+        """Return a read-only file object over a member."""
+        offset, size = self.spans[name]
+        return _Window(self._view, offset, size)
+
+
+def _configured_path() -> str | None:
+    configured = os.environ.get("WP_SKILLS_BUNDLE")
+    return os.path.abspath(os.path.expanduser(configured)) if configured else None
+
+
+def bundle_paths() -> list[str]:
+    """
+    Return the paths searched for bundles, in order of preference.
+
+    These are WP_SKILLS_BUNDLE, then corpus.zip in this skill's directory and
+    in the skill directories next to it, since a daemon or search_all process
+    serves both skills with one copy of the shared modules.
+    """
+    configured = _configured_path()
+    paths = [configured] if configured else []
+    here = os.path.dirname(os.path.abspath(__file__))
+    paths.append(os.path.join(here, BUNDLE_NAME))
+    parent = os.path.dirname(here)
+    try:
+        siblings = sorted(os.listdir(parent))
+    except OSError:
+        siblings = []
+    for name in siblings:
+        directory = os.path.join(parent, name)
+        if directory != here and os.path.isfile(os.path.join(directory, "SKILL.md")):
+            paths.append(os.path.join(directory, BUNDLE_NAME))
+    return paths
+
+
+def _open(path: str) -> Bundle | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _lock:
+        opened = _opened.get(path)
+        if opened is not None and opened[0] == stamp:
+            return opened[1]
+        try:
+            bundle = Bundle(path)
+        except (OSError, ValueError):
+            # A bundle named explicitly must work; a stray file is ignored.
+            if path == _configured_path():
+                raise
+            bundle = None
+        # Bundles are replaced, never rewritten in place, so an earlier
+        # mapping stays valid for readers still holding it.
+        _opened[path] = (stamp, bundle)
+        return bundle
+
+
+def find(name: str) -> Bundle | None:
+    """Return the first bundle holding a member, or None."""
+    for path in bundle_paths():
+        bundle = _open(path)
+        if bundle is not None and name in bundle:
+            return bundle
+    return None
+
+
+def write(directory: str, path: str) -> dict:
+    """
+    Write every file of a corpus directory into a bundle at `path`.
+
+    Members are stored uncompressed, in name order and with a fixed
+    timestamp, so the same corpus always produces the same bytes.
+    """
+    names = sorted(
+        name for name in os.listdir(directory) if os.path.isfile(os.path.join(directory, name))
+    )
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_STORED, allowZip64=True) as archive:
+            for name in names:
+                info = zipfile.ZipInfo(name, MEMBER_DATE_TIME)
+                info.compress_type = zipfile.ZIP_STORED
+                info.external_attr = 0o100644 << 16
+                info.file_size = os.path.getsize(os.path.join(directory, name))
+                with open(os.path.join(directory, name), "rb") as source, archive.open(info, "w") as target:
+                    while True:
+                        chunk = source.read(1024 * 1024)
+                        if not chunk:
+                            break
+                        target.write(chunk)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return {"path": path, "bytes": os.path.getsize(path), "members": names}
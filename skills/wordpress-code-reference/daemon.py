@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Resident server for the WordPress skills.
+
+Usage: python3 daemon.py [start | stop | status | run]
+
+Commands:
+    start  - Start the daemon in the background (default)
+    stop   - Ask a running daemon to exit
+    status - Print the running daemon's PID and loaded skills
+    run    - Serve in the foreground
+
+The daemon imports the search and get_content scripts of this skill, and of
+the other WordPress skill when it is installed next to this one, once. It
+then answers requests over a Unix socket, so the HTTP connection pool, the
+response cache and the offline indexes stay warm between calls instead of
+being rebuilt by every `python3 search.py ...` invocation.
+
+The protocol is JSON-RPC 2.0 with one request or response object per line.
+Methods are named `<skill>.<function>`, e.g. `handbook.search` or
+`code_reference.get_content`, and take the same keyword arguments as the
+corresponding Python function; `ping` and `shutdown` control the server.
+Batch methods (`<skill>.get_contents`) send each result as it completes, as
+an {"jsonrpc", "id", "item"} line, before the response that ends the call.
+
+Requests carry the client's settings (see `settings`). The daemon refuses a
+request whose settings differ from its own, e.g. WP_SKILLS_BACKEND or
+WP_SKILLS_CORPUS_DIR set for one call, and the script then does the work
+in-process instead.
+
+The scripts use the daemon when it is running and otherwise do the work
+in-process, so starting it is optional. It exits after WP_SKILLS_DAEMON_IDLE
+seconds without requests.
+
+This module is shared by the wordpress-handbook and wordpress-code-reference
+skills and must be kept identical in both skill directories.
+
+Environment:
+    WP_SKILLS_DAEMON        - Set to "0" to make the scripts never use the daemon
+    WP_SKILLS_DAEMON_SOCKET - Socket path (default: <cache dir>/daemon.sock)
+    WP_SKILLS_DAEMON_IDLE   - Idle seconds before the daemon exits (default: 1800)
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+
+from cache import default_cache_dir
+
+# Seconds to wait for the daemon to accept a connection before running in-process.
+CONNECT_TIMEOUT = 0.5
+CALL_TIMEOUT = 300
+START_TIMEOUT = 10
+IDLE_TIMEOUT = 30 * 60
+
+# Batch items sent per request, so a long input stream is read in chunks.
+BATCH_CHUNK_SIZE = 500
+
+# JSON-RPC error codes.
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+SETTINGS_MISMATCH = -32001
+
+# Environment variables that only concern reaching the daemon; every other
+# WP_SKILLS_* variable may change a result and is part of `settings`.
+_CONNECTION_SETTINGS = ("WP_SKILLS_DAEMON", "WP_SKILLS_DAEMON_SOCKET", "WP_SKILLS_DAEMON_IDLE")
+# Default cache and corpus directories are derived from these.
+_PATH_SETTINGS = ("HOME", "XDG_CACHE_HOME")
+
+# Skill prefix -> (directory name, search function, get_content function,
+# batch function, search page function).
+SKILLS = {
+    "handbook": (
+        "wordpress-handbook", "search_handbooks", "get_handbook_content", "get_handbook_contents",
+        "search_handbooks_page",
+    ),
+    "code_reference": (
+        "wordpress-code-reference", "search_code_reference", "get_code_ref_content", "get_code_ref_contents",
+        "search_code_reference_page",
+    ),
+}
+
+
+class Unavailable(Exception):
+    """No daemon answered; the caller should do the work in-process."""
+
+
+class RemoteError(RuntimeError):
+    """A request failed inside the daemon."""
+
+
+def socket_path() -> str:
+    """Return the socket path, honouring WP_SKILLS_DAEMON_SOCKET."""
+    return os.environ.get("WP_SKILLS_DAEMON_SOCKET") or os.path.join(
+        default_cache_dir(), "daemon.sock"
+    )
+
+
+def daemon_enabled() -> bool:
+    """Return False when the scripts have been told not to use the daemon."""
+    return os.environ.get("WP_SKILLS_DAEMON", "1").lower() not in ("0", "false", "no")
+
+
+def settings() -> dict[str, str]:
+    """Return the environment settings a request's result depends on."""
+    return {
+        key: value for key, value in os.environ.items()
+        if key.startswith("WP_SKILLS_") and key not in _CONNECTION_SETTINGS or key in _PATH_SETTINGS
+    }
+
+
+def _responses(method: str, params: dict | None, timeout: float) -> Iterator[dict]:
+    """Send one request to the daemon and yield its response lines, items first."""
+    path = socket_path()
+    if not daemon_enabled() or not os.path.exists(path):
+        raise Unavailable("daemon is not running")
+    # Only imported once there is a socket to connect to, so the scripts
+    # start faster when no daemon is running.
+    import socket
+    if not hasattr(socket, "AF_UNIX"):
+        raise Unavailable("Unix sockets are not supported")
+
+    request = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params or {}, "settings": settings()}
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CONNECT_TIMEOUT)
+        sock.connect(path)
+        sock.settimeout(timeout)
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+    except OSError as e:
+        sock.close()
+        raise Unavailable(str(e)) from e
+
+    with sock, sock.makefile("rb") as f:
+        while True:
+            try:
+                line = f.readline()
+            except OSError as e:
+                raise Unavailable(str(e)) from e
+            if not line:
+                raise Unavailable("daemon closed the connection")
+            response = json.loads(line)
+            yield response
+            if "item" not in response:
+                return
+
+
+def _result(response: dict):
+    error = response.get("error")
+    if error:
+        if error.get("code") in (METHOD_NOT_FOUND, SETTINGS_MISMATCH):
+            raise Unavailable(error.get("message", "method not found"))
+        raise RemoteError(error.get("message", "daemon error"))
+    return response.get("result")
+
+
+def call(method: str, params: dict | None = None, timeout: float = CALL_TIMEOUT):
+    """
+    Send one request to the daemon and return its result.
+
+    Raises Unavailable if no daemon is running (or it does not serve the
+    method, or was started with other settings), and RemoteError with the
+    daemon's message if the request failed.
+    """
+    for response in _responses(method, params, timeout):
+        if "item" not in response:
+            return _result(response)
+
+
+def stream(method: str, params: dict | None = None, timeout: float = CALL_TIMEOUT) -> Iterator:
+    """Send one request for a batch method and yield its results as the daemon sends them."""
+    for response in _responses(method, params, timeout):
+        if "item" in response:
+            yield response["item"]
+        else:
+            _result(response)
+
+
+def call_or_run(method: str, function: Callable, **params):
+    """Run a request through the daemon if one is running, else call `function(**params)`."""
+    try:
+        return call(method, params)
+    except Unavailable:
+        return function(**params)
+
+
+def stream_or_run(method: str, function: Callable, items: Iterable, **params) -> Iterator:
+    """
+    Batch variant of call_or_run: yield the results for `items`.
+
+    Items are sent to the daemon BATCH_CHUNK_SIZE at a time, so a long
+    stream is not read to its end first, and each result is yielded as the
+    daemon sends it. If the daemon is (or becomes) unavailable, the
+    remaining items are handed to `function` in-process.
+    """
+    if not daemon_enabled() or not os.path.exists(socket_path()):
+        # Hand a stream over unread, so its results are not held back by
+        # collecting a first chunk for a daemon that is not there.
+        yield from function(items, **params)
+        return
+    items = iter(items)
+    chunk = list(itertools.islice(items, BATCH_CHUNK_SIZE))
+    while chunk:
+        received = 0
+        try:
+            for result in stream(method, {"items": chunk, **params}):
+                received += 1
+                yield result
+        except Unavailable as e:
+            if received:
+                # Results arrive in completion order, so the items still
+                # missing are not known.
+                raise RemoteError(f"The daemon stopped during a batch: {e}") from e
+            yield from function(itertools.chain(chunk, items), **params)
+            return
+        chunk = list(itertools.islice(items, BATCH_CHUNK_SIZE))
+
+
+# Server
+
+
+def import_script(name: str, path: str):
+    """Import a skill script from its path under a module name unique to this process."""
+    import importlib.util
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def skill_directories() -> dict[str, str]:
+    """
+    Return the directories of the skills installed next to this file, by prefix.
+
+    The directories are added to sys.path, since modules only one skill has
+    (e.g. symbol_index) must be importable by its scripts; the shared ones
+    are identical, so whichever comes first is used.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    directories = {}
+    for prefix, (directory_name, *_) in SKILLS.items():
+        if os.path.basename(here) == directory_name:
+            directory = here
+        else:
+            directory = os.path.join(os.path.dirname(here), directory_name)
+        if not os.path.isfile(os.path.join(directory, "search.py")):
+            continue
+        if directory not in sys.path:
+            sys.path.append(directory)
+        directories[prefix] = directory
+    return directories
+
+
+def load_methods() -> dict[str, Callable]:
+    """Import the skills found next to this file and return the method table."""
+    methods = {}
+    for prefix, directory in skill_directories().items():
+        _, search_name, get_name, batch_name, page_name = SKILLS[prefix]
+        search = import_script(f"{prefix}_search", os.path.join(directory, "search.py"))
+        get_content = import_script(f"{prefix}_get_content", os.path.join(directory, "get_content.py"))
+
+        methods[f"{prefix}.search"] = getattr(search, search_name)
+        methods[f"{prefix}.search_page"] = getattr(search, page_name)
+        methods[f"{prefix}.get_content"] = getattr(get_content, get_name)
+        methods[f"{prefix}.get_contents"] = getattr(get_content, batch_name)
+    return methods
+
+
+def serve(path: str | None = None, idle_timeout: float | None = None) -> None:
+    """Serve requests on the Unix socket until shut down or idle."""
+    path = path or socket_path()
+    if idle_timeout is None:
+        idle_timeout = float(os.environ.get("WP_SKILLS_DAEMON_IDLE") or IDLE_TIMEOUT)
+
+    try:
+        call("ping")
+        raise RuntimeError(f"A daemon is already listening on {path}")
+    except Unavailable:
+        pass
+    if os.path.exists(path):
+        os.remove(path)  # Left behind by a daemon that did not exit cleanly.
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    import daemon_server
+    import prefetch
+
+    methods = load_methods()
+    prefetch.resident = True
+    # Only the current user may connect.
+    umask = os.umask(0o077)
+    try:
+        server = daemon_server.Server(path, methods)
+    finally:
+        os.umask(umask)
+
+    if idle_timeout > 0:
+        threading.Thread(target=server.watch_idle, args=(idle_timeout,), daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def start() -> dict:
+    """Start the daemon in the background and return its ping response."""
+    try:
+        return call("ping")
+    except Unavailable:
+        pass
+
+    import subprocess
+    subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "run"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            return call("ping")
+        except Unavailable:
+            time.sleep(0.05)
+    raise RuntimeError("The daemon did not start")
+
+
+def main():
+    args = sys.argv[1:]
+    command = args[0] if args else "start"
+
+    if command not in ("start", "stop", "status", "run"):
+        print("Usage: daemon.py [start | stop | status | run]", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        if command == "run":
+            serve()
+        elif command == "start":
+            print(json.dumps(start(), indent=2))
+        elif command == "stop":
+            call("shutdown")
+            print("Stopped.")
+        else:
+            print(json.dumps(call("ping"), indent=2))
+    except Unavailable:
+        print("The daemon is not running.", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+The daemon's Unix socket server (see daemon.py).
+
+Kept apart from daemon.py, which every script imports to reach a running
+daemon, so that socketserver is only loaded by the daemon process itself.
+
+This module is shared by the wordpress-handbook and wordpress-code-reference
+skills and must be kept identical in both skill directories.
+"""
+
+from __future__ import annotations
+
+import inspect
+import json
+import os
+import socketserver
+import threading
+import time
+from collections.abc import Callable, Iterator
+
+import daemon
+import prefetch
+
+
+def _error(request_id, code: int, message: str) -> dict:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, methods: dict[str, Callable]):
+        self.methods = dict(methods)
+        self.methods["ping"] = self.ping
+        self.methods["shutdown"] = self.stop
+        # Requests made with other settings are refused; see daemon.settings.
+        self.settings = daemon.settings()
+        self.started_at = time.time()
+        self.last_request = time.monotonic()
+        super().__init__(path, _Handler)
+
+    def ping(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "uptime": round(time.time() - self.started_at, 1),
+            "methods": sorted(self.methods),
+        }
+
+    def stop(self) -> bool:
+        # shutdown() waits for serve_forever to return, so it cannot run on
+        # the thread that is answering this request.
+        threading.Thread(target=self.shutdown, daemon=True).start()
+        return True
+
+    def dispatch(self, line: bytes) -> Iterator[dict]:
+        """Answer one request line, yielding a line per streamed item and then the response."""
+        self.last_request = time.monotonic()
+        try:
+            request = json.loads(line)
+        except ValueError:
+            yield _error(None, daemon.PARSE_ERROR, "Parse error")
+            return
+        if not isinstance(request, dict):
+            yield _error(None, daemon.INVALID_REQUEST, "Invalid request")
+            return
+
+        request_id = request.get("id")
+        name = request.get("method")
+        method = self.methods.get(name)
+        if method is None:
+            yield _error(request_id, daemon.METHOD_NOT_FOUND, f"Unknown method: {name}")
+            return
+        if name not in ("ping", "shutdown") and request.get("settings") != self.settings:
+            yield _error(request_id, daemon.SETTINGS_MISMATCH, "The daemon was started with other settings")
+            return
+        params = request.get("params") or {}
+        if not isinstance(params, dict):
+            yield _error(request_id, daemon.INVALID_PARAMS, "params must be an object")
+            return
+
+        try:
+            inspect.signature(method).bind(**params)
+        except TypeError as e:
+            yield _error(request_id, daemon.INVALID_PARAMS, str(e))
+            return
+
+        count = 0
+        try:
+            with prefetch.foreground():
+                result = method(**params)
+                if inspect.isgenerator(result):
+                    for item in result:
+                        count += 1
+                        yield {"jsonrpc": "2.0", "id": request_id, "item": item}
+                    result = count
+        except Exception as e:
+            yield _error(request_id, daemon.SERVER_ERROR, str(e))
+            return
+        yield {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    def watch_idle(self, idle_timeout: float) -> None:
+        while True:
+            time.sleep(min(idle_timeout, 30))
+            if time.monotonic() - self.last_request >= idle_timeout:
+                self.shutdown()
+                return
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        # A client may send several requests over one connection.
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            responses = self.server.dispatch(line)
+            try:
+                for response in responses:
+                    self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+                    self.wfile.flush()
+            except OSError:
+                return  # The client went away, e.g. it stopped reading a batch.
+            finally:
+                responses.close()
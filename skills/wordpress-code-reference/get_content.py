@@ -2,24 +2,53 @@
 """
 Get WordPress Code Reference content.
 
-Usage: python3 get_content.py <subtype> <id>
+Usage: python3 get_content.py <subtype> <id> [<subtype> <id> ...] [--workers N] [--offline]
+       python3 get_content.py - [--workers N] [--offline] < items.jsonl
+       python3 get_content.py <subtype> <id> --related N [--offline]
 
 Arguments:
     subtype - Reference type: wp-parser-function, wp-parser-hook, wp-parser-class, wp-parser-method
     id      - Document ID from search results
+    -       - Read {"subtype": ..., "id": ...} objects from stdin, one per line
+    --offline - Read from the local corpus downloaded by sync.py instead of the API
+    --related - Also list up to N related documents (at most 10), from the
+                link graph of the local corpus built by sync.py
+
+With more than one item, documents are fetched concurrently (default: 8
+workers) and written as JSON Lines in completion order. A failed item is
+reported inline as {"subtype": ..., "id": ..., "error": ...}.
+
+With --related, the result also lists the documents most closely linked to
+this one, Code Reference entries and handbook pages alike, under "related".
+They are precomputed by sync.py, so no further API request is made.
 
 Example:
     python3 get_content.py wp-parser-function 12345
+    python3 get_content.py wp-parser-function 12345 wp-parser-function 12346 --workers 4
+    python3 get_content.py wp-parser-function 12345 --related 5
 """
 
+from __future__ import annotations
+
 import json
-import re
 import sys
-import urllib.request
-import urllib.error
+import urllib.parse
+from collections.abc import Iterable, Iterator
+
+import corpus
+import daemon
+from cache import fetch_json, raise_api_error
+from html_convert import html_to_text
 
 API_BASE_URL = "https://developer.wordpress.org/wp-json/wp/v2"
 REQUEST_TIMEOUT = 10
+BATCH_WORKERS = 8
+
+# Maximum IDs per `include=` collection request (the REST API's per_page cap).
+BULK_PAGE_SIZE = 100
+
+# Seconds a partial group of a batch waits for more IDs before it is sent.
+BATCH_WINDOW = 0.05
 
 CODE_REF_SUBTYPES = [
     "wp-parser-function",
@@ -29,29 +58,7 @@ CODE_REF_SUBTYPES = [
 ]
 
 
-def html_to_text(html: str) -> str:
-    """Convert HTML to plain text."""
-    text = html
-
-    # Remove all HTML tags
-    text = re.sub(r"<[^>]+>", "", text)
-
-    # Decode HTML entities
-    text = text.replace("&nbsp;", " ")
-    text = text.replace("&amp;", "&")
-    text = text.replace("&lt;", "<")
-    text = text.replace("&gt;", ">")
-    text = text.replace("&quot;", '"')
-    text = text.replace("&#39;", "'")
-
-    # Clean up extra whitespace
-    text = re.sub(r"\n{3,}", "\n\n", text)
-
-    return text.strip()
-
-
-def get_code_ref_content(subtype: str, doc_id: int) -> dict:
-    """Get details of a code reference entry."""
+def _validate_item(subtype: str, doc_id: int) -> None:
     if subtype not in CODE_REF_SUBTYPES:
         raise ValueError(
             f"Invalid subtype: {subtype}. Valid: {', '.join(CODE_REF_SUBTYPES)}"
@@ -60,21 +67,30 @@ def get_code_ref_content(subtype: str, doc_id: int) -> dict:
     if not isinstance(doc_id, int) or doc_id < 1:
         raise ValueError("id must be a positive integer")
 
-    url = f"{API_BASE_URL}/{subtype}/{doc_id}?_fields=id,title,excerpt,link,wp-parser-since,wp-parser-source-file"
 
+def _request(url: str, timeout: float = REQUEST_TIMEOUT):
     try:
-        with urllib.request.urlopen(url, timeout=REQUEST_TIMEOUT) as response:
-            data = json.loads(response.read().decode())
-    except urllib.error.HTTPError as e:
-        if e.code == 404:
-            raise RuntimeError("Document not found") from e
-        raise RuntimeError(f"HTTP error {e.code}") from e
-    except urllib.error.URLError as e:
-        raise RuntimeError(f"Network error: {e.reason}") from e
-
-    if "code" in data:
+        data = fetch_json(url, "document", timeout=timeout)
+    except OSError as e:
+        raise_api_error(e, not_found="Document not found")
+        raise
+
+    if isinstance(data, dict) and "code" in data:
         raise RuntimeError(data.get("message", "API error"))
 
+    return data
+
+
+def _stored_documents(subtype: str, doc_ids: list[int]) -> dict[int, dict]:
+    """Read documents from the offline store chosen by WP_SKILLS_BACKEND."""
+    if corpus.default_backend() == "sqlite":
+        import sqlite_store as store
+    else:
+        import snapshot as store
+    return store.get_documents(subtype, doc_ids)
+
+
+def _to_document(data: dict) -> dict:
     excerpt_text = html_to_text(data["excerpt"]["rendered"])
 
     since_list = data.get("wp-parser-since", [])
@@ -90,27 +106,268 @@ def get_code_ref_content(subtype: str, doc_id: int) -> dict:
     }
 
 
+def get_code_ref_content(
+    subtype: str, doc_id: int, offline: bool = False, related: int = 0, timeout: float = REQUEST_TIMEOUT
+) -> dict:
+    """
+    Get details of a code reference entry.
+
+    With `related`, up to that many related documents from the link graph
+    of the local corpus (see link_graph.py) are added under "related".
+
+    `timeout` bounds the API request, in seconds.
+    """
+    _validate_item(subtype, doc_id)
+
+    if offline:
+        data = _stored_documents(subtype, [doc_id]).get(doc_id)
+        if data is None:
+            raise RuntimeError("Document not found")
+    else:
+        url = f"{API_BASE_URL}/{subtype}/{doc_id}?_fields=id,title,excerpt,link,wp-parser-since,wp-parser-source-file"
+        data = _request(url, timeout)
+
+    result = _to_document(data)
+    if related:
+        import link_graph
+        result["related"] = link_graph.related(subtype, doc_id, related)
+    return result
+
+
+def get_code_ref_contents_by_ids(
+    subtype: str, doc_ids: list[int], offline: bool = False
+) -> dict[int, dict]:
+    """
+    Get several documents of one subtype with as few requests as possible.
+
+    IDs are fetched through the collection endpoint with `include=`, up to
+    BULK_PAGE_SIZE per request, and the response is split back into the
+    same dicts get_code_ref_content returns, keyed by ID. IDs that do not
+    exist are absent from the result. With `offline`, the documents are read
+    from the local corpus instead.
+    """
+    for doc_id in doc_ids:
+        _validate_item(subtype, doc_id)
+
+    if offline:
+        stored = _stored_documents(subtype, doc_ids)
+        return {doc_id: _to_document(data) for doc_id, data in stored.items()}
+
+    unique_ids = list(dict.fromkeys(doc_ids))
+    documents = {}
+    for start in range(0, len(unique_ids), BULK_PAGE_SIZE):
+        chunk = unique_ids[start:start + BULK_PAGE_SIZE]
+        params = {
+            "include": ",".join(str(doc_id) for doc_id in chunk),
+            "per_page": str(len(chunk)),
+            "_fields": "id,title,excerpt,link,wp-parser-since,wp-parser-source-file",
+        }
+        data = _request(f"{API_BASE_URL}/{subtype}?{urllib.parse.urlencode(params)}")
+        if not isinstance(data, list):
+            raise RuntimeError("Unexpected API response")
+        for item in data:
+            documents[item["id"]] = _to_document(item)
+
+    return documents
+
+
+def _fetch_item(subtype: str, doc_id: int, offline: bool = False) -> dict:
+    try:
+        content = get_code_ref_content(subtype, doc_id, offline)
+    except Exception as e:
+        return {"subtype": subtype, "id": doc_id, "error": str(e)}
+    return {"subtype": subtype, **content}
+
+
+def _fetch_group(subtype: str, doc_ids: list[int], offline: bool = False) -> list[dict]:
+    if len(doc_ids) == 1:
+        return [_fetch_item(subtype, doc_ids[0], offline)]
+    try:
+        documents = get_code_ref_contents_by_ids(subtype, doc_ids, offline)
+    except Exception as e:
+        return [{"subtype": subtype, "id": doc_id, "error": str(e)} for doc_id in doc_ids]
+    return [
+        {"subtype": subtype, **documents[doc_id]}
+        if doc_id in documents
+        else {"subtype": subtype, "id": doc_id, "error": "Document not found"}
+        for doc_id in doc_ids
+    ]
+
+
+def get_code_ref_contents(
+    items: Iterable[tuple[str, int]], workers: int = BATCH_WORKERS, offline: bool = False
+) -> Iterator[dict]:
+    """
+    Fetch many documents concurrently, yielding each result as it completes.
+
+    Items are grouped by subtype and each group of up to BULK_PAGE_SIZE IDs
+    is fetched with a single collection request. A smaller group is sent
+    once its first ID has waited BATCH_WINDOW seconds, so a slow stream is
+    answered as it arrives rather than at its end. Successful results are
+    the dicts returned by get_code_ref_content with the subtype added;
+    failures are yielded as {"subtype", "id", "error"} instead of aborting
+    the batch. At most `workers` requests run at once and `items` is
+    consumed lazily (by a reader thread), so it may be an unbounded stream.
+    """
+    import queue
+    import threading
+    import time
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    workers = max(1, workers)
+    groups: dict[str, list[int]] = {}
+    opened: dict[str, float] = {}  # When each group got its first ID.
+    incoming = queue.Queue(maxsize=workers * BULK_PAGE_SIZE)
+    end = object()
+
+    def read():
+        try:
+            for item in items:
+                incoming.put(item)
+        except Exception as e:
+            incoming.put(e)
+        incoming.put(end)
+
+    threading.Thread(target=read, daemon=True).start()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        finished = False
+        while not finished or groups or pending:
+            idle = finished
+            if not finished:
+                try:
+                    item = incoming.get(timeout=BATCH_WINDOW if groups or pending else None)
+                except queue.Empty:
+                    item = None
+                    idle = True
+                if item is end:
+                    item = None
+                    finished = idle = True
+                elif isinstance(item, Exception):
+                    raise item
+                if item is not None:
+                    subtype, doc_id = item
+                    try:
+                        _validate_item(subtype, doc_id)
+                    except ValueError as e:
+                        yield {"subtype": subtype, "id": doc_id, "error": str(e)}
+                    else:
+                        groups.setdefault(subtype, []).append(doc_id)
+                        opened.setdefault(subtype, time.monotonic())
+
+            now = time.monotonic()
+            for subtype in list(groups):
+                if idle or len(groups[subtype]) >= BULK_PAGE_SIZE or now - opened[subtype] >= BATCH_WINDOW:
+                    del opened[subtype]
+                    pending.add(executor.submit(_fetch_group, subtype, groups.pop(subtype), offline))
+
+            if not pending:
+                continue
+            # Yield whatever has completed; block only when the pool is
+            # saturated or nothing else is left to do.
+            saturated = len(pending) >= workers * 2
+            timeout = None if saturated or (finished and not groups) else 0
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+
+
+def _read_items(lines: Iterable[str]) -> Iterator[tuple[str, int]]:
+    """
+    Parse JSON Lines of {"subtype": ..., "id": ...} objects.
+
+    Malformed lines are passed through as (None, line) so that they are
+    reported as per-item errors rather than stopping the batch.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+            yield item["subtype"], int(item["id"])
+        except (ValueError, TypeError, KeyError):
+            yield None, line
+
+
+def _pop_option(args: list, name: str):
+    """Remove `name <value>` from args and return the value (or None)."""
+    if name not in args:
+        return None
+    index = args.index(name)
+    if index + 1 >= len(args):
+        raise ValueError(f"{name} requires a value")
+    value = args[index + 1]
+    del args[index:index + 2]
+    return value
+
+
 def main():
     args = sys.argv[1:]
 
-    if len(args) < 2:
-        print("Usage: get_content.py <subtype> <id>", file=sys.stderr)
-        print("Example: get_content.py wp-parser-function 12345", file=sys.stderr)
-        sys.exit(1)
-
-    subtype = args[0]
+    offline = corpus.offline_default()
+    if "--offline" in args:
+        args.remove("--offline")
+        offline = True
 
     try:
-        doc_id = int(args[1])
+        workers = int(_pop_option(args, "--workers") or BATCH_WORKERS)
     except ValueError:
-        print("Error: id must be a number", file=sys.stderr)
+        print("Error: --workers must be a number", file=sys.stderr)
         sys.exit(1)
 
     try:
-        content = get_code_ref_content(subtype, doc_id)
-        print(json.dumps(content, indent=2))
-    except Exception as e:
-        print(f"Error: {e}", file=sys.stderr)
+        related = int(_pop_option(args, "--related") or 0)
+    except ValueError:
+        print("Error: --related must be a number", file=sys.stderr)
+        sys.exit(1)
+
+    if related and len(args) != 2:
+        print("Error: --related takes a single <subtype> <id>", file=sys.stderr)
+        sys.exit(1)
+
+    if args == ["-"]:
+        items = _read_items(sys.stdin)
+    elif len(args) < 2 or len(args) % 2:
+        print("Usage: get_content.py <subtype> <id> [<subtype> <id> ...] [--workers N] [--offline]", file=sys.stderr)
+        print("       get_content.py - [--workers N] [--offline] < items.jsonl", file=sys.stderr)
+        print("       get_content.py <subtype> <id> --related N [--offline]", file=sys.stderr)
+        print("Example: get_content.py wp-parser-function 12345", file=sys.stderr)
+        sys.exit(1)
+    elif len(args) == 2:
+        subtype = args[0]
+
+        try:
+            doc_id = int(args[1])
+        except ValueError:
+            print("Error: id must be a number", file=sys.stderr)
+            sys.exit(1)
+
+        try:
+            content = daemon.call_or_run(
+                "code_reference.get_content", get_code_ref_content,
+                subtype=subtype, doc_id=doc_id, offline=offline, related=related,
+            )
+            print(json.dumps(content, indent=2))
+        except Exception as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        return
+    else:
+        try:
+            items = [(args[i], int(args[i + 1])) for i in range(0, len(args), 2)]
+        except ValueError:
+            print("Error: id must be a number", file=sys.stderr)
+            sys.exit(1)
+
+    failed = False
+    results = daemon.stream_or_run(
+        "code_reference.get_contents", get_code_ref_contents, items, workers=workers, offline=offline
+    )
+    for result in results:
+        failed = failed or "error" in result
+        print(json.dumps(result), flush=True)
+    if failed:
         sys.exit(1)
 
 
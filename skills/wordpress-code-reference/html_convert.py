@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+"""
+Single-pass HTML to Markdown / plain text conversion.
+
+The document is split into alternating text and tags once, and Markdown is
+emitted into a buffer as tags are seen, keeping stacks for nested lists,
+links, blockquotes and `<pre>` blocks. Text is decoded with the same rules
+as `html.unescape`, so every named and numeric entity is handled. Parsed
+tags are cached per process, since the same tags recur in every document.
+
+`markdown_sections` also splits the Markdown at its headings into sections
+with stable anchors (the heading's `id` attribute, or a slug of its text)
+and character offsets into the Markdown, for passage retrieval, and
+`html_links` returns the targets of the links the conversion renders, for
+the link graph.
+
+This module is shared by the wordpress-handbook and wordpress-code-reference
+skills and must be kept identical in both skill directories.
+"""
+
+from __future__ import annotations
+
+import functools
+import html
+import re
+import time
+
+import tracing
+
+# Splitting on tags leaves text and tags alternating, with no per-token
+# match objects; a "<" not followed by a letter, "/" or "!" stays text.
+_SPLIT_RE = re.compile(r"(<[a-zA-Z/!][^>]*>)")
+_TAG_RE = re.compile(r"<(/?)([a-zA-Z][a-zA-Z0-9]*)(.*)>", re.DOTALL)
+_COMMENT_RE = re.compile(r"<!--.*?(?:-->|$)", re.DOTALL)
+# Characters str.split() treats as whitespace in ordinary HTML text.
+_SPACE = " \t\n\r\f\v\xa0"
+_ATTR_RE = re.compile(
+    r"([a-zA-Z_:][-a-zA-Z0-9_:.]*)\s*=\s*(?:\"([^\"]*)\"|'([^']*)'|([^\s>]+))"
+)
+# Entities common in WordPress content, decoded with str.replace before
+# falling back to html.unescape for anything else. "&amp;" is left to last
+# so a decoded "&" is never read as the start of another entity, and a
+# non-breaking space becomes an ordinary one.
+_COMMON_ENTITIES = [
+    ("&lt;", "<"), ("&gt;", ">"), ("&quot;", '"'), ("&#039;", "'"), ("&#39;", "'"),
+    ("&nbsp;", " "), ("&#8211;", "\u2013"), ("&#8212;", "\u2014"), ("&#8216;", "\u2018"),
+    ("&#8217;", "\u2019"), ("&#8220;", "\u201c"), ("&#8221;", "\u201d"), ("&#8230;", "\u2026"),
+]
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+_LANGUAGE_RE = re.compile(r"(?:^|\s)(?:language|lang)-([\w+#-]+)")
+# Marks the start of each heading in the buffer while splitting sections; a
+# private-use character, so it is neither whitespace nor expected in text.
+_SECTION_MARK = "\ue000"
+# Marks both ends of each <pre> block in the buffer, so its content is kept
+# verbatim when the rest of the output is normalized.
+_VERBATIM_MARK = "\ue001"
+# Link and emphasis markup the converter puts into headings.
+_LINK_RE = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+_EMPHASIS_RE = re.compile(r"(\*\*?)(\S(?:.*?\S)?)\1")
+_SLUG_RE = re.compile(r"[^\w]+")
+
+# Elements whose content is dropped entirely.
+_SKIP_TAGS = {"script", "style", "template", "noscript"}
+# Elements still interpreted inside <pre>; everything else there is verbatim text.
+_PRE_TAGS = {"pre", "code", "br"}
+_HEADINGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+_BLOCK_TAGS = {
+    "div", "section", "article", "aside", "header", "footer", "nav", "main",
+    "figure", "figcaption", "dl", "dt", "dd", "table", "thead", "tbody", "tfoot",
+    "details", "summary", "address",
+}
+_EMPHASIS = {"strong": "**", "b": "**", "em": "*", "i": "*"}
+
+
+def _unescape(text: str) -> str:
+    """html.unescape with a fast path for the entities WordPress usually emits."""
+    for entity, char in _COMMON_ENTITIES:
+        if entity in text:
+            text = text.replace(entity, char)
+    if text.count("&") == text.count("&amp;"):
+        return text.replace("&amp;", "&")
+    return html.unescape(text)
+
+
+@functools.lru_cache(maxsize=1024)
+def _attrs(raw: str) -> dict:
+    return {
+        name.lower(): html.unescape(double or single or bare)
+        for name, double, single, bare in _ATTR_RE.findall(raw)
+    }
+
+
+class _Converter:
+    """Streaming emitter; `markdown=False` produces plain text with the same layout."""
+
+    __slots__ = ("markdown", "out", "newlines", "space", "lists", "links", "quotes", "pre", "pre_fence", "cells",
+                 "item_start", "anchors", "hrefs")
+
+    def __init__(self, markdown: bool):
+        self.markdown = markdown
+        self.out: list[str] = []
+        self.newlines = 2  # Trailing newlines in the output; 2 at the start.
+        self.space = True  # Output ends in whitespace.
+        self.lists: list[list] = []  # [tag, next number] per open list.
+        self.links: list[tuple] = []  # (href, buffer position) per open link.
+        self.quotes: list[int] = []  # Buffer position per open blockquote.
+        self.pre = 0
+        self.pre_fence: int | None = None
+        self.cells = 0
+        self.item_start = -1  # Buffer length right after the last list marker.
+        self.anchors: list[str | None] | None = None  # Heading ids, when splitting sections.
+        self.hrefs: list[str] | None = None  # Link targets, when collecting links.
+
+    # Output primitives
+
+    def emit(self, text: str) -> None:
+        if not text:
+            return
+        self.out.append(text)
+        if text[-1] == "\n":
+            stripped = text.rstrip("\n")
+            if stripped:
+                self.newlines = len(text) - len(stripped)
+            else:
+                self.newlines += len(text)
+            self.space = True
+        else:
+            self.newlines = 0
+            self.space = text[-1].isspace()
+
+    def truncate(self, position: int) -> None:
+        """Drop output from a buffer position on and recompute the trailing state."""
+        del self.out[position:]
+        tail = "".join(self.out[-2:])
+        stripped = tail.rstrip("\n")
+        self.newlines = len(tail) - len(stripped) if self.out else 2
+        self.space = not tail or tail[-1].isspace()
+
+    def close_inline(self, marker: str) -> None:
+        """Emit a closing marker, moving trailing spaces outside of it."""
+        if self.newlines == 0 and self.out and self.out[-1].endswith(" "):
+            self.out[-1] = self.out[-1].rstrip(" ")
+            self.emit(marker + " ")
+        else:
+            self.emit(marker)
+
+    def block(self, count: int) -> None:
+        """Ensure the output ends with at least `count` newlines."""
+        if self.newlines < count:
+            self.out.append("\n" * (count - self.newlines))
+            self.newlines = count
+            self.space = True
+
+    def indent(self) -> str:
+        return "  " * len(self.lists)
+
+    # Start tags
+
+    def start_heading(self, tag: str, raw_attrs: str) -> None:
+        self.block(2)
+        if self.anchors is not None:
+            self.out.append(_SECTION_MARK)
+            self.anchors.append(_attrs(raw_attrs).get("id"))
+        if self.markdown:
+            self.emit("#" * _HEADINGS[tag] + " ")
+
+    def start_p(self, tag: str, raw_attrs: str) -> None:
+        if self.item_start == len(self.out):
+            return  # <li><p>: the paragraph starts on the marker's line.
+        if self.lists:
+            self.block(1)
+            self.emit(self.indent())
+        else:
+            self.block(2)
+
+    def start_br(self, tag: str, raw_attrs: str) -> None:
+        self.emit("\n" if self.pre else "\n" + self.indent())
+
+    def start_hr(self, tag: str, raw_attrs: str) -> None:
+        self.block(2)
+        if self.markdown:
+            self.emit("---")
+        self.block(2)
+
+    def start_pre(self, tag: str, raw_attrs: str) -> None:
+        if not self.pre:
+            self.block(2)
+            if self.markdown:
+                self.pre_fence = len(self.out)
+                self.emit("```\n")
+            self.out.append(_VERBATIM_MARK)
+        self.pre += 1
+
+    def start_code(self, tag: str, raw_attrs: str) -> None:
+        if not self.pre:
+            if self.markdown:
+                self.emit("`")
+            return
+        # <pre><code class="language-php">: put the language on the fence.
+        if self.pre_fence is not None and self.out[self.pre_fence + 1:] == [_VERBATIM_MARK]:
+            attrs = _attrs(raw_attrs)
+            language = _LANGUAGE_RE.search(f"{attrs.get('class', '')} lang-{attrs.get('lang', '')}")
+            if language:
+                self.out[self.pre_fence] = f"```{language.group(1)}\n"
+
+    def start_list(self, tag: str, raw_attrs: str) -> None:
+        self.block(1 if self.lists else 2)
+        self.lists.append([tag, 1])
+
+    def start_li(self, tag: str, raw_attrs: str) -> None:
+        self.block(1)
+        if not self.lists:
+            return
+        kind = self.lists[-1]
+        prefix = "  " * (len(self.lists) - 1)
+        if not self.markdown:
+            marker = ""
+        elif kind[0] == "ol":
+            marker = f"{kind[1]}. "
+            kind[1] += 1
+        else:
+            marker = "- "
+        self.emit(prefix + marker)
+        self.space = True
+        self.item_start = len(self.out)
+
+    def start_a(self, tag: str, raw_attrs: str) -> None:
+        href = _attrs(raw_attrs).get("href") if self.markdown or self.hrefs is not None else None
+        if href and self.hrefs is not None:
+            self.hrefs.append(href)
+        if not self.markdown:
+            href = None
+        self.links.append((href, len(self.out)))
+        if href:
+            self.emit("[")
+            self.space = True
+
+    def start_emphasis(self, tag: str, raw_attrs: str) -> None:
+        if self.markdown:
+            self.emit(_EMPHASIS[tag])
+            self.space = True
+
+    def start_img(self, tag: str, raw_attrs: str) -> None:
+        attrs = _attrs(raw_attrs)
+        if self.markdown and attrs.get("src"):
+            self.emit(f"![{attrs.get('alt', '')}]({attrs['src']})")
+
+    def start_blockquote(self, tag: str, raw_attrs: str) -> None:
+        self.block(2)
+        self.quotes.append(len(self.out))
+
+    def start_tr(self, tag: str, raw_attrs: str) -> None:
+        self.block(1)
+        self.cells = 0
+
+    def start_cell(self, tag: str, raw_attrs: str) -> None:
+        if self.cells:
+            self.emit(" | ")
+        self.cells += 1
+
+    def start_line(self, tag: str, raw_attrs: str) -> None:
+        self.block(1)
+
+    # End tags
+
+    def end_block(self, tag: str, raw_attrs: str) -> None:
+        self.block(1 if self.lists else 2)
+
+    def end_line(self, tag: str, raw_attrs: str) -> None:
+        self.block(1)
+
+    def end_pre(self, tag: str, raw_attrs: str) -> None:
+        if self.pre:
+            self.pre -= 1
+        if self.pre:
+            return
+        self.out.append(_VERBATIM_MARK)
+        if self.pre_fence is not None:
+            self.block(1)
+            self.emit("```")
+        self.pre_fence = None
+        self.block(2)
+
+    def end_code(self, tag: str, raw_attrs: str) -> None:
+        if self.markdown and not self.pre:
+            self.close_inline("`")
+
+    def end_list(self, tag: str, raw_attrs: str) -> None:
+        if self.lists and self.lists[-1][0] == tag:
+            self.lists.pop()
+        self.block(1 if self.lists else 2)
+
+    def end_a(self, tag: str, raw_attrs: str) -> None:
+        if not self.links:
+            return
+        href, position = self.links.pop()
+        if not href:
+            return
+        if "".join(self.out[position + 1:]).strip():
+            self.close_inline(f"]({href})")
+        else:
+            # Empty link (e.g. a heading anchor): drop the "[".
+            self.truncate(position)
+
+    def end_emphasis(self, tag: str, raw_attrs: str) -> None:
+        if self.markdown:
+            self.close_inline(_EMPHASIS[tag])
+
+    def end_blockquote(self, tag: str, raw_attrs: str) -> None:
+        if not self.quotes:
+            return
+        position = self.quotes.pop()
+        quoted = "".join(self.out[position:]).strip("\n")
+        self.truncate(position)
+        if self.markdown:
+            quoted = "\n".join("> " + line if line else ">" for line in quoted.split("\n"))
+        self.emit(quoted)
+        self.block(2)
+
+    def result(self) -> str:
+        # Between the marks (odd pieces) is <pre> content, which is kept as is.
+        pieces = "".join(self.out).split(_VERBATIM_MARK)
+        pieces[::2] = [_normalize(piece) for piece in pieces[::2]]
+        pieces[0] = pieces[0].lstrip()
+        if len(pieces) % 2:
+            pieces[-1] = pieces[-1].rstrip()
+        return "".join(pieces)
+
+
+# Tag name -> unbound start/end handler of _Converter.
+_STARTS = {
+    "p": _Converter.start_p, "br": _Converter.start_br, "hr": _Converter.start_hr,
+    "pre": _Converter.start_pre, "code": _Converter.start_code, "ul": _Converter.start_list,
+    "ol": _Converter.start_list, "li": _Converter.start_li, "a": _Converter.start_a,
+    "img": _Converter.start_img, "blockquote": _Converter.start_blockquote,
+    "tr": _Converter.start_tr, "td": _Converter.start_cell, "th": _Converter.start_cell,
+}
+_ENDS = {
+    "p": _Converter.end_block, "pre": _Converter.end_pre, "code": _Converter.end_code,
+    "ul": _Converter.end_list, "ol": _Converter.end_list, "a": _Converter.end_a,
+    "blockquote": _Converter.end_blockquote, "tr": _Converter.end_line,
+}
+for _tag in _HEADINGS:
+    _STARTS[_tag] = _Converter.start_heading
+    _ENDS[_tag] = _Converter.end_block
+for _tag in _EMPHASIS:
+    _STARTS[_tag] = _Converter.start_emphasis
+    _ENDS[_tag] = _Converter.end_emphasis
+for _tag in _BLOCK_TAGS:
+    _STARTS.setdefault(_tag, _Converter.start_line)
+    _ENDS.setdefault(_tag, _Converter.end_line)
+
+# Raw tag -> (name, handler, closing, attributes). The same tags recur in
+# every document, so they are parsed once per process.
+_TAG_CACHE: dict = {None: None}
+_TAG_CACHE_SIZE = 4096
+
+
+def _normalize(text: str) -> str:
+    """
+    Strip trailing spaces from the lines of `text` and collapse blank lines.
+
+    The last line is left as it is, since it may run on into a `<pre>` block.
+    """
+    # Splitting into lines is much cheaper than a regular expression
+    # that has to try a match at every space of the document.
+    lines = text.split("\n")
+    lines[:-1] = [line.rstrip() for line in lines[:-1]]
+    return _BLANK_LINES_RE.sub("\n\n", "\n".join(lines))
+
+
+def _parse_tag(raw: str) -> tuple | None:
+    match = _TAG_RE.match(raw)
+    if match is None:
+        return None  # A declaration such as <!DOCTYPE>.
+    tag = match.group(2).lower()
+    closing = bool(match.group(1))
+    return tag, (_ENDS if closing else _STARTS).get(tag), closing, match.group(3)
+
+
+def convert(source: str, markdown: bool = True) -> str:
+    """Convert an HTML fragment to Markdown (or plain text) in one pass."""
+    return _run(source, _Converter(markdown)).result()
+
+
+def _run(source: str, converter: _Converter) -> _Converter:
+    global _TAG_CACHE
+    append = converter.out.append
+    tags = _TAG_CACHE
+    skip_until = None
+
+    if "<!--" in source:
+        source = _COMMENT_RE.sub("", source)
+    if _VERBATIM_MARK in source:
+        source = source.replace(_VERBATIM_MARK, "")
+    parts = _SPLIT_RE.split(source)
+    raw_tags = parts[1::2]
+    raw_tags.append(None)
+
+    for text, raw in zip(parts[::2], raw_tags):
+        # Text is the bulk of the work, so it is handled inline.
+        if text and skip_until is None:
+            if "&" in text:
+                text = _unescape(text)
+            if converter.pre:
+                converter.emit(text)
+            else:
+                words = text.split()
+                if words:
+                    chunk = " ".join(words)
+                    if text[0] in _SPACE and not converter.space:
+                        chunk = " " + chunk
+                    converter.space = text[-1] in _SPACE
+                    if converter.space:
+                        chunk += " "
+                    append(chunk)
+                    converter.newlines = 0
+                elif not converter.space:
+                    append(" ")
+                    converter.newlines = 0
+                    converter.space = True
+
+        try:
+            entry = tags[raw]
+        except KeyError:
+            if len(tags) > _TAG_CACHE_SIZE:
+                # A new dict rather than clear(): other threads converting
+                # at the same time keep using the old one, which always
+                # has the None entry for the end of the document.
+                _TAG_CACHE = tags = {None: None}
+            entry = tags[raw] = _parse_tag(raw)
+        if entry is None:
+            continue
+        tag, handler, closing, raw_attrs = entry
+
+        if skip_until is not None:
+            if closing and tag == skip_until:
+                skip_until = None
+        elif converter.pre and tag not in _PRE_TAGS:
+            continue
+        elif handler is not None:
+            handler(converter, tag, raw_attrs)
+        elif not closing and tag in _SKIP_TAGS:
+            skip_until = tag
+
+    return converter
+
+
+def _heading_text(line: str) -> str:
+    """Return the text of a Markdown heading line, without its link and emphasis markup."""
+    return _EMPHASIS_RE.sub(r"\2", _LINK_RE.sub(r"\1", line.lstrip("#"))).strip()
+
+
+def _slug(heading: str) -> str:
+    return _SLUG_RE.sub("-", heading.lower()).strip("-_")
+
+
+def markdown_sections(source: str) -> tuple[str, list[dict]]:
+    """
+    Convert HTML to Markdown and split it into heading-delimited sections.
+
+    Returns the Markdown (the same as html_to_markdown) and its sections in
+    order, as {"anchor", "heading", "level", "start", "end"} dicts, where
+    `markdown[start:end]` is the section including its heading line. Text
+    before the first heading is a section of level 0 with an empty anchor
+    and heading. Headings are plain text, without link or emphasis markup,
+    and anchors are unique within the document.
+    """
+    converter = _Converter(True)
+    converter.anchors = []
+    text = _run(source.replace(_SECTION_MARK, ""), converter).result()
+    pieces = text.split(_SECTION_MARK)
+    markdown = "".join(pieces)
+    ids = converter.anchors if len(converter.anchors) == len(pieces) - 1 else []
+
+    # (start of the section, position of its heading) per heading.
+    starts = []
+    position = len(pieces[0])
+    for piece in pieces[1:]:
+        starts.append((markdown.rfind("\n", 0, position) + 1, position))
+        position += len(piece)
+
+    sections = []
+    lead_end = starts[0][0] if starts else len(markdown)
+    if markdown[:lead_end].strip():
+        sections.append({"anchor": "", "heading": "", "level": 0, "start": 0, "end": lead_end})
+    seen = set()
+    for number, (start, heading_at) in enumerate(starts):
+        line_end = markdown.find("\n", heading_at)
+        line = markdown[heading_at:line_end if line_end >= 0 else len(markdown)]
+        heading = _heading_text(line)
+        anchor = (ids[number] if ids else None) or _slug(heading) or "section"
+        base, suffix = anchor, 2
+        while anchor in seen:
+            anchor = f"{base}-{suffix}"
+            suffix += 1
+        seen.add(anchor)
+        end = starts[number + 1][0] if number + 1 < len(starts) else len(markdown)
+        sections.append({
+            "anchor": anchor,
+            "heading": heading,
+            "level": len(line) - len(line.lstrip("#")),
+            "start": start,
+            "end": end,
+        })
+    for section in sections:
+        section["end"] = section["start"] + len(markdown[section["start"]:section["end"]].rstrip())
+    return markdown, sections
+
+
+def html_links(source: str) -> list[str]:
+    """
+    Return the `href` of every link in an HTML fragment, in document order.
+
+    Links are collected by a plain text conversion, so links the conversion
+    drops (in `<script>` or `<pre>` blocks, for example) are left out.
+    """
+    converter = _Converter(False)
+    converter.hrefs = []
+    _run(source, converter)
+    return converter.hrefs
+
+
+def _traced_convert(name: str, source: str, markdown: bool) -> str:
+    started = time.perf_counter()
+    result = convert(source, markdown)
+    tracing.emit(
+        "convert", time.perf_counter() - started, function=name,
+        input_chars=len(source), output_chars=len(result),
+    )
+    return result
+
+
+def html_to_markdown(source: str) -> str:
+    """Convert HTML to Markdown."""
+    if tracing.enabled:
+        return _traced_convert("html_to_markdown", source, True)
+    return convert(source, markdown=True)
+
+
+def html_to_text(source: str) -> str:
+    """Convert HTML to plain text."""
+    if tracing.enabled:
+        return _traced_convert("html_to_text", source, False)
+    return convert(source, markdown=False)
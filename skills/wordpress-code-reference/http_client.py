@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Keep-alive HTTP transport for the WordPress REST API.
+
+Connections are pooled per (scheme, host, port) and reused across requests,
+so a batch of lookups pays the TCP and TLS handshake once instead of once per
+call. Responses are requested with gzip/deflate transfer encoding and the
+body is decompressed incrementally while it is read.
+
+Requests go through the shared rate limiter in rate_limit.py. Network
+failures and 429/502/503/504 responses are retried with jittered
+exponential backoff, or after the server's Retry-After.
+
+This module is shared by the wordpress-handbook and wordpress-code-reference
+skills and must be kept identical in both skill directories.
+"""
+
+from __future__ import annotations
+
+import http.client
+import threading
+import time
+import urllib.error
+import urllib.parse
+import zlib
+
+import rate_limit
+import tracing
+
+REQUEST_TIMEOUT = 10
+
+# Idle connections kept per host.
+MAX_IDLE_PER_HOST = 8
+
+READ_CHUNK_SIZE = 64 * 1024
+MAX_REDIRECTS = 5
+
+USER_AGENT = "wordpress-skills (+https://github.com/hideokamoto/wordpress-org-knowledges)"
+
+# Errors that mean a pooled connection was closed by the server while idle.
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+class Response:
+    """A fully read HTTP response with a decoded body."""
+
+    def __init__(self, url: str, status: int, reason: str, headers: http.client.HTTPMessage, body: bytes):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+    def text(self) -> str:
+        return self.body.decode()
+
+
+class ConnectionPool:
+    """Idle keep-alive connections, grouped by (scheme, host, port)."""
+
+    def __init__(self, max_idle_per_host: int = MAX_IDLE_PER_HOST):
+        self.max_idle_per_host = max_idle_per_host
+        self._idle: dict[tuple[str, str, int], list[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: tuple[str, str, int], timeout: float) -> tuple[http.client.HTTPConnection, bool]:
+        """Return (connection, reused) for a host, creating one if none is idle."""
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                conn = idle.pop()
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+
+        scheme, host, port = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=timeout), False
+        return http.client.HTTPConnection(host, port, timeout=timeout), False
+
+    def release(self, key: tuple[str, str, int], conn: http.client.HTTPConnection) -> None:
+        """Return a connection to the pool, closing it if the pool is full."""
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+
+_pool = ConnectionPool()
+
+
+def _read_body(response: http.client.HTTPResponse) -> tuple[bytes, int]:
+    """
+    Read a response body, decompressing gzip/deflate as chunks arrive.
+
+    Returns the decoded body and the number of bytes read from the wire.
+    """
+    encoding = (response.getheader("Content-Encoding") or "").strip().lower()
+    if encoding == "gzip":
+        decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    elif encoding == "deflate":
+        decoder = zlib.decompressobj()
+    else:
+        decoder = None
+
+    chunks = []
+    wire_bytes = 0
+    while True:
+        chunk = response.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        wire_bytes += len(chunk)
+        if decoder is None:
+            chunks.append(chunk)
+            continue
+        try:
+            chunks.append(decoder.decompress(chunk))
+        except zlib.error:
+            if encoding != "deflate" or chunks:
+                raise
+            # Some servers send raw deflate streams without the zlib header.
+            decoder = zlib.decompressobj(-zlib.MAX_WBITS)
+            chunks.append(decoder.decompress(chunk))
+    if decoder is not None:
+        chunks.append(decoder.flush())
+    return b"".join(chunks), wire_bytes
+
+
+def _send(url: str, headers: dict[str, str], timeout: float) -> Response:
+    parts = urllib.parse.urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https"):
+        raise urllib.error.URLError(f"unsupported URL scheme: {scheme}")
+    port = parts.port or (443 if scheme == "https" else 80)
+    key = (scheme, parts.hostname or "", port)
+    target = parts.path or "/"
+    if parts.query:
+        target += "?" + parts.query
+
+    request_headers = {
+        "Host": parts.netloc,
+        "User-Agent": USER_AGENT,
+        "Accept": "application/json",
+        "Accept-Encoding": "gzip, deflate",
+        "Connection": "keep-alive",
+    }
+    request_headers.update(headers)
+
+    while True:
+        conn, reused = _pool.acquire(key, timeout)
+        traced = tracing.enabled
+        try:
+            if traced:
+                if not reused:
+                    started = time.perf_counter()
+                    conn.connect()
+                    tracing.emit("connect", time.perf_counter() - started, scheme=scheme, host=key[1], port=port)
+                sent = time.perf_counter()
+            conn.request("GET", target, headers=request_headers)
+            raw = conn.getresponse()
+            if traced:
+                received = time.perf_counter()
+                tracing.emit("ttfb", received - sent, url=url, status=raw.status, reused=reused)
+            body, wire_bytes = _read_body(raw)
+            if traced:
+                tracing.emit(
+                    "body", time.perf_counter() - received, url=url, bytes=wire_bytes,
+                    decoded_bytes=len(body), encoding=raw.getheader("Content-Encoding") or "identity",
+                )
+        except _STALE_CONNECTION_ERRORS as e:
+            conn.close()
+            if reused:
+                # The server dropped an idle connection; retry on a fresh one.
+                continue
+            raise urllib.error.URLError(e) from e
+        except (OSError, http.client.HTTPException, zlib.error) as e:
+            conn.close()
+            raise urllib.error.URLError(e) from e
+
+        if raw.will_close:
+            conn.close()
+        else:
+            _pool.release(key, conn)
+        return Response(url, raw.status, raw.reason, raw.headers, body)
+
+
+def _send_with_retries(url: str, headers: dict[str, str], timeout: float) -> Response:
+    host = (urllib.parse.urlsplit(url).hostname or "").lower()
+    retries = rate_limit.max_retries()
+    attempt = 0
+    while True:
+        rate_limit.acquire(host)
+        try:
+            response = _send(url, headers, timeout)
+        except urllib.error.URLError:
+            rate_limit.report(host, None)
+            if attempt >= retries:
+                raise
+            time.sleep(rate_limit.backoff_delay(attempt))
+            attempt += 1
+            continue
+
+        pause = rate_limit.retry_after(response.headers) if response.status in rate_limit.RETRY_STATUSES else None
+        rate_limit.report(host, response.status, pause)
+        if response.status not in rate_limit.RETRY_STATUSES or attempt >= retries:
+            return response
+        if pause is not None and pause > rate_limit.MAX_WAIT:
+            return response
+        if pause is None:
+            time.sleep(rate_limit.backoff_delay(attempt))
+        elif not rate_limit.max_rate():
+            time.sleep(pause)  # Otherwise rate_limit.acquire() waits it out.
+        attempt += 1
+
+
+def request(url: str, headers: dict[str, str] | None = None, timeout: float = REQUEST_TIMEOUT) -> Response:
+    """
+    Perform a GET request over a pooled keep-alive connection.
+
+    Redirects are followed. Responses with status 304 are returned as-is so
+    callers can handle revalidation; other non-2xx statuses raise
+    urllib.error.HTTPError, and connection failures raise urllib.error.URLError
+    (rate_limit.CircuitOpen while the API is being left alone). Failed
+    requests are retried first, as described above.
+    """
+    headers = dict(headers or {})
+    for _ in range(MAX_REDIRECTS + 1):
+        response = _send_with_retries(url, headers, timeout)
+        if response.status in (301, 302, 303, 307, 308) and response.headers.get("Location"):
+            url = urllib.parse.urljoin(url, response.headers["Location"])
+            continue
+        if response.status == 304 or 200 <= response.status < 300:
+            return response
+        raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, None)
+    raise urllib.error.URLError(f"too many redirects: {url}")
+
+
+def close() -> None:
+    """Close all pooled connections."""
+    _pool.close()
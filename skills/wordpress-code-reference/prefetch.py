@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Speculative prefetch of search hits into the response cache.
+
+Usage: python3 prefetch.py <skill> <subtype> <id> [<subtype> <id> ...]
+
+A search is usually followed by get_content.py on its first few hits. With
+prefetch on, the search fetches those documents in the background right
+after it returns. It uses the same URLs get_content uses, so the follow-up
+call is answered from the response cache.
+
+Prefetching is best effort and kept within a budget:
+
+- at most PREFETCH_MAX_HITS documents per search;
+- one prefetch request at a time; once PREFETCH_QUEUE_SIZE hits are
+  waiting, further ones are dropped;
+- in the daemon, a prefetch waits while foreground requests are being served;
+- a spawned prefetch process runs at a lower CPU priority and gives up after
+  PREFETCH_BUDGET seconds, which also bounds the request in flight;
+- only one spawned prefetch process runs at a time, held by a lock in the
+  cache directory; one started while another is running exits at once.
+
+Inside the daemon the prefetch runs on a background thread. A search run
+in-process hands it to a detached `prefetch.py` process instead, so the
+search itself still exits immediately.
+
+This module is shared by the wordpress-handbook and wordpress-code-reference
+skills and must be kept identical in both skill directories.
+
+Environment:
+    WP_SKILLS_PREFETCH - Number of top hits to prefetch after each search (default: 0)
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from collections.abc import Callable, Iterator
+
+import daemon
+from cache import cache_enabled, default_cache_dir
+
+PREFETCH_MAX_HITS = 5
+PREFETCH_QUEUE_SIZE = 10
+PREFETCH_BUDGET = 10
+LOCK_NAME = "prefetch.lock"
+
+# Longest a prefetch waits for foreground requests to finish before giving up.
+FOREGROUND_WAIT = 5
+
+# Set by the daemon: prefetch on a thread instead of spawning a process.
+resident = False
+
+_queue: "queue.Queue[tuple[str, str, int]]" = queue.Queue(maxsize=PREFETCH_QUEUE_SIZE)
+_worker = None
+_lock = threading.Lock()
+_foreground = 0
+_idle = threading.Condition(_lock)
+
+
+def prefetch_default() -> int:
+    """Return the number of hits to prefetch, from WP_SKILLS_PREFETCH."""
+    try:
+        return max(0, int(os.environ.get("WP_SKILLS_PREFETCH") or 0))
+    except ValueError:
+        return 0
+
+
+@contextmanager
+def foreground() -> Iterator[None]:
+    """Mark a foreground request as in flight; prefetches wait until none are."""
+    global _foreground
+    with _lock:
+        _foreground += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _foreground -= 1
+            if not _foreground:
+                _idle.notify_all()
+
+
+def _content_module(prefix: str):
+    """Return the skill's get_content script, importing it once."""
+    name = f"{prefix}_get_content"
+    module = sys.modules.get(name)
+    if module is None:
+        directory = daemon.skill_directories()[prefix]
+        module = daemon.import_script(name, os.path.join(directory, "get_content.py"))
+    return module
+
+
+def _content_function(prefix: str) -> Callable:
+    """Return the skill's get_content function, importing the script once."""
+    return getattr(_content_module(prefix), daemon.SKILLS[prefix][2])
+
+
+def _work() -> None:
+    while True:
+        prefix, subtype, doc_id = _queue.get()
+        with _lock:
+            _idle.wait_for(lambda: not _foreground, timeout=FOREGROUND_WAIT)
+            busy = bool(_foreground)
+        if not busy:
+            try:
+                _content_function(prefix)(subtype=subtype, doc_id=doc_id)
+            except Exception:
+                pass  # The follow-up request reports any error itself.
+        _queue.task_done()
+
+
+def _enqueue(items: list[tuple[str, str, int]]) -> None:
+    global _worker
+    with _lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_work, name="prefetch", daemon=True)
+            _worker.start()
+    for item in items:
+        try:
+            _queue.put_nowait(item)
+        except queue.Full:
+            return
+
+
+def _spawn(prefix: str, items: list[tuple[str, str, int]]) -> None:
+    args = [sys.executable, os.path.abspath(__file__), prefix]
+    for _, subtype, doc_id in items:
+        args += [subtype, str(doc_id)]
+    import subprocess
+    try:
+        subprocess.Popen(
+            args,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+    except OSError:
+        pass
+
+
+def _lock_process() -> bool:
+    """
+    Take the prefetch process lock without waiting, until this process exits.
+
+    Returns False if another prefetch process holds it. Where locking is not
+    possible (no fcntl, an unwritable cache directory) it returns True and
+    the prefetch runs unlocked.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return True
+    directory = default_cache_dir()
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd = os.open(os.path.join(directory, LOCK_NAME), os.O_RDWR | os.O_CREAT, 0o600)
+    except OSError:
+        return True
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return False
+    # The descriptor is left open: the lock is released when the process exits.
+    return True
+
+
+def schedule(prefix: str, hits: list[dict], count: int) -> None:
+    """Prefetch the documents of the first `count` hits of a search in the background."""
+    count = min(count, PREFETCH_MAX_HITS)
+    if count <= 0 or not cache_enabled():
+        return
+    items = [(prefix, hit["subtype"], hit["id"]) for hit in hits[:count]]
+    if not items:
+        return
+    if resident:
+        _enqueue(items)
+    else:
+        _spawn(prefix, items)
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) < 3 or len(args) % 2 == 0 or args[0] not in daemon.SKILLS:
+        print("Usage: prefetch.py <skill> <subtype> <id> [<subtype> <id> ...]", file=sys.stderr)
+        sys.exit(1)
+
+    if not _lock_process():
+        return
+    try:
+        os.nice(10)
+    except (AttributeError, OSError):
+        pass
+
+    module = _content_module(args[0])
+    fetch = getattr(module, daemon.SKILLS[args[0]][2])
+    deadline = time.monotonic() + PREFETCH_BUDGET
+    for i in range(1, len(args), 2):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        # A slow response cannot run past the budget.
+        timeout = min(module.REQUEST_TIMEOUT, remaining)
+        try:
+            fetch(subtype=args[i], doc_id=int(args[i + 1]), timeout=timeout)
+        except Exception:
+            pass
+
+
+if __name__ == "__main__":
+    main()
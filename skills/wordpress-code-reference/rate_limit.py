@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Client-side rate limiting and circuit breaking for the WordPress REST API.
+
+Every process on the host that talks to the same API host shares one token
+bucket, kept in a small state file under the cache directory and updated
+under an exclusive file lock. The bucket's rate adapts to the server: it is
+halved whenever the server answers 429 or 503, and creeps back up by
+RATE_INCREASE requests/second with every successful response, up to the
+configured ceiling. Parallel agents therefore settle near the highest rate
+the server accepts instead of all retrying at once.
+
+A Retry-After header pauses every process until the time it names. After
+FAILURE_THRESHOLD consecutive server errors or network failures the circuit
+opens: requests fail fast for CIRCUIT_COOLDOWN seconds, then a single probe
+is let through, and its result closes or re-opens the circuit.
+
+On platforms without fcntl the state is kept per process.
+
+This module is shared by the wordpress-handbook and wordpress-code-reference
+skills and must be kept identical in both skill directories.
+
+Environment:
+    WP_SKILLS_RATE_LIMIT  - Highest request rate per API host, in requests per
+                            second (default: 20; "0" turns limiting off)
+    WP_SKILLS_MAX_RETRIES - Retries of a failed request (default: 3)
+"""
+
+from __future__ import annotations
+
+import email.utils
+import json
+import os
+import random
+import re
+import threading
+import time
+import urllib.error
+from collections.abc import Callable
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+DEFAULT_RATE = 20.0
+MIN_RATE = 0.5
+RATE_INCREASE = 0.1
+BURST = 10
+
+DEFAULT_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+
+# Longest a request waits for a Retry-After pause or a free token.
+MAX_WAIT = 30.0
+
+FAILURE_THRESHOLD = 5
+CIRCUIT_COOLDOWN = 30.0
+
+# Statuses worth retrying, and those that mean the server wants less traffic.
+RETRY_STATUSES = (429, 502, 503, 504)
+THROTTLE_STATUSES = (429, 503)
+
+_lock = threading.Lock()
+_local_state: dict[str, dict] = {}
+
+
+class CircuitOpen(urllib.error.URLError):
+    """The API host is failing or has asked for a pause longer than MAX_WAIT."""
+
+
+def max_rate() -> float:
+    """Return the rate ceiling from WP_SKILLS_RATE_LIMIT; 0 means unlimited."""
+    try:
+        return max(0.0, float(os.environ.get("WP_SKILLS_RATE_LIMIT") or DEFAULT_RATE))
+    except ValueError:
+        return DEFAULT_RATE
+
+
+def max_retries() -> int:
+    """Return the number of retries from WP_SKILLS_MAX_RETRIES."""
+    try:
+        return max(0, int(os.environ.get("WP_SKILLS_MAX_RETRIES") or DEFAULT_RETRIES))
+    except ValueError:
+        return DEFAULT_RETRIES
+
+
+def backoff_delay(attempt: int) -> float:
+    """Return a jittered exponential backoff for a retry (attempt counts from 0)."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def retry_after(headers) -> float | None:
+    """Return the Retry-After header as seconds from now, or None."""
+    value = headers.get("Retry-After") if headers is not None else None
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        moment = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, moment.timestamp() - time.time())
+
+
+def _state_path(host: str) -> str:
+    from cache import default_cache_dir
+
+    name = re.sub(r"[^A-Za-z0-9.-]", "_", host) or "default"
+    return os.path.join(default_cache_dir(), "ratelimit", f"{name}.json")
+
+
+def _update(host: str, change: Callable[[dict, float], float]) -> float:
+    """Apply `change(state, now)` to a host's shared state and return its result."""
+    with _lock:
+        if fcntl is not None:
+            path = _state_path(host)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            except OSError:
+                fd = None
+            if fd is not None:
+                with os.fdopen(fd, "r+", encoding="utf-8") as f:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                    try:
+                        state = json.loads(f.read() or "{}")
+                    except ValueError:
+                        state = {}
+                    result = change(state, time.time())
+                    f.seek(0)
+                    f.write(json.dumps(state))
+                    f.truncate()
+                    return result
+        return change(_local_state.setdefault(host, {}), time.time())
+
+
+def _take_token(ceiling: float) -> Callable[[dict, float], float]:
+    def change(state: dict, now: float) -> float:
+        if state.get("circuit", "closed") != "closed":
+            if now < state.get("open_until", 0):
+                raise CircuitOpen("API circuit is open after repeated failures; try again shortly")
+            # Let one probe through; others fail fast until it reports back.
+            state["circuit"] = "half-open"
+            state["open_until"] = now + CIRCUIT_COOLDOWN
+
+        blocked = state.get("blocked_until", 0) - now
+        if blocked > 0:
+            if blocked > MAX_WAIT:
+                raise CircuitOpen(f"API asked to pause requests for {blocked:.0f}s")
+            return blocked
+
+        rate = min(state.get("rate", ceiling), ceiling)
+        tokens = min(BURST, state.get("tokens", BURST) + (now - state.get("updated", now)) * rate)
+        state["rate"] = rate
+        state["updated"] = now
+        if tokens >= 1:
+            state["tokens"] = tokens - 1
+            return 0.0
+        state["tokens"] = tokens
+        return (1 - tokens) / rate
+
+    return change
+
+
+def acquire(host: str) -> None:
+    """
+    Wait until a request to `host` may be sent.
+
+    Raises CircuitOpen when the circuit is open or the server asked for a
+    longer pause than MAX_WAIT.
+    """
+    ceiling = max_rate()
+    if not ceiling:
+        return
+    deadline = time.monotonic() + MAX_WAIT
+    while True:
+        wait = _update(host, _take_token(ceiling))
+        if wait <= 0:
+            return
+        if time.monotonic() + wait > deadline:
+            raise CircuitOpen("timed out waiting for the API rate limit")
+        time.sleep(wait)
+
+
+def report(host: str, status: int | None, pause: float | None = None) -> None:
+    """
+    Record the outcome of a request to `host`.
+
+    `status` is the HTTP status, or None for a network failure; `pause` is the
+    response's Retry-After in seconds.
+    """
+    ceiling = max_rate()
+    if not ceiling:
+        return
+
+    def change(state: dict, now: float) -> float:
+        rate = min(state.get("rate", ceiling), ceiling)
+        if status in THROTTLE_STATUSES:
+            state["rate"] = max(MIN_RATE, rate / 2)
+            state["tokens"] = 0
+        if pause:
+            state["blocked_until"] = max(state.get("blocked_until", 0), now + pause)
+
+        if status is None or status in (500, 502, 503, 504):
+            failures = state.get("failures", 0) + 1
+            state["failures"] = failures
+            if failures >= FAILURE_THRESHOLD or state.get("circuit") == "half-open":
+                state["circuit"] = "open"
+                state["open_until"] = now + CIRCUIT_COOLDOWN
+        elif status != 429:
+            state["failures"] = 0
+            state["circuit"] = "closed"
+            state["rate"] = min(ceiling, rate + RATE_INCREASE)
+        return 0.0
+
+    _update(host, change)
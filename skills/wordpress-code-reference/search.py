@@ -2,23 +2,44 @@
 """
 Search WordPress Code Reference.
 
-Usage: python3 search.py <query> [subtypes] [per_page]
+Usage: python3 search.py <query> [subtypes] [per_page] [--offline | --identifier] [--prefetch N]
+                         [--all] [--jsonl]
 
 Arguments:
     query    - Search keywords (required)
     subtypes - Comma-separated list: wp-parser-function,wp-parser-hook,wp-parser-class,wp-parser-method
     per_page - Number of results (1-100, default: 5)
+    --offline - Search the local corpus downloaded by sync.py (ranked by BM25
+                and link authority, results include a "score") instead of the API
+    --identifier - Look the query up as a function/hook/class/method name in
+                   the local corpus: exact, prefix, `_`/`::` segment and
+                   misspelling-tolerant matches, each tagged with "match"
+    --prefetch - Fetch the content of the top N hits into the cache in the
+                 background, for a following get_content.py (default:
+                 WP_SKILLS_PREFETCH, or 0)
+    --all     - Fetch every page of API results (per_page per request),
+                following X-WP-TotalPages; results are printed as each page
+                arrives
+    --jsonl   - Print one JSON object per line instead of a JSON array
 
 Example:
     python3 search.py "register_post_type" "wp-parser-function" 5
+    python3 search.py "add_acton" --identifier
+    python3 search.py "post" "wp-parser-hook" 100 --all --jsonl
 """
 
+from __future__ import annotations
+
+import itertools
 import json
 import sys
-import urllib.request
-import urllib.error
 import urllib.parse
-from typing import List, Optional
+from collections.abc import Iterable, Iterator
+
+import corpus
+import daemon
+import prefetch
+from cache import fetch_json_page, raise_api_error
 
 API_BASE_URL = "https://developer.wordpress.org/wp-json/wp/v2"
 REQUEST_TIMEOUT = 10
@@ -31,11 +52,7 @@ CODE_REF_SUBTYPES = [
 ]
 
 
-def search_code_reference(
-    query: str, subtypes: Optional[List[str]] = None, per_page: int = 5
-) -> List[dict]:
-    """Search WordPress Code Reference."""
-    # Validate subtypes
+def _validate_subtypes(subtypes: list[str] | None) -> None:
     if subtypes:
         invalid = [s for s in subtypes if s not in CODE_REF_SUBTYPES]
         if invalid:
@@ -44,6 +61,21 @@ def search_code_reference(
                 f"Valid: {', '.join(CODE_REF_SUBTYPES)}"
             )
 
+
+def search_code_reference_page(
+    query: str,
+    subtypes: list[str] | None = None,
+    per_page: int = 5,
+    page: int = 1,
+) -> dict:
+    """
+    Fetch one page of API search results.
+
+    Returns {"results": [...], "total_pages": n}, where n is the API's
+    X-WP-TotalPages for the query.
+    """
+    _validate_subtypes(subtypes)
+
     # Build query parameters
     params = {
         "search": query,
@@ -51,22 +83,22 @@ def search_code_reference(
         "_fields": "id,title,url,subtype",
         "subtype": ",".join(subtypes) if subtypes else ",".join(CODE_REF_SUBTYPES),
     }
+    if page > 1:
+        params["page"] = str(page)
 
     url = f"{API_BASE_URL}/search?{urllib.parse.urlencode(params)}"
 
     try:
-        with urllib.request.urlopen(url, timeout=REQUEST_TIMEOUT) as response:
-            data = json.loads(response.read().decode())
-    except urllib.error.HTTPError as e:
-        raise RuntimeError(f"HTTP error {e.code}") from e
-    except urllib.error.URLError as e:
-        raise RuntimeError(f"Network error: {e.reason}") from e
+        data, total_pages = fetch_json_page(url, "search", timeout=REQUEST_TIMEOUT)
+    except OSError as e:
+        raise_api_error(e)
+        raise
 
     if not isinstance(data, list):
         error_msg = data.get("message", "Unexpected API response") if isinstance(data, dict) else "Unexpected API response"
         raise RuntimeError(error_msg)
 
-    return [
+    results = [
         {
             "id": item["id"],
             "title": item["title"],
@@ -75,13 +107,132 @@ def search_code_reference(
         }
         for item in data
     ]
+    return {"results": results, "total_pages": total_pages}
+
+
+def search_code_reference(
+    query: str,
+    subtypes: list[str] | None = None,
+    per_page: int = 5,
+    offline: bool = False,
+    identifier: bool = False,
+    prefetch_hits: int = 0,
+) -> list[dict]:
+    """
+    Search WordPress Code Reference.
+
+    With `prefetch_hits`, the documents of that many top hits are fetched
+    into the response cache in the background (see prefetch.py).
+
+    Offline results are ranked with BM25, boosted by each document's link
+    authority (see link_graph.py).
+    """
+    _validate_subtypes(subtypes)
+
+    if identifier:
+        import symbol_index
+        return symbol_index.lookup(query, subtypes or CODE_REF_SUBTYPES, min(max(1, per_page), 100))
+
+    if offline:
+        if corpus.default_backend() == "sqlite":
+            import sqlite_store as store
+        else:
+            import search_index as store
+        import link_graph
+
+        limit = min(max(1, per_page), 100)
+        results = store.search(query, subtypes or CODE_REF_SUBTYPES, max(limit, link_graph.RERANK_DEPTH))
+        return link_graph.rerank(results, limit)
+
+    results = search_code_reference_page(query, subtypes, per_page)["results"]
+    prefetch.schedule("code_reference", results, prefetch_hits)
+    return results
+
+
+def iter_code_reference_results(
+    query: str,
+    subtypes: list[str] | None = None,
+    per_page: int = 5,
+    prefetch_hits: int = 0,
+) -> Iterator[dict]:
+    """
+    Yield every API search result, one page of `per_page` at a time.
+
+    Pages are requested in order until X-WP-TotalPages is reached, and the
+    results of each page are yielded as soon as it is decoded, so only one
+    page is held in memory.
+    """
+    page, total_pages = 1, 1
+    while page <= total_pages:
+        data = daemon.call_or_run(
+            "code_reference.search_page", search_code_reference_page,
+            query=query, subtypes=subtypes, per_page=per_page, page=page,
+        )
+        if page == 1:
+            prefetch.schedule("code_reference", data["results"], prefetch_hits)
+        yield from data["results"]
+        total_pages = data["total_pages"]
+        page += 1
+
+
+def _print_results(results: Iterable[dict], jsonl: bool) -> None:
+    """Print results as they arrive, as a JSON array or as JSON Lines."""
+    results = iter(results)
+    first = next(results, None)
+    if first is None:
+        print("No results found. Try different keywords.", file=sys.stderr if jsonl else sys.stdout)
+        return
+
+    if jsonl:
+        for result in itertools.chain([first], results):
+            print(json.dumps(result), flush=True)
+        return
+
+    # The same text as json.dumps(list, indent=2), written one item at a time.
+    separator = "[\n"
+    for result in itertools.chain([first], results):
+        sys.stdout.write(separator + "  " + json.dumps(result, indent=2).replace("\n", "\n  "))
+        sys.stdout.flush()
+        separator = ",\n"
+    sys.stdout.write("\n]\n")
 
 
 def main():
     args = sys.argv[1:]
 
+    offline = corpus.offline_default()
+    if "--offline" in args:
+        args.remove("--offline")
+        offline = True
+
+    prefetch_hits = prefetch.prefetch_default()
+    if "--prefetch" in args:
+        index = args.index("--prefetch")
+        try:
+            prefetch_hits = int(args[index + 1])
+        except (IndexError, ValueError):
+            print("Error: --prefetch requires a number", file=sys.stderr)
+            sys.exit(1)
+        del args[index:index + 2]
+
+    identifier = "--identifier" in args
+    if identifier:
+        args.remove("--identifier")
+
+    all_pages = "--all" in args
+    if all_pages:
+        args.remove("--all")
+
+    jsonl = "--jsonl" in args
+    if jsonl:
+        args.remove("--jsonl")
+
+    if all_pages and (offline or identifier):
+        print("Error: --all pages through the API and cannot be combined with --offline or --identifier", file=sys.stderr)
+        sys.exit(1)
+
     if not args:
-        print("Usage: search.py <query> [subtypes] [per_page]", file=sys.stderr)
+        print("Usage: search.py <query> [subtypes] [per_page] [--offline | --identifier] [--prefetch N] [--all] [--jsonl]", file=sys.stderr)
         print(
             'Example: search.py "add_action" "wp-parser-function,wp-parser-hook" 5',
             file=sys.stderr,
@@ -89,7 +240,7 @@ def main():
         sys.exit(1)
 
     query = args[0]
-    subtypes = [s.strip() for s in args[1].split(",")] if len(args) > 1 else None
+    subtypes = [s.strip() for s in args[1].split(",") if s.strip()] if len(args) > 1 else None
 
     # Parse per_page with error handling
     if len(args) > 2:
@@ -105,12 +256,15 @@ def main():
         per_page = 5
 
     try:
-        results = search_code_reference(query, subtypes, per_page)
-
-        if not results:
-            print("No results found. Try different keywords.")
+        if all_pages:
+            results = iter_code_reference_results(query, subtypes, per_page, prefetch_hits)
         else:
-            print(json.dumps(results, indent=2))
+            results = daemon.call_or_run(
+                "code_reference.search", search_code_reference,
+                query=query, subtypes=subtypes, per_page=per_page, offline=offline, identifier=identifier,
+                prefetch_hits=prefetch_hits,
+            )
+        _print_results(results, jsonl)
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Search the WordPress handbooks and the Code Reference at once.
+
+Usage: python3 search_all.py <query> [subtypes] [per_page] [--offline] [--prefetch N]
+
+Arguments:
+    query    - Search keywords (required)
+    subtypes - Comma-separated list of handbook and/or code reference types
+               (optional; default: all types of every installed skill)
+    per_page - Number of results (1-100, default: 5)
+    --offline - Search the local corpus downloaded by sync.py instead of the API
+    --prefetch - Fetch the content of each source's top N hits into the cache
+                 in the background (default: WP_SKILLS_PREFETCH, or 0)
+
+Both skills are searched concurrently, so a combined search takes about as
+long as the slower of the two. The results are interleaved by rank (first
+handbook hit, first code reference hit, second handbook hit, ...), pages that
+both return are listed once, and each result carries a "source" tag:
+"handbook" or "code-reference".
+
+The searches go through the daemon when it is running, like search.py. If one
+source fails, its error is printed as a warning and the other's results are
+still returned.
+
+This module is shared by the wordpress-handbook and wordpress-code-reference
+skills and must be kept identical in both skill directories.
+
+Example:
+    python3 search_all.py "register_post_type" "" 10
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import corpus
+import daemon
+import prefetch
+
+# Source tag -> (daemon prefix, subtype list in the skill's search.py).
+SOURCES = {
+    "handbook": ("handbook", "HANDBOOK_SUBTYPES"),
+    "code-reference": ("code_reference", "CODE_REF_SUBTYPES"),
+}
+
+
+def _load_searches() -> dict[str, object]:
+    """Import the search.py of each installed skill, keyed by source tag."""
+    directories = daemon.skill_directories()
+    modules = {}
+    for source, (prefix, _) in SOURCES.items():
+        if prefix in directories:
+            modules[source] = daemon.import_script(
+                f"{prefix}_search", os.path.join(directories[prefix], "search.py")
+            )
+    return modules
+
+
+def _split_subtypes(modules: dict[str, object], subtypes: list[str] | None) -> dict[str, list[str] | None]:
+    """Assign each requested subtype to the source that serves it."""
+    if not subtypes:
+        return {source: None for source in modules}
+
+    assigned: dict[str, list[str] | None] = {}
+    for subtype in subtypes:
+        for source, module in modules.items():
+            if subtype in getattr(module, SOURCES[source][1]):
+                assigned.setdefault(source, []).append(subtype)
+                break
+        else:
+            valid = [s for source, module in modules.items() for s in getattr(module, SOURCES[source][1])]
+            raise ValueError(f"Invalid subtype: {subtype}. Valid: {', '.join(valid)}")
+    return assigned
+
+
+def _url_key(url: str) -> str:
+    return url.rstrip("/").lower()
+
+
+def merge_results(ranked: dict[str, list[dict]], limit: int) -> list[dict]:
+    """Interleave ranked result lists, tagging each result with its source and dropping repeated URLs."""
+    merged = []
+    seen = set()
+    for rank in range(max((len(results) for results in ranked.values()), default=0)):
+        for source, results in ranked.items():
+            if rank >= len(results):
+                continue
+            key = _url_key(results[rank].get("url", ""))
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append({**results[rank], "source": source})
+            if len(merged) >= limit:
+                return merged
+    return merged
+
+
+def search_all(
+    query: str,
+    subtypes: list[str] | None = None,
+    per_page: int = 5,
+    offline: bool = False,
+    prefetch_hits: int = 0,
+) -> list[dict]:
+    """Search every installed WordPress skill concurrently and merge the results."""
+    per_page = min(max(1, per_page), 100)
+    modules = _load_searches()
+    assigned = _split_subtypes(modules, subtypes)
+
+    def run(source: str) -> list[dict]:
+        prefix = SOURCES[source][0]
+        function = getattr(modules[source], daemon.SKILLS[prefix][1])
+        return daemon.call_or_run(
+            f"{prefix}.search", function,
+            query=query, subtypes=assigned[source], per_page=per_page, offline=offline,
+            prefetch_hits=prefetch_hits,
+        )
+
+    ranked: dict[str, list[dict]] = {}
+    errors = []
+    with ThreadPoolExecutor(max_workers=len(assigned) or 1) as executor:
+        futures = {source: executor.submit(run, source) for source in assigned}
+        for source, future in futures.items():
+            try:
+                ranked[source] = future.result()
+            except Exception as e:
+                errors.append(f"{source}: {e}")
+
+    if errors and not ranked:
+        raise RuntimeError("; ".join(errors))
+    for error in errors:
+        print(f"Warning: {error}", file=sys.stderr)
+    return merge_results(ranked, per_page)
+
+
+def main():
+    args = sys.argv[1:]
+
+    offline = corpus.offline_default()
+    if "--offline" in args:
+        args.remove("--offline")
+        offline = True
+
+    prefetch_hits = prefetch.prefetch_default()
+    if "--prefetch" in args:
+        index = args.index("--prefetch")
+        try:
+            prefetch_hits = int(args[index + 1])
+        except (IndexError, ValueError):
+            print("Error: --prefetch requires a number", file=sys.stderr)
+            sys.exit(1)
+        del args[index:index + 2]
+
+    if not args:
+        print("Usage: search_all.py <query> [subtypes] [per_page] [--offline] [--prefetch N]", file=sys.stderr)
+        print('Example: search_all.py "register_post_type" "plugin-handbook,wp-parser-function" 10', file=sys.stderr)
+        sys.exit(1)
+
+    query = args[0]
+    subtypes = [s.strip() for s in args[1].split(",") if s.strip()] if len(args) > 1 else None
+
+    if len(args) > 2:
+        try:
+            per_page = int(args[2])
+        except ValueError:
+            print("Error: per_page must be an integer", file=sys.stderr)
+            sys.exit(1)
+    else:
+        per_page = 5
+
+    try:
+        results = search_all(query, subtypes, per_page, offline, prefetch_hits)
+
+        if not results:
+            print("No results found. Try different keywords.")
+        else:
+            print(json.dumps(results, indent=2))
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Request coalescing: concurrent identical lookups share one upstream call.
+
+`Group.do(key, function)` runs `function` once for all callers asking for the
+same key at the same time. The first caller runs it, and the others wait for
+its result (or its exception) instead of starting their own. Threads and
+asyncio tasks (`Group.do_async`) share the same flights. Once a call
+finishes, the key is forgotten, so later callers start a new one; caching
+results is the response cache's job.
+
+Across processes, `file_lock(directory, key)` serializes work on a key with
+an flock on one of LOCK_STRIPES lock files. The response cache uses it so
+that one process fetches an expired URL while the others wait and then read
+the entry it stored.
+
+This module is shared by the wordpress-handbook and wordpress-code-reference
+skills and must be kept identical in both skill directories.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import TypeVar
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+T = TypeVar("T")
+
+# Lock files shared by all keys; two keys on one stripe merely take turns.
+LOCK_STRIPES = 4096
+
+# Longest a process waits for another one's flight before doing the work itself.
+LOCK_WAIT = 30.0
+LOCK_POLL_INTERVAL = 0.01
+
+
+class Group:
+    """A set of in-flight calls, keyed by request."""
+
+    def __init__(self):
+        self._calls: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, function: Callable[[], T]) -> T:
+        """Run `function`, or wait for the identical call already in flight."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            result = function()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    async def do_async(self, key: str, function: Callable[[], T]) -> T:
+        """Like do(), for asyncio tasks; `function` runs on the default executor."""
+        # Imported here: only asyncio callers should pay for loading it.
+        import asyncio
+
+        with self._lock:
+            future = self._calls.get(key)
+        if future is not None:
+            return await asyncio.wrap_future(future)
+        return await asyncio.get_running_loop().run_in_executor(None, self.do, key, function)
+
+
+@contextmanager
+def file_lock(directory: str, key: str) -> Iterator[bool]:
+    """
+    Hold an exclusive cross-process lock for `key` while the block runs.
+
+    Yields True if the lock was taken, or False if it could not be (no fcntl,
+    an unwritable directory, or still held after LOCK_WAIT seconds). Then the
+    block runs unlocked, so the caller gets an answer either way.
+    """
+    if fcntl is None:
+        yield False
+        return
+    stripe = int(hashlib.sha256(key.encode()).hexdigest()[:8], 16) % LOCK_STRIPES
+    path = os.path.join(directory, f"{stripe:03x}.lock")
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    except OSError:
+        yield False
+        return
+
+    try:
+        deadline = time.monotonic() + LOCK_WAIT
+        locked = False
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                locked = True
+                break
+            except OSError:
+                if time.monotonic() >= deadline:
+                    break
+                time.sleep(LOCK_POLL_INTERVAL)
+        yield locked
+    finally:
+        os.close(fd)  # Closing the descriptor releases the lock.
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped snapshot of the offline corpus for single-document lookups.
+
+The per-subtype corpus files are gzip-compressed JSON Lines, which suit
+syncing and indexing but must be decompressed from the start to find one
+document. The snapshot holds every synced subtype in one file laid out for
+random access:
+
+    header       HEADER: magic, version, counts and offsets of the parts below
+    blocks       zlib-compressed runs of JSON documents, about BLOCK_SIZE each
+    meta         JSON: subtype names and the corpus files they were built from
+    block table  BLOCK per block: file offset, compressed and raw length
+    entry table  ENTRY per document, sorted by (subtype, id): block and range
+
+The file is opened with mmap and never read as a whole. A lookup binary
+searches the fixed-width entry table in place and decompresses the one
+block holding the document, so it costs the same for any corpus size.
+
+The snapshot is built by sync.py (and for bundles), never while answering a
+lookup: a subtype whose corpus file has changed since the snapshot was
+built, or a corpus without a snapshot, is read from its corpus file
+instead until the next sync. A bundled corpus (see bundle.py) carries its
+own snapshot, which is read in place from the bundle.
+
+A snapshot replaced in a long-lived process is closed once the lookups
+still using it have finished.
+
+This module is shared by the wordpress-handbook and wordpress-code-reference
+skills and must be kept identical in both skill directories.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+
+import corpus
+
+MAGIC = b"WPSNAP\x00\x01"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_NAME = "corpus.snap"
+
+# Raw bytes of documents packed into one compressed block.
+BLOCK_SIZE = 32 * 1024
+COMPRESSION_LEVEL = 6
+
+# magic, version, entry count, block count, meta offset, meta length,
+# block table offset, entry table offset
+HEADER = struct.Struct("<8sIIIQIQQ")
+# file offset, compressed length, raw length
+BLOCK = struct.Struct("<QII")
+# subtype number, document ID, block number, offset and length in the block
+ENTRY = struct.Struct("<HIIII")
+
+# Open snapshots, keyed by path, so a long-lived process maps each file once.
+_loaded: dict[str, "Snapshot"] = {}
+_lock = threading.Lock()
+
+
+def snapshot_path(directory: str | None = None) -> str:
+    return os.path.join(directory or corpus.default_corpus_dir(), SNAPSHOT_NAME)
+
+
+def _stamp(path: str) -> list[int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _synced_subtypes(directory: str) -> list[str]:
+    suffix = ".jsonl.gz"
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    return sorted(name[:-len(suffix)] for name in names if name.endswith(suffix))
+
+
+class Snapshot:
+    """A read-only, memory-mapped corpus snapshot."""
+
+    def __init__(self, path: str, buffer=None):
+        # `buffer` is the snapshot's bytes when it is read in place from a
+        # bundle (see bundle.py); otherwise the file at `path` is mapped.
+        if buffer is None:
+            with open(path, "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.mm = buffer
+        (magic, version, self.entry_count, self.block_count, meta_offset, meta_length,
+         self.blocks_offset, self.entries_offset) = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != SNAPSHOT_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a corpus snapshot of version {SNAPSHOT_VERSION}")
+        meta = json.loads(bytes(self.mm[meta_offset:meta_offset + meta_length]))
+        self.subtypes: list[str] = meta["subtypes"]
+        self.sources: dict[str, list[int]] = meta["sources"]
+        self.numbers = {subtype: number for number, subtype in enumerate(self.subtypes)}
+        self.stamp = _stamp(path)
+        # The most recently decompressed block, reused by batch lookups.
+        self._block: tuple[int, bytes] = (-1, b"")
+        # Lookups in progress, and whether a newer snapshot has replaced
+        # this one; both are guarded by _lock (see _reading).
+        self.readers = 0
+        self.retired = False
+
+    def close(self) -> None:
+        if isinstance(self.mm, mmap.mmap):
+            self.mm.close()
+
+    def is_current(self, subtype: str, directory: str) -> bool:
+        """Return True if the snapshot holds the subtype's current corpus file."""
+        return self.sources.get(subtype) == _stamp(corpus.data_path(directory, subtype))
+
+    def _find(self, number: int, doc_id: int) -> tuple[int, int, int] | None:
+        key = (number, doc_id)
+        lo, hi = 0, self.entry_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            entry = ENTRY.unpack_from(self.mm, self.entries_offset + mid * ENTRY.size)
+            if entry[:2] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == self.entry_count:
+            return None
+        entry = ENTRY.unpack_from(self.mm, self.entries_offset + lo * ENTRY.size)
+        return entry[2:] if entry[:2] == key else None
+
+    def _read_block(self, block: int) -> bytes:
+        cached_block, raw = self._block
+        if cached_block == block:
+            return raw
+        offset, length, _raw_length = BLOCK.unpack_from(self.mm, self.blocks_offset + block * BLOCK.size)
+        with memoryview(self.mm) as view:
+            raw = zlib.decompress(view[offset:offset + length])
+        self._block = (block, raw)
+        return raw
+
+    def get(self, subtype: str, doc_id: int) -> dict | None:
+        """Return one document in API shape, or None if it is not in the snapshot."""
+        number = self.numbers.get(subtype)
+        if number is None:
+            return None
+        found = self._find(number, doc_id)
+        if found is None:
+            return None
+        block, start, length = found
+        return json.loads(self._read_block(block)[start:start + length])
+
+
+def build(directory: str | None = None) -> Snapshot:
+    """Write a snapshot of every synced subtype, replacing any previous one."""
+    directory = directory or corpus.default_corpus_dir()
+    path = snapshot_path(directory)
+    subtypes = _synced_subtypes(directory)
+
+    def write(tmp_path):
+        entries = []
+        blocks = []
+        sources = {}
+        with open(tmp_path, "wb") as f:
+            f.write(b"\0" * HEADER.size)
+            pending = bytearray()
+            pending_entries = []
+
+            def flush():
+                if not pending:
+                    return
+                compressed = zlib.compress(bytes(pending), COMPRESSION_LEVEL)
+                block = len(blocks)
+                blocks.append((f.tell(), len(compressed), len(pending)))
+                f.write(compressed)
+                entries.extend(
+                    (number, doc_id, block, start, length)
+                    for number, doc_id, start, length in pending_entries
+                )
+                pending.clear()
+                pending_entries.clear()
+
+            for number, subtype in enumerate(subtypes):
+                # Stamp before reading, so a sync racing with the build
+                # leaves the snapshot looking stale rather than current.
+                sources[subtype] = _stamp(corpus.data_path(directory, subtype))
+                for document in corpus.iter_documents(subtype, directory):
+                    data = json.dumps(document, separators=(",", ":")).encode("utf-8")
+                    pending_entries.append((number, document["id"], len(pending), len(data)))
+                    pending.extend(data)
+                    if len(pending) >= BLOCK_SIZE:
+                        flush()
+            flush()
+
+            meta = json.dumps({"subtypes": subtypes, "sources": sources}).encode("utf-8")
+            meta_offset = f.tell()
+            f.write(meta)
+            blocks_offset = f.tell()
+            for block in blocks:
+                f.write(BLOCK.pack(*block))
+            entries.sort()
+            entries_offset = f.tell()
+            for entry in entries:
+                f.write(ENTRY.pack(*entry))
+
+            f.seek(0)
+            f.write(HEADER.pack(
+                MAGIC, SNAPSHOT_VERSION, len(entries), len(blocks),
+                meta_offset, len(meta), blocks_offset, entries_offset,
+            ))
+
+    corpus.write_atomic(path, write)
+    with _lock:
+        _replace(path, None)
+    return load(directory, rebuild=False)
+
+
+def _replace(key: str, snapshot: Snapshot | None) -> None:
+    """Cache `snapshot` under `key` (or drop the entry), retiring the one it replaces; hold _lock."""
+    old = _loaded.pop(key, None)
+    if snapshot is not None:
+        _loaded[key] = snapshot
+    if old is not None and old is not snapshot:
+        old.retired = True
+        if not old.readers:
+            old.close()
+
+
+def load(directory: str | None = None, rebuild: bool = True) -> Snapshot:
+    """Return the snapshot of a corpus directory, building it if it is missing."""
+    directory = directory or corpus.default_corpus_dir()
+    path = snapshot_path(directory)
+    stamp = _stamp(path)
+    with _lock:
+        snapshot = _loaded.get(path)
+        if snapshot is not None and snapshot.stamp == stamp:
+            return snapshot
+    if stamp is None:
+        if not rebuild:
+            raise RuntimeError(f"Corpus snapshot {path} not found")
+        return build(directory)
+    try:
+        snapshot = Snapshot(path)
+    except ValueError:
+        if not rebuild:
+            raise
+        return build(directory)
+    with _lock:
+        _replace(path, snapshot)
+    return snapshot
+
+
+def _bundled(packed) -> Snapshot:
+    key = f"{packed.path}!{SNAPSHOT_NAME}"
+    with _lock:
+        snapshot = _loaded.get(key)
+        if snapshot is not None and snapshot.stamp == packed.stamp:
+            return snapshot
+    data = packed.member(SNAPSHOT_NAME)
+    if data is None:
+        raise RuntimeError(f"Corpus bundle {packed.path} has no {SNAPSHOT_NAME}")
+    snapshot = Snapshot(key, data)
+    snapshot.stamp = packed.stamp
+    with _lock:
+        _replace(key, snapshot)
+    return snapshot
+
+
+def _current(subtype: str, directory: str | None) -> Snapshot | None:
+    """Return the snapshot holding the subtype's current corpus file, or None if there is none."""
+    packed = corpus.bundled(subtype, directory)
+    if packed is not None:
+        return _bundled(packed)
+    directory = directory or corpus.default_corpus_dir()
+    if not os.path.exists(corpus.data_path(directory, subtype)):
+        raise RuntimeError(
+            f"Offline corpus for {subtype} not found. Run sync.py to download it."
+        )
+    try:
+        snapshot = load(directory, rebuild=False)
+    except (RuntimeError, ValueError):
+        return None
+    return snapshot if snapshot.is_current(subtype, directory) else None
+
+
+@contextmanager
+def _reading(subtype: str, directory: str | None) -> Iterator[Snapshot | None]:
+    """Hold the subtype's current snapshot open while the block runs."""
+    while True:
+        snapshot = _current(subtype, directory)
+        if snapshot is None:
+            break
+        with _lock:
+            # A snapshot retired since _current returned it may be closed already.
+            if not snapshot.retired:
+                snapshot.readers += 1
+                break
+    if snapshot is None:
+        yield None
+        return
+    try:
+        yield snapshot
+    finally:
+        with _lock:
+            snapshot.readers -= 1
+            if snapshot.retired and not snapshot.readers:
+                snapshot.close()
+
+
+def get_documents(subtype: str, doc_ids: Iterable[int], directory: str | None = None) -> dict[int, dict]:
+    """Return the stored documents of one subtype for the given IDs, keyed by ID."""
+    with _reading(subtype, directory) as snapshot:
+        if snapshot is None:
+            return corpus.get_documents(subtype, doc_ids, directory)
+        found = {}
+        # In ID order, neighbouring documents come out of the same block.
+        for doc_id in sorted(set(doc_ids)):
+            document = snapshot.get(subtype, doc_id)
+            if document is not None:
+                found[doc_id] = document
+        return found
+
+
+def get_document(subtype: str, doc_id: int, directory: str | None = None) -> dict | None:
+    """Return one stored document in API shape, or None if it is not in the corpus."""
+    return get_documents(subtype, [doc_id], directory).get(doc_id)
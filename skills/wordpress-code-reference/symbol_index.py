@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Identifier lookup over WordPress Code Reference names.
+
+Function, hook, class and method names from the offline corpus are
+normalized (lowercased, trailing "()" removed) and kept in one sorted list.
+A query is matched, in order of preference, as:
+
+    exact   - the whole name
+    prefix  - the start of a name (binary search over the sorted list)
+    segment - every `_`/`::` separated part appears in the name
+              (e.g. "get_posts" finds "WP_Query::get_posts")
+    fuzzy   - within a small edit distance (e.g. "add_acton" finds
+              "add_action"), using trigram candidates of similar length
+              verified with a bounded Levenshtein distance
+
+The index is stored next to the corpus, in the index file format of
+search_index.py, and rebuilt when any code reference
+subtype has been synced since it was written. When no code reference subtype
+has been synced, the prebuilt index of a bundled corpus (see bundle.py) is
+used instead.
+"""
+
+from __future__ import annotations
+
+import bisect
+import heapq
+import itertools
+import os
+import re
+from array import array
+from collections import Counter
+
+import bundle
+import corpus
+from search_index import read_index_file, write_index_file
+
+INDEX_VERSION = 3
+INDEX_NAME = "code-reference.sym"
+
+CODE_REF_SUBTYPES = [
+    "wp-parser-function",
+    "wp-parser-hook",
+    "wp-parser-class",
+    "wp-parser-method",
+]
+
+_SEGMENT_RE = re.compile(r"[a-z0-9$]+")
+
+_loaded: dict[str, "SymbolIndex"] = {}
+
+
+def normalize(name: str) -> str:
+    """Normalize an identifier for matching: lowercase, no trailing "()"."""
+    name = name.strip().lower()
+    if name.endswith("()"):
+        name = name[:-2]
+    return name
+
+
+def segments(name: str) -> list[str]:
+    """Split a normalized name on `_`, `::` and other separators."""
+    return _SEGMENT_RE.findall(name)
+
+
+def trigrams(name: str) -> set:
+    """Return the trigrams of a name, padded so its first and last characters count."""
+    padded = f"\0{name}\0"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _trigram_key(trigram: str, length: int) -> str:
+    return f"{length}:{trigram}"
+
+
+def max_distance(query: str) -> int:
+    """Edit distance allowed for fuzzy matches of a query."""
+    return 1 if len(query) <= 5 else 2
+
+
+def bounded_distance(a: str, b: str, bound: int) -> int | None:
+    """Return the Levenshtein distance of a and b, or None if it exceeds bound."""
+    if abs(len(a) - len(b)) > bound:
+        return None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            ))
+        if min(current) > bound:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= bound else None
+
+
+class Postings:
+    """Position lists of many keys, stored back to back in one array."""
+
+    def __init__(self, data: dict):
+        self.spans = data["spans"]
+        self.positions = array("I", data["positions"])
+
+    @classmethod
+    def pack(cls, postings: dict[str, array]) -> dict:
+        spans = {}
+        positions = array("I")
+        for key, value in postings.items():
+            spans[key] = [len(positions), len(value)]
+            positions.extend(value)
+        return {"spans": spans, "positions": positions.tobytes()}
+
+    def dump(self) -> dict:
+        return {"spans": self.spans, "positions": self.positions.tobytes()}
+
+    def get(self, key: str, default=None):
+        span = self.spans.get(key)
+        if span is None:
+            return default
+        return self.positions[span[0]:span[0] + span[1]]
+
+
+class SymbolIndex:
+    """Sorted identifier names with segment and trigram postings."""
+
+    def __init__(self, data: dict):
+        self.names = data["names"]
+        self.subtypes = data["subtypes"]
+        self.entry_subtypes = array("B", data["entry_subtypes"])
+        self.doc_ids = array("I", data["doc_ids"])
+        self.titles = data["titles"]
+        self.urls = data["urls"]
+        self.segments = Postings(data["segments"])
+        self.trigrams = Postings(data["trigrams"])
+        self.mtime = None
+
+    @classmethod
+    def build(cls, subtypes: list[str], directory: str | None = None) -> "SymbolIndex":
+        """Build the index from the corpus files of the given subtypes."""
+        entries = []
+        for subtype_number, subtype in enumerate(subtypes):
+            for document in corpus.iter_documents(subtype, directory):
+                title = document.get("title") or {}
+                title = title.get("rendered", "") if isinstance(title, dict) else str(title)
+                entries.append((normalize(title), subtype_number, document["id"], title, document.get("link", "")))
+        entries.sort()
+
+        segment_postings: dict[str, array] = {}
+        trigram_postings: dict[str, array] = {}
+        for position, entry in enumerate(entries):
+            for segment in set(segments(entry[0])):
+                segment_postings.setdefault(segment, array("I")).append(position)
+            length = len(entry[0])
+            for trigram in trigrams(entry[0]):
+                trigram_postings.setdefault(_trigram_key(trigram, length), array("I")).append(position)
+
+        return cls({
+            "names": [entry[0] for entry in entries],
+            "subtypes": list(subtypes),
+            "entry_subtypes": array("B", [entry[1] for entry in entries]).tobytes(),
+            "doc_ids": array("I", [entry[2] for entry in entries]).tobytes(),
+            "titles": [entry[3] for entry in entries],
+            "urls": [entry[4] for entry in entries],
+            "segments": Postings.pack(segment_postings),
+            "trigrams": Postings.pack(trigram_postings),
+        })
+
+    def dump(self) -> dict:
+        return {
+            "version": INDEX_VERSION,
+            "names": self.names,
+            "subtypes": self.subtypes,
+            "entry_subtypes": self.entry_subtypes.tobytes(),
+            "doc_ids": self.doc_ids.tobytes(),
+            "titles": self.titles,
+            "urls": self.urls,
+            "segments": self.segments.dump(),
+            "trigrams": self.trigrams.dump(),
+        }
+
+    def _record(self, position: int, match: str, distance: int = 0) -> dict:
+        return {
+            "id": self.doc_ids[position],
+            "title": self.titles[position],
+            "url": self.urls[position],
+            "subtype": self.subtypes[self.entry_subtypes[position]],
+            "match": match,
+            "distance": distance,
+        }
+
+    def lookup(self, query: str, subtypes: list[str], limit: int) -> list[dict]:
+        """Return up to `limit` matches for an identifier, best first."""
+        query = normalize(query)
+        if not query or limit < 1:
+            return []
+        allowed = {self.subtypes.index(s) for s in subtypes if s in self.subtypes}
+        seen = set()
+        results = []
+
+        def add(position, match, distance=0):
+            if position in seen or self.entry_subtypes[position] not in allowed:
+                return False
+            seen.add(position)
+            results.append(self._record(position, match, distance))
+            return len(results) >= limit
+
+        # Exact and prefix matches form one contiguous run of the sorted names.
+        # Two binary searches find it with about log2(n) string comparisons,
+        # which run in C; a trie would be O(len) but walked in Python and
+        # stored and loaded with every index.
+        start = bisect.bisect_left(self.names, query)
+        end = bisect.bisect_left(self.names, query + "\uffff", start)
+        position = start
+        while position < end and self.names[position] == query:
+            if add(position, "exact"):
+                return results
+            position += 1
+        for position in range(start, end):
+            if add(position, "prefix"):
+                return results
+
+        # Segment matches: names containing every query segment.
+        query_segments = set(segments(query))
+        postings = [self.segments.get(segment) for segment in query_segments]
+        if postings and all(p is not None for p in postings):
+            postings.sort(key=len)
+            # Filter before keeping the shortest names, or names of other
+            # subtypes could take every place.
+            candidates = [
+                position for position in set(postings[0]).intersection(*postings[1:])
+                if position not in seen and self.entry_subtypes[position] in allowed
+            ]
+            wanted = limit - len(results)
+            for position in heapq.nsmallest(wanted, candidates, key=lambda p: (len(self.names[p]), p)):
+                if add(position, "segment"):
+                    return results
+
+        # Fuzzy matches, widening the allowed distance one edit at a time so
+        # the common single-typo case only verifies a handful of candidates.
+        for bound in range(1, max_distance(query) + 1):
+            for distance, _length, position in self._fuzzy(query, bound, seen):
+                if add(position, "fuzzy", distance):
+                    return results
+        return results
+
+    def _fuzzy(self, query: str, bound: int, seen: set) -> list[tuple]:
+        """Return sorted (distance, length, position) for names within bound edits."""
+        # An edit removes at most three trigrams, so a name within distance k
+        # shares all but 3k of the query's trigrams. Postings are split by
+        # name length, so only names of a compatible length are counted.
+        query_trigrams = trigrams(query)
+        needed = max(1, len(query_trigrams) - 3 * bound)
+        counts = Counter(itertools.chain.from_iterable(
+            self.trigrams.get(_trigram_key(trigram, length), ())
+            for trigram in query_trigrams
+            for length in range(len(query) - bound, len(query) + bound + 1)
+        ))
+        matches = []
+        for position, count in counts.items():
+            if count < needed or position in seen:
+                continue
+            distance = bounded_distance(query, self.names[position], bound)
+            if distance is not None:
+                matches.append((distance, len(self.names[position]), position))
+        return sorted(matches)
+
+
+def _index_path(directory: str) -> str:
+    return os.path.join(directory, INDEX_NAME)
+
+
+def _synced_subtypes(directory: str) -> list[str]:
+    return [s for s in CODE_REF_SUBTYPES if os.path.exists(corpus.data_path(directory, s))]
+
+
+def build_index(directory: str | None = None) -> SymbolIndex:
+    """Build and store the identifier index from every synced code reference subtype."""
+    directory = directory or corpus.default_corpus_dir()
+    subtypes = _synced_subtypes(directory)
+    if not subtypes:
+        raise RuntimeError("Offline corpus for code reference not found. Run sync.py to download it.")
+    index = SymbolIndex.build(subtypes, directory)
+    path = _index_path(directory)
+    write_index_file(path, index.dump())
+    index.mtime = os.stat(path).st_mtime
+    _loaded[path] = index
+    return index
+
+
+def _load_bundled(packed) -> SymbolIndex:
+    key = f"{packed.path}!{INDEX_NAME}"
+    index = _loaded.get(key)
+    if index is not None and index.mtime == packed.stamp:
+        return index
+    data = packed.member(INDEX_NAME)
+    data = read_index_file(data) if data is not None else None
+    if data is None or data.get("version") != INDEX_VERSION:
+        raise RuntimeError(f"Corpus bundle {packed.path} has no usable {INDEX_NAME}")
+    index = SymbolIndex(data)
+    index.mtime = packed.stamp
+    _loaded[key] = index
+    return index
+
+
+def load_index(directory: str | None = None) -> SymbolIndex:
+    """Return the identifier index, rebuilding it if it is missing or stale."""
+    if directory is None and not _synced_subtypes(corpus.default_corpus_dir()):
+        packed = bundle.find(INDEX_NAME)
+        if packed is not None:
+            return _load_bundled(packed)
+    directory = directory or corpus.default_corpus_dir()
+    path = _index_path(directory)
+    try:
+        index_mtime = os.stat(path).st_mtime
+    except OSError:
+        return build_index(directory)
+
+    subtypes = _synced_subtypes(directory)
+    newest = max((os.stat(corpus.data_path(directory, s)).st_mtime for s in subtypes), default=0)
+    if newest > index_mtime:
+        return build_index(directory)
+
+    index = _loaded.get(path)
+    if index is not None and index.mtime == index_mtime:
+        return index
+
+    with open(path, "rb") as f:
+        data = read_index_file(f.read())
+    if data is None or data.get("version") != INDEX_VERSION or data["subtypes"] != subtypes:
+        return build_index(directory)
+    index = SymbolIndex(data)
+    index.mtime = index_mtime
+    _loaded[path] = index
+    return index
+
+
+def lookup(query: str, subtypes: list[str], limit: int, directory: str | None = None) -> list[dict]:
+    """Look up an identifier in the offline corpus; see SymbolIndex.lookup."""
+    return load_index(directory).lookup(query, subtypes, limit)
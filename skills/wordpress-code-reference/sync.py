@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Download WordPress Code Reference entries into the local offline corpus.
+
+Usage: python3 sync.py [subtypes] [--workers N] [--full] [--bundle]
+
+Arguments:
+    subtypes - Comma-separated list of code reference types (default: all)
+    --workers - Subtypes synced concurrently (default: 4)
+    --full    - Download everything again instead of only changes
+    --bundle  - Also write corpus.zip, a prebuilt corpus shipped with the skill
+
+The first sync of a subtype downloads every document. Later syncs only fetch
+documents modified since the last one and drop documents deleted upstream.
+
+After a sync, search.py and get_content.py answer without the network when
+run with --offline (or with WP_SKILLS_OFFLINE=1).
+
+With --bundle, the synced subtypes are also written to corpus.zip in the
+skill directory, with their search indexes, snapshot and link graph
+prebuilt (see bundle.py). tools/package_skill.py --with-corpus ships it in
+the .skill archive, so an installed skill works offline without syncing.
+
+Example:
+    python3 sync.py "wp-parser-function,wp-parser-hook"
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import bundle
+import corpus
+import link_graph
+import search_index
+import snapshot
+import sqlite_store
+import symbol_index
+
+API_BASE_URL = "https://developer.wordpress.org/wp-json/wp/v2"
+REQUEST_TIMEOUT = 30
+SYNC_WORKERS = 4
+
+CODE_REF_SUBTYPES = [
+    "wp-parser-function",
+    "wp-parser-hook",
+    "wp-parser-class",
+    "wp-parser-method",
+]
+
+
+def sync_code_reference(subtypes=None, workers: int = SYNC_WORKERS, full: bool = False) -> list:
+    """Sync code reference subtypes into the corpus and return their metadata."""
+    subtypes = subtypes or CODE_REF_SUBTYPES
+    invalid = [s for s in subtypes if s not in CODE_REF_SUBTYPES]
+    if invalid:
+        raise ValueError(
+            f"Invalid subtypes: {', '.join(invalid)}. "
+            f"Valid: {', '.join(CODE_REF_SUBTYPES)}"
+        )
+
+    def sync_one(subtype):
+        print(f"Syncing {subtype}...", file=sys.stderr)
+        metadata = corpus.sync_subtype(API_BASE_URL, subtype, timeout=REQUEST_TIMEOUT, full=full)
+        search_index.build_index(subtype)
+        if corpus.default_backend() == "sqlite":
+            sqlite_store.import_subtype(subtype)
+        return metadata
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = list(executor.map(sync_one, subtypes))
+    symbol_index.build_index()
+    if corpus.default_backend() == "index":
+        snapshot.build()
+    link_graph.build()
+    return results
+
+
+def bundle_code_reference(subtypes=None) -> dict:
+    """
+    Write the synced subtypes, with prebuilt indexes, snapshot and link
+    graph, to corpus.zip.
+
+    The bundle is assembled in a temporary directory, so the indexes,
+    snapshot and link graph cover exactly these subtypes whatever else the
+    corpus holds.
+    """
+    subtypes = subtypes or CODE_REF_SUBTYPES
+    source = corpus.default_corpus_dir()
+    with tempfile.TemporaryDirectory() as directory:
+        for subtype in subtypes:
+            data_path = corpus.data_path(source, subtype)
+            if not os.path.exists(data_path):
+                raise RuntimeError(f"Offline corpus for {subtype} not found. Run sync.py to download it.")
+            shutil.copy2(data_path, directory)
+            shutil.copy2(os.path.join(source, f"{subtype}.json"), directory)
+            search_index.build_index(subtype, directory)
+        snapshot.build(directory)
+        link_graph.build(directory)
+        symbol_index.build_index(directory)
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), bundle.BUNDLE_NAME)
+        return bundle.write(directory, path)
+
+
+def main():
+    args = sys.argv[1:]
+
+    full = "--full" in args
+    if full:
+        args.remove("--full")
+
+    write_bundle = "--bundle" in args
+    if write_bundle:
+        args.remove("--bundle")
+
+    workers = SYNC_WORKERS
+    if "--workers" in args:
+        index = args.index("--workers")
+        try:
+            workers = int(args[index + 1])
+        except (IndexError, ValueError):
+            print("Error: --workers must be a number", file=sys.stderr)
+            sys.exit(1)
+        del args[index:index + 2]
+
+    subtypes = [s.strip() for s in args[0].split(",")] if args else None
+
+    try:
+        results = sync_code_reference(subtypes, workers, full)
+        if write_bundle:
+            results = {"synced": results, "bundle": bundle_code_reference(subtypes)}
+        print(json.dumps(results, indent=2))
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
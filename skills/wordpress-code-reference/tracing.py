@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Opt-in tracing of the fetch, decode and convert stages.
+
+When tracing is on, the scripts emit one event per stage:
+
+    connect - a new connection was opened (DNS, TCP and TLS)
+    ttfb    - time from sending a request to receiving the response headers
+    body    - reading the body, with wire and decoded byte counts
+    cache   - a response cache lookup: hit, miss, revalidated, stale, or
+              coalesced (answered by another process's request)
+    decode  - json.loads of a response body
+    convert - html_to_markdown / html_to_text
+
+Each event is a dict with "event", "ts" (time.monotonic() when the stage
+ended), "duration_ms" where it applies, and stage-specific fields such as
+"url" and "bytes".
+Events go to every registered listener: WP_SKILLS_TRACE installs one that
+writes JSON Lines to stderr or a file, and add_listener() takes any callable.
+
+Call sites check the module-level `enabled` flag before taking any timings,
+so tracing costs one attribute lookup per stage while it is off.
+
+This module is shared by the wordpress-handbook and wordpress-code-reference
+skills and must be kept identical in both skill directories.
+
+Environment:
+    WP_SKILLS_TRACE - "stderr" to print events, or a file path to append them to
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import os
+import sys
+import threading
+import time
+from collections.abc import Callable
+
+# True while at least one listener is registered.
+enabled = False
+
+_listeners: list[Callable[[dict], None]] = []
+_lock = threading.Lock()
+
+
+def add_listener(listener: Callable[[dict], None]) -> None:
+    """Register a callable that receives every trace event."""
+    global enabled
+    with _lock:
+        _listeners.append(listener)
+        enabled = True
+
+
+def remove_listener(listener: Callable[[dict], None]) -> None:
+    """Unregister a listener; tracing turns off with the last one."""
+    global enabled
+    with _lock:
+        if listener in _listeners:
+            _listeners.remove(listener)
+        enabled = bool(_listeners)
+
+
+def emit(event: str, duration: float | None = None, **fields) -> None:
+    """Send an event to the listeners; `duration` is in seconds."""
+    record = {"event": event, "ts": round(time.monotonic(), 6)}
+    if duration is not None:
+        record["duration_ms"] = round(duration * 1000, 3)
+    record.update(fields)
+    for listener in list(_listeners):
+        try:
+            listener(record)
+        except Exception:
+            pass  # A broken listener must not break the lookup being traced.
+
+
+class JsonLinesWriter:
+    """A listener that writes each event as one JSON line."""
+
+    def __init__(self, stream: io.TextIOBase):
+        self.stream = stream
+        self.lock = threading.Lock()
+
+    def __call__(self, record: dict) -> None:
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self.lock:
+            self.stream.write(line)
+            self.stream.flush()
+
+
+def _configure_from_env() -> None:
+    target = os.environ.get("WP_SKILLS_TRACE", "").strip()
+    if not target or target.lower() in ("0", "false", "no"):
+        return
+    if target.lower() in ("1", "true", "yes", "stderr"):
+        add_listener(JsonLinesWriter(sys.stderr))
+        return
+    try:
+        stream = open(target, "a", encoding="utf-8")
+    except OSError as e:
+        print(f"Warning: cannot open trace file {target}: {e}", file=sys.stderr)
+        return
+    add_listener(JsonLinesWriter(stream))
+
+
+_configure_from_env()
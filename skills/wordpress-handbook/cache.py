@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+On-disk response cache for the WordPress REST API.
+
+Responses are keyed on the normalized request URL and stored as one JSON file
+per entry. Each entry keeps the ETag/Last-Modified validators sent by the
+server, so an expired entry is revalidated with a conditional GET instead of
+being downloaded again. Once the directory grows past its size cap, the least
+recently used entries are removed first. A running total of the entries'
+size is kept in SIZE_NAME, so storing an entry does not walk the cache; the
+directory is only walked when the total passes the cap, or to recount it.
+
+Identical requests made at the same time are coalesced (see singleflight.py).
+Within a process, threads and asyncio tasks share one upstream call. Across
+processes using the same cache directory, one process fetches an expired URL
+and the others wait for it and read the entry it stored.
+
+A fresh entry is returned before any of that machinery is loaded: the HTTP
+client, singleflight and urllib.error are imported on the first request
+that has to reach the server, so a cache hit costs a file read and little
+else.
+
+This module is shared by the wordpress-handbook and wordpress-code-reference
+skills and must be kept identical in both skill directories.
+
+Environment:
+    WP_SKILLS_CACHE         - Set to "0" to disable the cache
+    WP_SKILLS_CACHE_DIR     - Cache directory (default: ~/.cache/wordpress-skills)
+    WP_SKILLS_CACHE_MAX_MB  - Size cap in megabytes (default: 64)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.parse
+
+import tracing
+
+REQUEST_TIMEOUT = 10
+
+# Seconds an entry is served without revalidation, per endpoint kind.
+ENDPOINT_TTLS = {
+    "search": 60 * 60,
+    "document": 24 * 60 * 60,
+}
+
+# Response headers kept alongside the body.
+STORED_HEADERS = ["ETag", "Last-Modified", "X-WP-Total", "X-WP-TotalPages"]
+
+# Fraction of the size cap to shrink to once eviction kicks in.
+EVICTION_TARGET = 0.9
+
+# Running byte total of the stored entries, next to the responses directory.
+SIZE_NAME = "responses.size"
+
+
+def default_cache_dir() -> str:
+    """Return the cache directory, honouring WP_SKILLS_CACHE_DIR and XDG_CACHE_HOME."""
+    configured = os.environ.get("WP_SKILLS_CACHE_DIR")
+    if configured:
+        return configured
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "wordpress-skills")
+
+
+def cache_enabled() -> bool:
+    """Return False when the cache has been switched off via WP_SKILLS_CACHE=0."""
+    return os.environ.get("WP_SKILLS_CACHE", "1").lower() not in ("0", "false", "no")
+
+
+def normalize_url(url: str) -> str:
+    """Normalize a request URL so equivalent requests share one cache entry."""
+    parts = urllib.parse.urlsplit(url)
+    query = urllib.parse.urlencode(
+        sorted(urllib.parse.parse_qsl(parts.query, keep_blank_values=True))
+    )
+    return urllib.parse.urlunsplit(
+        (parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", query, "")
+    )
+
+
+class ResponseCache:
+    """A size-capped, LRU-evicted store of API responses on disk."""
+
+    def __init__(self, directory: str | None = None, max_bytes: int | None = None):
+        self.directory = os.path.join(directory or default_cache_dir(), "responses")
+        self.lock_directory = os.path.join(directory or default_cache_dir(), "locks")
+        self.size_path = os.path.join(directory or default_cache_dir(), SIZE_NAME)
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get("WP_SKILLS_CACHE_MAX_MB", "64")) * 1024 * 1024)
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest + ".json")
+
+    def get(self, key: str) -> dict | None:
+        """Return the stored entry for a normalized URL, or None."""
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("url") != key:
+            return None
+        # Reading an entry counts as a use for LRU purposes.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key: str, body: str, headers: dict) -> dict:
+        """
+        Store a response body with its validators and return the new entry.
+
+        A cache that cannot be written (a missing or read-only directory, a
+        full disk) is skipped: the entry is still returned, just not stored.
+        """
+        entry = {
+            "url": key,
+            "stored_at": time.time(),
+            "headers": {k: v for k, v in headers.items() if v is not None},
+            "body": body,
+        }
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, separators=(",", ":"))
+            try:
+                replaced = os.stat(path).st_size
+            except OSError:
+                replaced = 0
+            size = os.stat(tmp_path).st_size
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return entry
+        self._add_size(size - replaced)
+        return entry
+
+    def refresh(self, key: str, entry: dict, headers: dict) -> dict:
+        """Mark a revalidated entry as fresh again, merging updated validators."""
+        merged = dict(entry.get("headers", {}))
+        merged.update({k: v for k, v in headers.items() if v is not None})
+        return self.put(key, entry["body"], merged)
+
+    def _add_size(self, delta: int) -> None:
+        """
+        Add to the running size total, evicting once it passes the cap.
+
+        The total is read and written under an flock on the size file, so
+        concurrent writers do not lose updates. A missing or unreadable total
+        is recounted by walking the directory.
+        """
+        try:
+            import fcntl
+        except ImportError:  # Windows
+            fcntl = None
+        try:
+            with open(self.size_path, "a+", encoding="ascii") as f:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                f.seek(0)
+                stored = f.read().strip()
+                total = max(int(stored) + delta, 0) if stored.isdigit() else None
+                if total is None or total > self.max_bytes:
+                    total = self.evict()
+                f.seek(0)
+                f.truncate()
+                f.write(str(total))
+        except OSError:
+            pass  # Eviction recounts the directory, correcting the total.
+
+    def evict(self) -> int:
+        """
+        Remove least recently used entries once the cache is over its size
+        cap, down to EVICTION_TARGET of it, and return the remaining size.
+        """
+        files = []
+        total = 0
+        for root, _dirs, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+
+        if total <= self.max_bytes:
+            return total
+
+        target = self.max_bytes * EVICTION_TARGET
+        for _mtime, size, path in sorted(files):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= target:
+                break
+        return total
+
+
+def is_fresh(entry: dict, endpoint: str) -> bool:
+    """Return True if an entry is still within its endpoint's TTL."""
+    ttl = ENDPOINT_TTLS.get(endpoint, ENDPOINT_TTLS["document"])
+    return time.time() - entry.get("stored_at", 0) < ttl
+
+
+def _stored_headers(headers) -> dict:
+    return {name: headers.get(name) for name in STORED_HEADERS}
+
+
+_flights = None
+_flights_lock = threading.Lock()
+
+
+def _group():
+    """Return the process's singleflight.Group, creating it on first use."""
+    global _flights
+    with _flights_lock:
+        if _flights is None:
+            import singleflight
+            _flights = singleflight.Group()
+        return _flights
+
+
+def raise_api_error(error: OSError, not_found: str | None = None) -> None:
+    """
+    Raise the RuntimeError the scripts report for an HTTP or network error.
+
+    Returns (so the caller can re-raise) if `error` is some other OSError.
+    Callers catch OSError and use this instead of naming urllib.error's
+    classes in their except clauses, which would import urllib.error on
+    every run rather than only when a request has actually been made.
+    """
+    import urllib.error
+    if isinstance(error, urllib.error.HTTPError):
+        if error.code == 404 and not_found:
+            raise RuntimeError(not_found) from error
+        raise RuntimeError(f"HTTP error {error.code}") from error
+    if isinstance(error, urllib.error.URLError):
+        raise RuntimeError(f"Network error: {error.reason}") from error
+
+
+def _cached(url: str, key: str, endpoint: str) -> dict | None:
+    """Return the fresh cache entry for a URL, or None."""
+    if not cache_enabled():
+        return None
+    entry = ResponseCache().get(key)
+    if entry is None or not is_fresh(entry, endpoint):
+        return None
+    if tracing.enabled:
+        tracing.emit("cache", url=url, endpoint=endpoint, result="hit")
+    return entry
+
+
+def fetch(url: str, endpoint: str = "document", timeout: float = REQUEST_TIMEOUT) -> dict:
+    """
+    Fetch a URL through the response cache.
+
+    Returns the cache entry: a dict with "body" (the decoded response text)
+    and "headers". Fresh entries are served from disk, expired entries are
+    revalidated with If-None-Match/If-Modified-Since, and a stale entry is
+    served if the server cannot be reached. Concurrent calls for the same
+    URL share one request. HTTP and network errors propagate as
+    urllib.error.HTTPError and urllib.error.URLError.
+    """
+    key = normalize_url(url)
+    entry = _cached(url, key, endpoint)
+    if entry is not None:
+        return entry
+    return _group().do(key, lambda: _fetch(url, key, endpoint, timeout))
+
+
+async def fetch_async(url: str, endpoint: str = "document", timeout: float = REQUEST_TIMEOUT) -> dict:
+    """fetch() for asyncio code; shares in-flight requests with threads and other tasks."""
+    key = normalize_url(url)
+    entry = _cached(url, key, endpoint)
+    if entry is not None:
+        return entry
+    return await _group().do_async(key, lambda: _fetch(url, key, endpoint, timeout))
+
+
+def _fetch(url: str, key: str, endpoint: str, timeout: float) -> dict:
+    import http_client
+    import singleflight
+
+    if not cache_enabled():
+        response = http_client.request(url, timeout=timeout)
+        return {"body": response.text(), "headers": _stored_headers(response.headers)}
+
+    cache = ResponseCache()
+    entry = cache.get(key)
+
+    if entry is not None and is_fresh(entry, endpoint):
+        if tracing.enabled:
+            tracing.emit("cache", url=url, endpoint=endpoint, result="hit")
+        return entry
+
+    with singleflight.file_lock(cache.lock_directory, key) as locked:
+        if locked:
+            # Another process may have stored the entry while we waited.
+            current = cache.get(key)
+            if current is not None and is_fresh(current, endpoint):
+                if tracing.enabled:
+                    tracing.emit("cache", url=url, endpoint=endpoint, result="coalesced")
+                return current
+            entry = current or entry
+        return _fetch_upstream(cache, url, key, entry, endpoint, timeout)
+
+
+def _fetch_upstream(
+    cache: ResponseCache, url: str, key: str, entry: dict | None, endpoint: str, timeout: float
+) -> dict:
+    import http_client
+    import urllib.error
+
+    request_headers = {}
+    if entry is not None:
+        validators = entry.get("headers", {})
+        if validators.get("ETag"):
+            request_headers["If-None-Match"] = validators["ETag"]
+        if validators.get("Last-Modified"):
+            request_headers["If-Modified-Since"] = validators["Last-Modified"]
+
+    try:
+        response = http_client.request(url, request_headers, timeout=timeout)
+    except urllib.error.HTTPError:
+        raise
+    except urllib.error.URLError:
+        if entry is not None:
+            if tracing.enabled:
+                tracing.emit("cache", url=url, endpoint=endpoint, result="stale")
+            return entry
+        raise
+
+    headers = _stored_headers(response.headers)
+    if response.status == 304:
+        if entry is None:
+            raise urllib.error.HTTPError(url, 304, response.reason, response.headers, None)
+        if tracing.enabled:
+            tracing.emit("cache", url=url, endpoint=endpoint, result="revalidated")
+        return cache.refresh(key, entry, headers)
+    body = response.text()
+    if tracing.enabled:
+        tracing.emit("cache", url=url, endpoint=endpoint, result="miss")
+
+    return cache.put(key, body, headers)
+
+
+def fetch_json(url: str, endpoint: str = "document", timeout: float = REQUEST_TIMEOUT):
+    """Fetch a URL through the response cache and decode its JSON body."""
+    return _decode(url, fetch(url, endpoint, timeout)["body"])
+
+
+def fetch_json_page(url: str, endpoint: str = "search", timeout: float = REQUEST_TIMEOUT) -> tuple[object, int]:
+    """
+    Like fetch_json(), for one page of a paged collection.
+
+    Returns the decoded page and the total number of pages, from the
+    X-WP-TotalPages header (1 when the response has none).
+    """
+    entry = fetch(url, endpoint, timeout)
+    try:
+        total_pages = int(entry.get("headers", {}).get("X-WP-TotalPages") or 1)
+    except ValueError:
+        total_pages = 1
+    return _decode(url, entry["body"]), total_pages
+
+
+async def fetch_json_async(url: str, endpoint: str = "document", timeout: float = REQUEST_TIMEOUT):
+    """fetch_json() for asyncio code."""
+    return _decode(url, (await fetch_async(url, endpoint, timeout))["body"])
+
+
+def _decode(url: str, body: str):
+    if not tracing.enabled:
+        return json.loads(body)
+    started = time.perf_counter()
+    data = json.loads(body)
+    tracing.emit("decode", time.perf_counter() - started, url=url, chars=len(body))
+    return data
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Local mirror of WordPress handbook and code reference documents.
+
+`sync_subtype` pages through a REST API collection and stores every document
+of one subtype as gzip-compressed JSON Lines, in the same shape the API
+returns, so the skill scripts can answer without the network. Each subtype
+has its own data file and a small metadata file, so the two skills can sync
+into the same corpus directory independently.
+
+The metadata records a high-water mark (the newest `modified_gmt` seen). Later
+syncs only download documents modified after it, detect deletions by
+comparing ID lists, and merge the changes into the stored file.
+
+This module is shared by the wordpress-handbook and wordpress-code-reference
+skills and must be kept identical in both skill directories.
+
+Environment:
+    WP_SKILLS_CORPUS_DIR - Corpus directory (default: <cache dir>/corpus)
+    WP_SKILLS_OFFLINE    - Set to "1" to make the scripts answer from the corpus
+    WP_SKILLS_BACKEND    - Offline store: "index" (BM25 index and snapshot, the
+                           default) or "sqlite" (see sqlite_store.py)
+"""
+
+from __future__ import annotations
+
+import datetime
+import gzip
+import json
+import os
+import time
+import urllib.parse
+from collections.abc import Callable, Iterable, Iterator
+
+from cache import default_cache_dir
+
+# Documents per collection request (the REST API's per_page cap).
+SYNC_PAGE_SIZE = 100
+
+SYNC_FIELDS = "id,title,link,content,excerpt,modified_gmt,wp-parser-since,wp-parser-source-file"
+
+FORMAT_VERSION = 1
+
+# Stores offline searches and lookups can be answered from.
+BACKENDS = ("index", "sqlite")
+
+# How far before the high-water mark a delta sync starts. The REST API
+# compares `modified_after` against the site-local modification time, so the
+# overlap absorbs any difference between the site timezone and GMT.
+SYNC_OVERLAP = datetime.timedelta(days=1)
+
+
+def default_corpus_dir() -> str:
+    """Return the corpus directory, honouring WP_SKILLS_CORPUS_DIR."""
+    return os.environ.get("WP_SKILLS_CORPUS_DIR") or os.path.join(
+        default_cache_dir(), "corpus"
+    )
+
+
+def offline_default() -> bool:
+    """Return True when WP_SKILLS_OFFLINE asks for offline answers by default."""
+    return os.environ.get("WP_SKILLS_OFFLINE", "0").lower() in ("1", "true", "yes")
+
+
+def default_backend() -> str:
+    """Return the offline store named by WP_SKILLS_BACKEND."""
+    backend = (os.environ.get("WP_SKILLS_BACKEND") or "index").lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Invalid WP_SKILLS_BACKEND: {backend}. Valid: {', '.join(BACKENDS)}")
+    return backend
+
+
+def data_path(directory: str, subtype: str) -> str:
+    return os.path.join(directory, f"{subtype}.jsonl.gz")
+
+
+def _meta_path(directory: str, subtype: str) -> str:
+    return os.path.join(directory, f"{subtype}.json")
+
+
+def read_metadata(subtype: str, directory: str | None = None) -> dict | None:
+    """Return the sync metadata for a subtype, or None if it was never synced."""
+    try:
+        with open(_meta_path(directory or default_corpus_dir(), subtype), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_atomic(path: str, write: Callable) -> None:
+    """Write a file through `write(tmp_path)` and move it into place atomically."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _dump_json(path: str, data: dict) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
+def write_subtype(subtype: str, documents: Iterable[dict], directory: str | None = None, **metadata) -> int:
+    """
+    Replace the stored documents of a subtype and return how many were written.
+
+    The newest `modified_gmt` among the documents is recorded in the metadata
+    as the subtype's high-water mark.
+    """
+    directory = directory or default_corpus_dir()
+    os.makedirs(directory, exist_ok=True)
+    count = 0
+    high_water = ""
+
+    def write_data(path):
+        nonlocal count, high_water
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            for document in documents:
+                f.write(json.dumps(document, separators=(",", ":")))
+                f.write("\n")
+                count += 1
+                high_water = max(high_water, document.get("modified_gmt") or "")
+
+    def write_meta(path):
+        _dump_json(path, {
+            "format": FORMAT_VERSION,
+            "subtype": subtype,
+            "count": count,
+            "high_water": high_water or None,
+            "synced_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            **metadata,
+        })
+
+    write_atomic(data_path(directory, subtype), write_data)
+    write_atomic(_meta_path(directory, subtype), write_meta)
+    return count
+
+
+def bundled(subtype: str, directory: str | None = None):
+    """
+    Return the bundle (see bundle.py) to read a subtype from, or None.
+
+    A bundle is only used for the default corpus directory, and only for
+    subtypes that have not been synced into it.
+    """
+    if directory is not None or os.path.exists(data_path(default_corpus_dir(), subtype)):
+        return None
+    import bundle
+    return bundle.find(data_path("", subtype))
+
+
+def iter_documents(subtype: str, directory: str | None = None) -> Iterator[dict]:
+    """Yield every stored document of a subtype in API shape."""
+    path = data_path(directory or default_corpus_dir(), subtype)
+    packed = bundled(subtype, directory)
+    if packed is not None:
+        source = packed.open(data_path("", subtype))
+    elif os.path.exists(path):
+        source = path
+    else:
+        raise RuntimeError(
+            f"Offline corpus for {subtype} not found. Run sync.py to download it."
+        )
+    with gzip.open(source, "rt", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def get_documents(subtype: str, doc_ids: Iterable[int], directory: str | None = None) -> dict[int, dict]:
+    """Return the stored documents of one subtype for the given IDs, keyed by ID."""
+    wanted = set(doc_ids)
+    found = {}
+    for document in iter_documents(subtype, directory):
+        if document["id"] in wanted:
+            found[document["id"]] = document
+            if len(found) == len(wanted):
+                break
+    return found
+
+
+def get_document(subtype: str, doc_id: int, directory: str | None = None) -> dict | None:
+    """Return one stored document in API shape, or None if it is not in the corpus."""
+    return get_documents(subtype, [doc_id], directory).get(doc_id)
+
+
+def _fetch_page(api_base_url: str, subtype: str, page: int, timeout: float, extra: dict) -> tuple:
+    import http_client
+    import urllib.error
+
+    params = {
+        "per_page": str(SYNC_PAGE_SIZE),
+        "page": str(page),
+        "orderby": "id",
+        "order": "asc",
+        "_fields": SYNC_FIELDS,
+        **extra,
+    }
+    url = f"{api_base_url}/{subtype}?{urllib.parse.urlencode(params)}"
+    try:
+        response = http_client.request(url, timeout=timeout)
+    except urllib.error.HTTPError as e:
+        raise RuntimeError(f"HTTP error {e.code}") from e
+    except urllib.error.URLError as e:
+        raise RuntimeError(f"Network error: {e.reason}") from e
+
+    data = json.loads(response.body)
+    if not isinstance(data, list):
+        message = data.get("message", "Unexpected API response") if isinstance(data, dict) else "Unexpected API response"
+        raise RuntimeError(message)
+    total_pages = int(response.headers.get("X-WP-TotalPages") or 1)
+    return data, total_pages
+
+
+def iter_remote(api_base_url: str, subtype: str, timeout: float = 30, **params) -> Iterator[dict]:
+    """Yield every document of a subtype from the REST API, page by page, in ID order."""
+    page, total_pages = 1, 1
+    while page <= total_pages:
+        data, total_pages = _fetch_page(api_base_url, subtype, page, timeout, params)
+        yield from data
+        page += 1
+
+
+def _delta(api_base_url: str, subtype: str, directory: str, since: str, timeout: float) -> dict:
+    start = datetime.datetime.fromisoformat(since) - SYNC_OVERLAP
+    changed = {
+        document["id"]: document
+        for document in iter_remote(
+            api_base_url, subtype, timeout, modified_after=start.strftime("%Y-%m-%dT%H:%M:%S")
+        )
+    }
+    remote_ids = {document["id"] for document in iter_remote(api_base_url, subtype, timeout, _fields="id")}
+
+    stats = {"added": 0, "updated": 0, "deleted": 0}
+    new_ids = sorted(doc_id for doc_id in changed if doc_id in remote_ids)
+
+    def merged():
+        # The stored file and new_ids are both in ID order, so a single pass
+        # interleaves additions and keeps the file sorted.
+        position = 0
+        for document in iter_documents(subtype, directory):
+            doc_id = document["id"]
+            while position < len(new_ids) and new_ids[position] <= doc_id:
+                if new_ids[position] < doc_id:
+                    stats["added"] += 1
+                    yield changed[new_ids[position]]
+                position += 1
+            if doc_id not in remote_ids:
+                stats["deleted"] += 1
+            elif doc_id in changed:
+                # Documents re-fetched only because of SYNC_OVERLAP are unchanged.
+                if changed[doc_id] != document:
+                    stats["updated"] += 1
+                yield changed[doc_id]
+            else:
+                yield document
+        for doc_id in new_ids[position:]:
+            stats["added"] += 1
+            yield changed[doc_id]
+
+    # The counts are filled in while the merged stream is written, before
+    # the metadata that holds them is serialized.
+    write_subtype(subtype, merged(), directory, mode="delta", changes=stats)
+    return stats
+
+
+def sync_subtype(
+    api_base_url: str, subtype: str, directory: str | None = None, timeout: float = 30, full: bool = False
+) -> dict:
+    """
+    Bring the stored documents of a subtype up to date and return its metadata.
+
+    The first sync (or one with `full`) downloads every document; later syncs
+    only fetch documents modified since the recorded high-water mark.
+    """
+    directory = directory or default_corpus_dir()
+    previous = read_metadata(subtype, directory)
+    since = previous.get("high_water") if previous else None
+
+    if since and not full and os.path.exists(data_path(directory, subtype)):
+        _delta(api_base_url, subtype, directory, since, timeout)
+    else:
+        write_subtype(subtype, iter_remote(api_base_url, subtype, timeout), directory, mode="full")
+
+    return read_metadata(subtype, directory)
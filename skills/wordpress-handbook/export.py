@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Export WordPress Handbook documents as Markdown files.
+
+Usage: python3 export.py <output_dir> [subtypes] [--workers N] [--offline]
+
+Arguments:
+    output_dir - Directory to write into; each subtype gets a subdirectory
+    subtypes   - Comma-separated list of handbook types (default: all)
+    --workers  - Conversion processes (default: the number of CPUs)
+    --offline  - Export the local corpus downloaded by sync.py instead of the API
+
+Each subtype is downloaded a page at a time by its own thread, and the pages
+are converted to Markdown and written by a pool of worker processes, so
+downloading, conversion and writing all overlap. At most QUEUE_PAGES pages
+wait between the two stages, which keeps memory bounded whatever the size
+of the export.
+
+Every document is written to <output_dir>/<subtype>/<id>-<slug>.md, with
+its title, URL and modification time in a front matter block, and
+manifest.json lists every file with its size and SHA-256 checksum. Markdown
+files of documents that no longer exist are removed.
+
+Example:
+    python3 export.py ./handbooks "plugin-handbook,theme-handbook,blocks-handbook"
+"""
+
+from __future__ import annotations
+
+import hashlib
+import html
+import itertools
+import json
+import os
+import queue
+import re
+import sys
+import threading
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import corpus
+from html_convert import html_to_markdown
+
+API_BASE_URL = "https://developer.wordpress.org/wp-json/wp/v2"
+REQUEST_TIMEOUT = 30
+
+EXPORT_FIELDS = "id,title,link,content,modified_gmt"
+MANIFEST_NAME = "manifest.json"
+
+# Downloaded pages waiting for a worker; the pipeline's memory bound.
+QUEUE_PAGES = 8
+
+HANDBOOK_SUBTYPES = [
+    "plugin-handbook",
+    "theme-handbook",
+    "blocks-handbook",
+    "rest-api-handbook",
+    "apis-handbook",
+    "wpcs-handbook",
+    "adv-admin-handbook",
+]
+
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+
+# Queued by a download thread after its last page.
+_DONE = object()
+
+
+def _file_name(document: dict) -> str:
+    """Return `<id>-<last URL segment>.md`, or `<id>.md` for a URL without one."""
+    segment = document.get("link", "").rstrip("/").rsplit("/", 1)[-1]
+    slug = _SLUG_RE.sub("-", segment.lower()).strip("-")
+    return f"{document['id']}-{slug}.md" if slug else f"{document['id']}.md"
+
+
+def _export_page(output_dir: str, subtype: str, documents: list[dict]) -> list[dict]:
+    """Convert and write one page of documents; runs in a worker process."""
+    directory = os.path.join(output_dir, subtype)
+    os.makedirs(directory, exist_ok=True)
+
+    entries = []
+    for document in documents:
+        title = html.unescape((document.get("title") or {}).get("rendered", ""))
+        url = document.get("link", "")
+        front_matter = [
+            "---",
+            f"title: {json.dumps(title, ensure_ascii=False)}",
+            f"url: {json.dumps(url)}",
+            f"id: {document['id']}",
+            f"subtype: {subtype}",
+        ]
+        if document.get("modified_gmt"):
+            front_matter.append(f"modified_gmt: {document['modified_gmt']}")
+        front_matter.append("---")
+        markdown = html_to_markdown((document.get("content") or {}).get("rendered", ""))
+        data = ("\n".join(front_matter) + "\n\n" + markdown + "\n").encode("utf-8")
+
+        name = _file_name(document)
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(data)
+        entries.append({
+            "subtype": subtype,
+            "id": document["id"],
+            "title": title,
+            "url": url,
+            "path": f"{subtype}/{name}",
+            "bytes": len(data),
+            "sha256": hashlib.sha256(data).hexdigest(),
+        })
+    return entries
+
+
+def _pages(subtype: str, offline: bool) -> Iterator[list[dict]]:
+    if offline:
+        documents = corpus.iter_documents(subtype)
+    else:
+        documents = corpus.iter_remote(API_BASE_URL, subtype, REQUEST_TIMEOUT, _fields=EXPORT_FIELDS)
+    while True:
+        page = list(itertools.islice(documents, corpus.SYNC_PAGE_SIZE))
+        if not page:
+            return
+        yield page
+
+
+def _read_manifest(output_dir: str) -> dict:
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def export_handbooks(
+    output_dir: str,
+    subtypes: list[str] | None = None,
+    workers: int | None = None,
+    offline: bool = False,
+) -> dict:
+    """
+    Export handbook subtypes as Markdown files and return a summary.
+
+    Entries of other subtypes already in the output directory's manifest are
+    kept, so handbooks can be exported separately into one directory.
+    """
+    subtypes = subtypes or HANDBOOK_SUBTYPES
+    invalid = [s for s in subtypes if s not in HANDBOOK_SUBTYPES]
+    if invalid:
+        raise ValueError(
+            f"Invalid subtypes: {', '.join(invalid)}. "
+            f"Valid: {', '.join(HANDBOOK_SUBTYPES)}"
+        )
+    workers = max(1, workers or os.cpu_count() or 1)
+    os.makedirs(output_dir, exist_ok=True)
+
+    pages = queue.Queue(maxsize=QUEUE_PAGES)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        # Give up once the consumer has stopped, instead of blocking forever.
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def download(subtype):
+        try:
+            for page in _pages(subtype, offline):
+                if not put((subtype, page)):
+                    return
+        except Exception as e:
+            put((subtype, e))
+        put((subtype, _DONE))
+
+    entries = []
+    downloads = [threading.Thread(target=download, args=(subtype,), daemon=True) for subtype in subtypes]
+    for thread in downloads:
+        thread.start()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = set()
+            running = len(downloads)
+            while running:
+                subtype, page = pages.get()
+                if page is _DONE:
+                    running -= 1
+                    continue
+                if isinstance(page, Exception):
+                    raise page
+                pending.add(executor.submit(_export_page, output_dir, subtype, page))
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        entries.extend(future.result())
+            for future in pending:
+                entries.extend(future.result())
+    finally:
+        stop.set()
+
+    # Remove the files of documents that are gone, then record what is left.
+    exported = {entry["path"] for entry in entries}
+    removed = 0
+    for subtype in subtypes:
+        directory = os.path.join(output_dir, subtype)
+        for name in os.listdir(directory) if os.path.isdir(directory) else []:
+            if name.endswith(".md") and f"{subtype}/{name}" not in exported:
+                os.remove(os.path.join(directory, name))
+                removed += 1
+
+    kept = [entry for entry in _read_manifest(output_dir).get("documents", []) if entry.get("subtype") not in subtypes]
+    documents = sorted(kept + entries, key=lambda entry: (entry["subtype"], entry["id"]))
+
+    def write(tmp_path):
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"documents": documents}, f, indent=2, ensure_ascii=False)
+
+    corpus.write_atomic(os.path.join(output_dir, MANIFEST_NAME), write)
+
+    return {
+        "output": output_dir,
+        "documents": len(entries),
+        "bytes": sum(entry["bytes"] for entry in entries),
+        "removed": removed,
+        "subtypes": {
+            subtype: sum(1 for entry in entries if entry["subtype"] == subtype) for subtype in subtypes
+        },
+    }
+
+
+def main():
+    args = sys.argv[1:]
+
+    offline = corpus.offline_default()
+    if "--offline" in args:
+        args.remove("--offline")
+        offline = True
+
+    workers = None
+    if "--workers" in args:
+        index = args.index("--workers")
+        try:
+            workers = int(args[index + 1])
+        except (IndexError, ValueError):
+            print("Error: --workers must be a number", file=sys.stderr)
+            sys.exit(1)
+        del args[index:index + 2]
+
+    if not args:
+        print("Usage: export.py <output_dir> [subtypes] [--workers N] [--offline]", file=sys.stderr)
+        print('Example: export.py ./handbooks "plugin-handbook,theme-handbook"', file=sys.stderr)
+        sys.exit(1)
+
+    output_dir = args[0]
+    subtypes = [s.strip() for s in args[1].split(",") if s.strip()] if len(args) > 1 else None
+
+    try:
+        print(json.dumps(export_handbooks(output_dir, subtypes, workers, offline), indent=2))
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
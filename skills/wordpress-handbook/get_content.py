@@ -2,24 +2,62 @@
 """
 Get WordPress Handbook document content.
 
-Usage: python3 get_content.py <subtype> <id>
+Usage: python3 get_content.py <subtype> <id> [<subtype> <id> ...] [--workers N] [--offline]
+       python3 get_content.py - [--workers N] [--offline] < items.jsonl
+       python3 get_content.py <subtype> <id> --query TEXT [--passages N] [--offline]
+       python3 get_content.py <subtype> <id> --related N [--offline]
 
 Arguments:
     subtype - Handbook type (e.g., plugin-handbook, theme-handbook)
     id      - Document ID from search results
+    -       - Read {"subtype": ..., "id": ...} objects from stdin, one per line
+    --offline - Read from the local corpus downloaded by sync.py instead of the API
+    --query   - Return only the sections of the document that best match TEXT
+    --passages - Number of sections returned with --query (default: 3)
+    --related - Also list up to N related documents (at most 10), from the
+                link graph of the local corpus built by sync.py
+
+With more than one item, documents are fetched concurrently (default: 8
+workers) and written as JSON Lines in completion order. A failed item is
+reported inline as {"subtype": ..., "id": ..., "error": ...}.
+
+With --query, the document's Markdown is split at its headings and only the
+best-matching sections are returned, each with its anchor and its offsets
+into the full Markdown.
+
+With --related, the result also lists the documents most closely linked to
+this one, handbook pages and Code Reference entries alike, under "related".
+They are precomputed by sync.py, so no further API request is made.
 
 Example:
     python3 get_content.py plugin-handbook 12345
+    python3 get_content.py plugin-handbook 12345 --query "labels" --passages 2
+    python3 get_content.py plugin-handbook 12345 --related 5
+    python3 get_content.py plugin-handbook 12345 plugin-handbook 12346 --workers 4
 """
 
+from __future__ import annotations
+
 import json
-import re
 import sys
-import urllib.request
-import urllib.error
+import urllib.parse
+from collections.abc import Iterable, Iterator
+
+import corpus
+import daemon
+from cache import fetch_json, raise_api_error
+from html_convert import html_to_markdown, markdown_sections
 
 API_BASE_URL = "https://developer.wordpress.org/wp-json/wp/v2"
 REQUEST_TIMEOUT = 10
+BATCH_WORKERS = 8
+PASSAGES = 3
+
+# Maximum IDs per `include=` collection request (the REST API's per_page cap).
+BULK_PAGE_SIZE = 100
+
+# Seconds a partial group of a batch waits for more IDs before it is sent.
+BATCH_WINDOW = 0.05
 
 HANDBOOK_SUBTYPES = [
     "plugin-handbook",
@@ -32,84 +70,7 @@ HANDBOOK_SUBTYPES = [
 ]
 
 
-def html_to_markdown(html: str) -> str:
-    """Convert HTML to Markdown."""
-    text = html
-
-    # Remove scripts and styles
-    text = re.sub(r"<script[^>]*>[\s\S]*?</script>", "", text, flags=re.IGNORECASE)
-    text = re.sub(r"<style[^>]*>[\s\S]*?</style>", "", text, flags=re.IGNORECASE)
-
-    # Headings
-    text = re.sub(r"<h1[^>]*>(.*?)</h1>", r"# \1\n\n", text, flags=re.IGNORECASE)
-    text = re.sub(r"<h2[^>]*>(.*?)</h2>", r"## \1\n\n", text, flags=re.IGNORECASE)
-    text = re.sub(r"<h3[^>]*>(.*?)</h3>", r"### \1\n\n", text, flags=re.IGNORECASE)
-    text = re.sub(r"<h4[^>]*>(.*?)</h4>", r"#### \1\n\n", text, flags=re.IGNORECASE)
-    text = re.sub(r"<h5[^>]*>(.*?)</h5>", r"##### \1\n\n", text, flags=re.IGNORECASE)
-    text = re.sub(r"<h6[^>]*>(.*?)</h6>", r"###### \1\n\n", text, flags=re.IGNORECASE)
-
-    # Code blocks
-    text = re.sub(
-        r"<pre[^>]*><code[^>]*>([\s\S]*?)</code></pre>",
-        r"```\n\1\n```\n\n",
-        text,
-        flags=re.IGNORECASE,
-    )
-    text = re.sub(
-        r"<pre[^>]*>([\s\S]*?)</pre>", r"```\n\1\n```\n\n", text, flags=re.IGNORECASE
-    )
-    text = re.sub(r"<code[^>]*>(.*?)</code>", r"`\1`", text, flags=re.IGNORECASE)
-
-    # Links
-    text = re.sub(
-        r'<a[^>]*href="([^"]*)"[^>]*>(.*?)</a>', r"[\2](\1)", text, flags=re.IGNORECASE
-    )
-
-    # Bold and italic
-    text = re.sub(r"<strong[^>]*>(.*?)</strong>", r"**\1**", text, flags=re.IGNORECASE)
-    text = re.sub(r"<b[^>]*>(.*?)</b>", r"**\1**", text, flags=re.IGNORECASE)
-    text = re.sub(r"<em[^>]*>(.*?)</em>", r"*\1*", text, flags=re.IGNORECASE)
-    text = re.sub(r"<i[^>]*>(.*?)</i>", r"*\1*", text, flags=re.IGNORECASE)
-
-    # Lists
-    text = re.sub(r"<ul[^>]*>", "\n", text, flags=re.IGNORECASE)
-    text = re.sub(r"</ul>", "\n", text, flags=re.IGNORECASE)
-    text = re.sub(r"<ol[^>]*>", "\n", text, flags=re.IGNORECASE)
-    text = re.sub(r"</ol>", "\n", text, flags=re.IGNORECASE)
-    text = re.sub(r"<li[^>]*>([\s\S]*?)</li>", r"- \1\n", text, flags=re.IGNORECASE)
-
-    # Paragraphs and line breaks
-    text = re.sub(r"<p[^>]*>([\s\S]*?)</p>", r"\1\n\n", text, flags=re.IGNORECASE)
-    text = re.sub(r"<br\s*/?>", "\n", text, flags=re.IGNORECASE)
-    text = re.sub(r"<hr\s*/?>", "\n---\n\n", text, flags=re.IGNORECASE)
-
-    # Blockquotes
-    text = re.sub(
-        r"<blockquote[^>]*>([\s\S]*?)</blockquote>",
-        r"> \1\n\n",
-        text,
-        flags=re.IGNORECASE,
-    )
-
-    # Remove remaining tags
-    text = re.sub(r"<[^>]+>", "", text)
-
-    # Decode HTML entities
-    text = text.replace("&nbsp;", " ")
-    text = text.replace("&amp;", "&")
-    text = text.replace("&lt;", "<")
-    text = text.replace("&gt;", ">")
-    text = text.replace("&quot;", '"')
-    text = text.replace("&#39;", "'")
-
-    # Clean up extra whitespace
-    text = re.sub(r"\n{3,}", "\n\n", text)
-
-    return text.strip()
-
-
-def get_handbook_content(subtype: str, doc_id: int) -> dict:
-    """Get full content of a handbook document."""
+def _validate_item(subtype: str, doc_id: int) -> None:
     if subtype not in HANDBOOK_SUBTYPES:
         raise ValueError(
             f"Invalid subtype: {subtype}. Valid: {', '.join(HANDBOOK_SUBTYPES)}"
@@ -118,21 +79,30 @@ def get_handbook_content(subtype: str, doc_id: int) -> dict:
     if not isinstance(doc_id, int) or doc_id < 1:
         raise ValueError("id must be a positive integer")
 
-    url = f"{API_BASE_URL}/{subtype}/{doc_id}?_fields=id,title,content,link"
 
+def _request(url: str, timeout: float = REQUEST_TIMEOUT):
     try:
-        with urllib.request.urlopen(url, timeout=REQUEST_TIMEOUT) as response:
-            data = json.loads(response.read().decode())
-    except urllib.error.HTTPError as e:
-        if e.code == 404:
-            raise RuntimeError("Document not found") from e
-        raise RuntimeError(f"HTTP error {e.code}") from e
-    except urllib.error.URLError as e:
-        raise RuntimeError(f"Network error: {e.reason}") from e
-
-    if "code" in data:
+        data = fetch_json(url, "document", timeout=timeout)
+    except OSError as e:
+        raise_api_error(e, not_found="Document not found")
+        raise
+
+    if isinstance(data, dict) and "code" in data:
         raise RuntimeError(data.get("message", "API error"))
 
+    return data
+
+
+def _stored_documents(subtype: str, doc_ids: list[int]) -> dict[int, dict]:
+    """Read documents from the offline store chosen by WP_SKILLS_BACKEND."""
+    if corpus.default_backend() == "sqlite":
+        import sqlite_store as store
+    else:
+        import snapshot as store
+    return store.get_documents(subtype, doc_ids)
+
+
+def _to_document(data: dict) -> dict:
     markdown_content = html_to_markdown(data["content"]["rendered"])
 
     return {
@@ -143,27 +113,314 @@ def get_handbook_content(subtype: str, doc_id: int) -> dict:
     }
 
 
+def _to_passages(subtype: str, data: dict, query: str, passages: int) -> dict:
+    import search_index
+
+    markdown, sections = markdown_sections(data["content"]["rendered"])
+    index = search_index.PassageIndex.from_pages(subtype, [(data, markdown, sections)])
+    ranked = search_index.rank_passages(query, [index], passages)
+
+    return {
+        "id": data["id"],
+        "title": data["title"]["rendered"],
+        "url": data["link"],
+        "length": len(markdown),
+        "passages": [
+            {
+                "anchor": passage["anchor"],
+                "heading": passage["heading"],
+                "level": passage["level"],
+                "start": passage["start"],
+                "end": passage["end"],
+                "score": passage["score"],
+                "content": markdown[passage["start"]:passage["end"]],
+            }
+            for passage in ranked
+        ],
+    }
+
+
+def get_handbook_content(
+    subtype: str,
+    doc_id: int,
+    offline: bool = False,
+    query: str | None = None,
+    passages: int = PASSAGES,
+    related: int = 0,
+    timeout: float = REQUEST_TIMEOUT,
+) -> dict:
+    """
+    Get full content of a handbook document.
+
+    With `query`, only the `passages` sections that best match it are
+    returned (ranked with BM25 within the document), under "passages",
+    instead of the whole "content". Each passage has its anchor, heading,
+    level, score and `start`/`end` offsets into the full Markdown, whose
+    length is given as "length".
+
+    With `related`, up to that many related documents from the link graph
+    of the local corpus (see link_graph.py) are added under "related".
+
+    `timeout` bounds the API request, in seconds.
+    """
+    _validate_item(subtype, doc_id)
+
+    if offline:
+        data = _stored_documents(subtype, [doc_id]).get(doc_id)
+        if data is None:
+            raise RuntimeError("Document not found")
+    else:
+        url = f"{API_BASE_URL}/{subtype}/{doc_id}?_fields=id,title,content,link"
+        data = _request(url, timeout)
+
+    if query is not None:
+        result = _to_passages(subtype, data, query, passages)
+    else:
+        result = _to_document(data)
+    if related:
+        import link_graph
+        result["related"] = link_graph.related(subtype, doc_id, related)
+    return result
+
+
+def get_handbook_contents_by_ids(
+    subtype: str, doc_ids: list[int], offline: bool = False
+) -> dict[int, dict]:
+    """
+    Get several documents of one subtype with as few requests as possible.
+
+    IDs are fetched through the collection endpoint with `include=`, up to
+    BULK_PAGE_SIZE per request, and the response is split back into the
+    same dicts get_handbook_content returns, keyed by ID. IDs that do not
+    exist are absent from the result. With `offline`, the documents are read
+    from the local corpus instead.
+    """
+    for doc_id in doc_ids:
+        _validate_item(subtype, doc_id)
+
+    if offline:
+        stored = _stored_documents(subtype, doc_ids)
+        return {doc_id: _to_document(data) for doc_id, data in stored.items()}
+
+    unique_ids = list(dict.fromkeys(doc_ids))
+    documents = {}
+    for start in range(0, len(unique_ids), BULK_PAGE_SIZE):
+        chunk = unique_ids[start:start + BULK_PAGE_SIZE]
+        params = {
+            "include": ",".join(str(doc_id) for doc_id in chunk),
+            "per_page": str(len(chunk)),
+            "_fields": "id,title,content,link",
+        }
+        data = _request(f"{API_BASE_URL}/{subtype}?{urllib.parse.urlencode(params)}")
+        if not isinstance(data, list):
+            raise RuntimeError("Unexpected API response")
+        for item in data:
+            documents[item["id"]] = _to_document(item)
+
+    return documents
+
+
+def _fetch_item(subtype: str, doc_id: int, offline: bool = False) -> dict:
+    try:
+        content = get_handbook_content(subtype, doc_id, offline)
+    except Exception as e:
+        return {"subtype": subtype, "id": doc_id, "error": str(e)}
+    return {"subtype": subtype, **content}
+
+
+def _fetch_group(subtype: str, doc_ids: list[int], offline: bool = False) -> list[dict]:
+    if len(doc_ids) == 1:
+        return [_fetch_item(subtype, doc_ids[0], offline)]
+    try:
+        documents = get_handbook_contents_by_ids(subtype, doc_ids, offline)
+    except Exception as e:
+        return [{"subtype": subtype, "id": doc_id, "error": str(e)} for doc_id in doc_ids]
+    return [
+        {"subtype": subtype, **documents[doc_id]}
+        if doc_id in documents
+        else {"subtype": subtype, "id": doc_id, "error": "Document not found"}
+        for doc_id in doc_ids
+    ]
+
+
+def get_handbook_contents(
+    items: Iterable[tuple[str, int]], workers: int = BATCH_WORKERS, offline: bool = False
+) -> Iterator[dict]:
+    """
+    Fetch many documents concurrently, yielding each result as it completes.
+
+    Items are grouped by subtype and each group of up to BULK_PAGE_SIZE IDs
+    is fetched with a single collection request. A smaller group is sent
+    once its first ID has waited BATCH_WINDOW seconds, so a slow stream is
+    answered as it arrives rather than at its end. Successful results are
+    the dicts returned by get_handbook_content with the subtype added;
+    failures are yielded as {"subtype", "id", "error"} instead of aborting
+    the batch. At most `workers` requests run at once and `items` is
+    consumed lazily (by a reader thread), so it may be an unbounded stream.
+    """
+    import queue
+    import threading
+    import time
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    workers = max(1, workers)
+    groups: dict[str, list[int]] = {}
+    opened: dict[str, float] = {}  # When each group got its first ID.
+    incoming = queue.Queue(maxsize=workers * BULK_PAGE_SIZE)
+    end = object()
+
+    def read():
+        try:
+            for item in items:
+                incoming.put(item)
+        except Exception as e:
+            incoming.put(e)
+        incoming.put(end)
+
+    threading.Thread(target=read, daemon=True).start()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        finished = False
+        while not finished or groups or pending:
+            idle = finished
+            if not finished:
+                try:
+                    item = incoming.get(timeout=BATCH_WINDOW if groups or pending else None)
+                except queue.Empty:
+                    item = None
+                    idle = True
+                if item is end:
+                    item = None
+                    finished = idle = True
+                elif isinstance(item, Exception):
+                    raise item
+                if item is not None:
+                    subtype, doc_id = item
+                    try:
+                        _validate_item(subtype, doc_id)
+                    except ValueError as e:
+                        yield {"subtype": subtype, "id": doc_id, "error": str(e)}
+                    else:
+                        groups.setdefault(subtype, []).append(doc_id)
+                        opened.setdefault(subtype, time.monotonic())
+
+            now = time.monotonic()
+            for subtype in list(groups):
+                if idle or len(groups[subtype]) >= BULK_PAGE_SIZE or now - opened[subtype] >= BATCH_WINDOW:
+                    del opened[subtype]
+                    pending.add(executor.submit(_fetch_group, subtype, groups.pop(subtype), offline))
+
+            if not pending:
+                continue
+            # Yield whatever has completed; block only when the pool is
+            # saturated or nothing else is left to do.
+            saturated = len(pending) >= workers * 2
+            timeout = None if saturated or (finished and not groups) else 0
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+
+
+def _read_items(lines: Iterable[str]) -> Iterator[tuple[str, int]]:
+    """
+    Parse JSON Lines of {"subtype": ..., "id": ...} objects.
+
+    Malformed lines are passed through as (None, line) so that they are
+    reported as per-item errors rather than stopping the batch.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+            yield item["subtype"], int(item["id"])
+        except (ValueError, TypeError, KeyError):
+            yield None, line
+
+
+def _pop_option(args: list, name: str):
+    """Remove `name <value>` from args and return the value (or None)."""
+    if name not in args:
+        return None
+    index = args.index(name)
+    if index + 1 >= len(args):
+        raise ValueError(f"{name} requires a value")
+    value = args[index + 1]
+    del args[index:index + 2]
+    return value
+
+
 def main():
     args = sys.argv[1:]
 
-    if len(args) < 2:
-        print("Usage: get_content.py <subtype> <id>", file=sys.stderr)
-        print("Example: get_content.py plugin-handbook 12345", file=sys.stderr)
-        sys.exit(1)
-
-    subtype = args[0]
+    offline = corpus.offline_default()
+    if "--offline" in args:
+        args.remove("--offline")
+        offline = True
 
     try:
-        doc_id = int(args[1])
+        workers = int(_pop_option(args, "--workers") or BATCH_WORKERS)
     except ValueError:
-        print("Error: id must be a number", file=sys.stderr)
+        print("Error: --workers must be a number", file=sys.stderr)
         sys.exit(1)
 
     try:
-        content = get_handbook_content(subtype, doc_id)
-        print(json.dumps(content, indent=2))
-    except Exception as e:
-        print(f"Error: {e}", file=sys.stderr)
+        query = _pop_option(args, "--query")
+        passages = int(_pop_option(args, "--passages") or PASSAGES)
+        related = int(_pop_option(args, "--related") or 0)
+    except ValueError:
+        print("Error: --query requires text, --passages and --related a number", file=sys.stderr)
+        sys.exit(1)
+
+    if (query is not None or related) and len(args) != 2:
+        print("Error: --query and --related take a single <subtype> <id>", file=sys.stderr)
+        sys.exit(1)
+
+    if args == ["-"]:
+        items = _read_items(sys.stdin)
+    elif len(args) < 2 or len(args) % 2:
+        print("Usage: get_content.py <subtype> <id> [<subtype> <id> ...] [--workers N] [--offline]", file=sys.stderr)
+        print("       get_content.py - [--workers N] [--offline] < items.jsonl", file=sys.stderr)
+        print("       get_content.py <subtype> <id> --query TEXT [--passages N] [--offline]", file=sys.stderr)
+        print("       get_content.py <subtype> <id> --related N [--offline]", file=sys.stderr)
+        print("Example: get_content.py plugin-handbook 12345", file=sys.stderr)
+        sys.exit(1)
+    elif len(args) == 2:
+        subtype = args[0]
+
+        try:
+            doc_id = int(args[1])
+        except ValueError:
+            print("Error: id must be a number", file=sys.stderr)
+            sys.exit(1)
+
+        try:
+            content = daemon.call_or_run(
+                "handbook.get_content", get_handbook_content,
+                subtype=subtype, doc_id=doc_id, offline=offline, query=query, passages=passages,
+                related=related,
+            )
+            print(json.dumps(content, indent=2))
+        except Exception as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        return
+    else:
+        try:
+            items = [(args[i], int(args[i + 1])) for i in range(0, len(args), 2)]
+        except ValueError:
+            print("Error: id must be a number", file=sys.stderr)
+            sys.exit(1)
+
+    failed = False
+    results = daemon.stream_or_run(
+        "handbook.get_contents", get_handbook_contents, items, workers=workers, offline=offline
+    )
+    for result in results:
+        failed = failed or "error" in result
+        print(json.dumps(result), flush=True)
+    if failed:
         sys.exit(1)
 
 
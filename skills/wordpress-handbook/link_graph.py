@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Link graph of the offline corpus, with authority scores and related documents.
+
+Handbook pages link to Code Reference entries (`/reference/functions/...`)
+and Code Reference entries link back into the handbooks. `build` collects
+the links of every synced document while converting its HTML (see
+html_convert.html_links), resolves the ones that point at another synced
+document to its (subtype, id), and precomputes per document:
+
+    authority - PageRank over the links, scaled so that the mean is 1.0
+    related   - the RELATED_LIMIT documents most closely tied to it: those
+                it links to or is linked from, and those it shares links
+                with, weighted by authority
+
+Everything is stored in one file laid out like the corpus snapshot:
+
+    header       HEADER: magic, version, counts and offsets of the parts below
+    meta         JSON: subtype names and the corpus files they were built from
+    node table   NODE per document, sorted by (subtype, id)
+    link table   LINK per resolved link, grouped by source document
+    related      RELATED per related document, grouped by document
+    labels       UTF-8 "title\\0url" of each document
+
+The file is opened with mmap. A lookup binary searches the fixed-width node
+table in place and reads the document's precomputed slice of the related
+table, so `related` costs the same for any corpus size and makes no API
+calls. Offline searches use the authority scores to rerank BM25 results.
+
+The graph is rebuilt by sync.py after every sync, never while answering a
+query: PageRank over the whole corpus is too slow for that. Searches and
+lookups use the graph on disk even when a corpus file has changed since it
+was built, and do without one when there is none. A bundled corpus (see
+bundle.py) carries its own graph, which is read in place from the bundle.
+
+This module is shared by the wordpress-handbook and wordpress-code-reference
+skills and must be kept identical in both skill directories.
+"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import mmap
+import os
+import struct
+import threading
+import urllib.parse
+
+import corpus
+from html_convert import html_links
+
+MAGIC = b"WPLINK\x00\x01"
+GRAPH_VERSION = 1
+GRAPH_NAME = "corpus.links"
+
+# Links are only resolved within this site.
+SITE_HOST = "developer.wordpress.org"
+
+# PageRank parameters.
+DAMPING = 0.85
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-6
+
+# Related documents stored per document.
+RELATED_LIMIT = 10
+# Pages linking to (or linked from) more documents than this are not used to
+# relate the documents they share: a hub says little about any one of them.
+MAX_SHARED_DEGREE = 100
+
+# A result's score is multiplied by authority ** AUTHORITY_WEIGHT, so a page
+# with ten times the mean authority gains about 26%.
+AUTHORITY_WEIGHT = 0.1
+# BM25 candidates reranked per offline search, whatever the result limit.
+RERANK_DEPTH = 50
+
+# magic, version, node count, link count, related count, meta offset,
+# meta length, node table offset, link table offset, related table offset,
+# labels offset
+HEADER = struct.Struct("<8sIIIIQIQQQQ")
+# subtype number, document ID, authority, first link, link count, first
+# related, related count, label offset, label length
+NODE = struct.Struct("<HIfIIIHII")
+# target node number
+LINK = struct.Struct("<I")
+# node number, score
+RELATED = struct.Struct("<If")
+
+# Open graphs, keyed by path, so a long-lived process maps each file once.
+_loaded: dict[str, "LinkGraph"] = {}
+_lock = threading.Lock()
+
+
+def graph_path(directory: str | None = None) -> str:
+    return os.path.join(directory or corpus.default_corpus_dir(), GRAPH_NAME)
+
+
+def _stamp(path: str) -> list[int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _synced_subtypes(directory: str) -> list[str]:
+    suffix = ".jsonl.gz"
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    return sorted(name[:-len(suffix)] for name in names if name.endswith(suffix))
+
+
+def _title(document: dict) -> str:
+    title = document.get("title") or {}
+    return title.get("rendered", "") if isinstance(title, dict) else str(title)
+
+
+def link_key(href: str, base: str = "") -> str | None:
+    """
+    Return the key a link resolves to: its lowercased path on SITE_HOST with
+    a trailing slash, or None for a link to another site.
+
+    Relative links are resolved against `base`; the scheme, query and
+    fragment are ignored, so `http://developer.wordpress.org/reference/
+    functions/add_action#notes` and `/reference/functions/add_action/` are
+    the same key.
+    """
+    try:
+        parts = urllib.parse.urlsplit(urllib.parse.urljoin(base, href.strip()))
+    except ValueError:
+        return None
+    if parts.scheme not in ("http", "https", "") or parts.hostname not in (SITE_HOST, None):
+        return None
+    path = parts.path.lower()
+    if not path.startswith("/"):
+        return None
+    return path if path.endswith("/") else path + "/"
+
+
+class LinkGraph:
+    """A read-only, memory-mapped link graph."""
+
+    def __init__(self, path: str, buffer=None):
+        # `buffer` is the graph's bytes when it is read in place from a
+        # bundle (see bundle.py); otherwise the file at `path` is mapped.
+        if buffer is None:
+            with open(path, "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.mm = buffer
+        (magic, version, self.node_count, self.link_count, self.related_count, meta_offset, meta_length,
+         self.nodes_offset, self.links_offset, self.related_offset, self.labels_offset) = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != GRAPH_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a link graph of version {GRAPH_VERSION}")
+        meta = json.loads(bytes(self.mm[meta_offset:meta_offset + meta_length]))
+        self.subtypes: list[str] = meta["subtypes"]
+        self.sources: dict[str, list[int]] = meta["sources"]
+        self.numbers = {subtype: number for number, subtype in enumerate(self.subtypes)}
+        self.stamp = _stamp(path)
+
+    def close(self) -> None:
+        if isinstance(self.mm, mmap.mmap):
+            self.mm.close()
+
+    def _node(self, number: int) -> tuple:
+        return NODE.unpack_from(self.mm, self.nodes_offset + number * NODE.size)
+
+    def find(self, subtype: str, doc_id: int) -> int | None:
+        """Return the node number of a document, or None if it is not in the graph."""
+        number = self.numbers.get(subtype)
+        if number is None:
+            return None
+        key = (number, doc_id)
+        lo, hi = 0, self.node_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._node(mid)[:2] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.node_count and self._node(lo)[:2] == key:
+            return lo
+        return None
+
+    def authority(self, subtype: str, doc_id: int) -> float | None:
+        """Return a document's authority (1.0 is the corpus mean), or None if it is not in the graph."""
+        number = self.find(subtype, doc_id)
+        return None if number is None else self._node(number)[2]
+
+    def describe(self, number: int, score: float | None = None) -> dict:
+        """Return a node as {id, title, url, subtype}, plus "score" if one is given."""
+        subtype_number, doc_id, _authority, _, _, _, _, label_offset, label_length = self._node(number)
+        start = self.labels_offset + label_offset
+        title, _, url = bytes(self.mm[start:start + label_length]).decode("utf-8").partition("\0")
+        result = {"id": doc_id, "title": title, "url": url, "subtype": self.subtypes[subtype_number]}
+        if score is not None:
+            result["score"] = round(score, 4)
+        return result
+
+    def links(self, subtype: str, doc_id: int) -> list[dict]:
+        """Return the synced documents a document links to, in link order."""
+        number = self.find(subtype, doc_id)
+        if number is None:
+            return []
+        _, _, _, first, count, _, _, _, _ = self._node(number)
+        return [
+            self.describe(LINK.unpack_from(self.mm, self.links_offset + (first + i) * LINK.size)[0])
+            for i in range(count)
+        ]
+
+    def related(self, subtype: str, doc_id: int, limit: int = RELATED_LIMIT) -> list[dict]:
+        """Return up to `limit` related documents, best first, each with its relatedness "score"."""
+        number = self.find(subtype, doc_id)
+        if number is None:
+            return []
+        _, _, _, _, _, first, count, _, _ = self._node(number)
+        return [
+            self.describe(*RELATED.unpack_from(self.mm, self.related_offset + (first + i) * RELATED.size))
+            for i in range(min(count, max(0, limit)))
+        ]
+
+
+def _pagerank(outgoing: list[list[int]]) -> list[float]:
+    """PageRank by power iteration; the rank of pages without links is spread evenly."""
+    count = len(outgoing)
+    if not count:
+        return []
+    rank = [1.0 / count] * count
+    for _ in range(MAX_ITERATIONS):
+        following = [0.0] * count
+        dangling = 0.0
+        for source, targets in enumerate(outgoing):
+            if targets:
+                share = rank[source] / len(targets)
+                for target in targets:
+                    following[target] += share
+            else:
+                dangling += rank[source]
+        base = (1 - DAMPING + DAMPING * dangling) / count
+        following = [base + DAMPING * value for value in following]
+        delta = sum(abs(new - old) for new, old in zip(following, rank))
+        rank = following
+        if delta < TOLERANCE:
+            break
+    return rank
+
+
+def _related(
+    number: int, outgoing: list[list[int]], incoming: list[list[int]], boost: list[float]
+) -> list[tuple[float, int]]:
+    """
+    Return the top (score, node) pairs related to a node.
+
+    A direct link either way counts 1; sharing a link source or target
+    counts 1 / that page's degree, so a page with few links ties its
+    targets together more than one listing everything.
+    """
+    weights: dict[int, float] = {}
+    for other in outgoing[number]:
+        weights[other] = weights.get(other, 0.0) + 1.0
+    for other in incoming[number]:
+        weights[other] = weights.get(other, 0.0) + 1.0
+    for source in incoming[number]:
+        siblings = outgoing[source]
+        if len(siblings) <= MAX_SHARED_DEGREE:
+            share = 1.0 / len(siblings)
+            for other in siblings:
+                weights[other] = weights.get(other, 0.0) + share
+    for target in outgoing[number]:
+        siblings = incoming[target]
+        if len(siblings) <= MAX_SHARED_DEGREE:
+            share = 1.0 / len(siblings)
+            for other in siblings:
+                weights[other] = weights.get(other, 0.0) + share
+    weights.pop(number, None)
+    return heapq.nlargest(
+        RELATED_LIMIT, ((weight * boost[other], -other) for other, weight in weights.items())
+    )
+
+
+def build(directory: str | None = None) -> LinkGraph:
+    """Write the link graph of every synced subtype, replacing any previous one."""
+    directory = directory or corpus.default_corpus_dir()
+    path = graph_path(directory)
+    subtypes = _synced_subtypes(directory)
+
+    # Nodes in (subtype number, id) order, which is also the file's order.
+    nodes = []
+    sources = {}
+    for number, subtype in enumerate(subtypes):
+        # Stamp before reading, so a sync racing with the build leaves the
+        # graph looking stale rather than current.
+        sources[subtype] = _stamp(corpus.data_path(directory, subtype))
+        for document in corpus.iter_documents(subtype, directory):
+            url = document.get("link", "")
+            content = document.get("content") or {}
+            rendered = content.get("rendered", "") if isinstance(content, dict) else str(content)
+            nodes.append((number, document["id"], _title(document), url, html_links(rendered)))
+    nodes.sort(key=lambda node: node[:2])
+
+    numbers = {}
+    for number, (_, _, _, url, _) in enumerate(nodes):
+        key = link_key(url)
+        if key is not None:
+            numbers.setdefault(key, number)
+    outgoing = []
+    for number, (_, _, _, url, hrefs) in enumerate(nodes):
+        targets = {}
+        for href in hrefs:
+            target = numbers.get(link_key(href, url))
+            if target is not None and target != number:
+                targets.setdefault(target)
+        outgoing.append(list(targets))
+    incoming = [[] for _ in nodes]
+    for number, targets in enumerate(outgoing):
+        for target in targets:
+            incoming[target].append(number)
+
+    count = len(nodes)
+    authority = [rank * count for rank in _pagerank(outgoing)]
+    boost = [value ** AUTHORITY_WEIGHT for value in authority]
+
+    def write(tmp_path):
+        meta = json.dumps({"subtypes": subtypes, "sources": sources}).encode("utf-8")
+        node_table = bytearray()
+        link_table = bytearray()
+        related_table = bytearray()
+        labels = bytearray()
+        link_count = related_count = 0
+        for number, (subtype_number, doc_id, title, url, _) in enumerate(nodes):
+            related = _related(number, outgoing, incoming, boost)
+            label = f"{title}\0{url}".encode("utf-8")
+            node_table += NODE.pack(
+                subtype_number, doc_id, authority[number], link_count, len(outgoing[number]),
+                related_count, len(related), len(labels), len(label),
+            )
+            for target in outgoing[number]:
+                link_table += LINK.pack(target)
+            for score, negative_other in related:
+                related_table += RELATED.pack(-negative_other, score)
+            labels += label
+            link_count += len(outgoing[number])
+            related_count += len(related)
+
+        with open(tmp_path, "wb") as f:
+            meta_offset = HEADER.size
+            nodes_offset = meta_offset + len(meta)
+            links_offset = nodes_offset + len(node_table)
+            related_offset = links_offset + len(link_table)
+            labels_offset = related_offset + len(related_table)
+            f.write(HEADER.pack(
+                MAGIC, GRAPH_VERSION, count, link_count, related_count, meta_offset, len(meta),
+                nodes_offset, links_offset, related_offset, labels_offset,
+            ))
+            for part in (meta, node_table, link_table, related_table, labels):
+                f.write(part)
+
+    corpus.write_atomic(path, write)
+    with _lock:
+        _loaded.pop(path, None)
+    return load(directory)
+
+
+def load(directory: str | None = None) -> LinkGraph:
+    """
+    Return the link graph of a corpus directory.
+
+    Raises RuntimeError if it has not been built, and ValueError if the file
+    is not a graph of this version.
+    """
+    directory = directory or corpus.default_corpus_dir()
+    path = graph_path(directory)
+    stamp = _stamp(path)
+    with _lock:
+        graph = _loaded.get(path)
+        if graph is not None and graph.stamp == stamp:
+            return graph
+    if stamp is None:
+        raise RuntimeError(f"Link graph {path} not found")
+    graph = LinkGraph(path)
+    with _lock:
+        _loaded[path] = graph
+    return graph
+
+
+def _bundled(packed) -> LinkGraph | None:
+    key = f"{packed.path}!{GRAPH_NAME}"
+    with _lock:
+        graph = _loaded.get(key)
+        if graph is not None and graph.stamp == packed.stamp:
+            return graph
+    data = packed.member(GRAPH_NAME)
+    if data is None:
+        return None
+    graph = LinkGraph(key, data)
+    graph.stamp = packed.stamp
+    with _lock:
+        _loaded[key] = graph
+    return graph
+
+
+def _graph(subtype: str, directory: str | None) -> LinkGraph | None:
+    """Return the graph covering a subtype as it is, or None if none has been built."""
+    packed = corpus.bundled(subtype, directory)
+    if packed is not None:
+        return _bundled(packed)
+    try:
+        return load(directory)
+    except (RuntimeError, ValueError):
+        return None
+
+
+def related(subtype: str, doc_id: int, limit: int = RELATED_LIMIT, directory: str | None = None) -> list[dict]:
+    """
+    Return up to `limit` (at most RELATED_LIMIT) documents related to one,
+    as {id, title, url, subtype, score} dicts, best first.
+    """
+    graph = _graph(subtype, directory)
+    if graph is None or subtype not in graph.numbers:
+        raise RuntimeError(f"Link graph for {subtype} not found. Run sync.py to build it.")
+    return graph.related(subtype, doc_id, limit)
+
+
+def rerank(results: list[dict], limit: int, directory: str | None = None) -> list[dict]:
+    """
+    Return the top `limit` of a list of scored search results after boosting
+    each score by its document's authority.
+
+    Results of subtypes without a graph, or documents missing from it, keep
+    their score.
+    """
+    graphs = {}
+    boosted = []
+    for position, result in enumerate(results):
+        subtype = result["subtype"]
+        if subtype not in graphs:
+            graphs[subtype] = _graph(subtype, directory)
+        graph = graphs[subtype]
+        authority = graph.authority(subtype, result["id"]) if graph is not None else None
+        score = result["score"]
+        if authority:
+            score = round(score * authority ** AUTHORITY_WEIGHT, 4)
+        boosted.append((-score, position, {**result, "score": score}))
+    boosted.sort(key=lambda item: item[:2])
+    return [result for _, _, result in boosted[:limit]]
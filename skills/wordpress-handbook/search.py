@@ -2,23 +2,42 @@
 """
 Search WordPress Handbook documentation.
 
-Usage: python3 search.py <query> [subtypes] [per_page]
+Usage: python3 search.py <query> [subtypes] [per_page] [--offline] [--prefetch N] [--passages]
+                         [--all] [--jsonl]
 
 Arguments:
     query    - Search keywords (required)
     subtypes - Comma-separated list of handbook types (optional)
     per_page - Number of results (1-100, default: 5)
+    --offline - Search the local corpus downloaded by sync.py (ranked by BM25
+                and link authority, results include a "score") instead of the API
+    --prefetch - Fetch the content of the top N hits into the cache in the
+                 background, for a following get_content.py (default:
+                 WP_SKILLS_PREFETCH, or 0)
+    --passages - With --offline, return the best-matching sections of any
+                 document instead of whole documents, with their content
+    --all     - Fetch every page of API results (per_page per request),
+                following X-WP-TotalPages; results are printed as each page
+                arrives
+    --jsonl   - Print one JSON object per line instead of a JSON array
 
 Example:
     python3 search.py "custom post type" "plugin-handbook,theme-handbook" 10
+    python3 search.py "block" "" 100 --all --jsonl
 """
 
+from __future__ import annotations
+
+import itertools
 import json
 import sys
-import urllib.request
-import urllib.error
 import urllib.parse
-from typing import List, Optional
+from collections.abc import Iterable, Iterator
+
+import corpus
+import daemon
+import prefetch
+from cache import fetch_json_page, raise_api_error
 
 API_BASE_URL = "https://developer.wordpress.org/wp-json/wp/v2"
 REQUEST_TIMEOUT = 10
@@ -34,9 +53,27 @@ HANDBOOK_SUBTYPES = [
 ]
 
 
-def search_handbooks(query: str, subtypes: Optional[List[str]] = None, per_page: int = 5) -> List[dict]:
-    """Search WordPress handbooks."""
-    # Validate subtypes
+def _search_passages(query: str, subtypes: list[str], limit: int) -> list[dict]:
+    import search_index
+    from html_convert import html_to_markdown
+
+    results = search_index.search_passages(query, subtypes, limit)
+    if corpus.default_backend() == "sqlite":
+        import sqlite_store as store
+    else:
+        import snapshot as store
+    markdown = {}
+    for subtype in dict.fromkeys(result["subtype"] for result in results):
+        doc_ids = [result["id"] for result in results if result["subtype"] == subtype]
+        for doc_id, data in store.get_documents(subtype, doc_ids).items():
+            markdown[subtype, doc_id] = html_to_markdown(data["content"]["rendered"])
+    for result in results:
+        content = markdown.get((result["subtype"], result["id"]), "")
+        result["content"] = content[result["start"]:result["end"]]
+    return results
+
+
+def _validate_subtypes(subtypes: list[str] | None) -> None:
     if subtypes:
         invalid = [s for s in subtypes if s not in HANDBOOK_SUBTYPES]
         if invalid:
@@ -45,6 +82,21 @@ def search_handbooks(query: str, subtypes: Optional[List[str]] = None, per_page:
                 f"Valid: {', '.join(HANDBOOK_SUBTYPES)}"
             )
 
+
+def search_handbooks_page(
+    query: str,
+    subtypes: list[str] | None = None,
+    per_page: int = 5,
+    page: int = 1,
+) -> dict:
+    """
+    Fetch one page of API search results.
+
+    Returns {"results": [...], "total_pages": n}, where n is the API's
+    X-WP-TotalPages for the query.
+    """
+    _validate_subtypes(subtypes)
+
     # Build query parameters
     params = {
         "search": query,
@@ -52,16 +104,16 @@ def search_handbooks(query: str, subtypes: Optional[List[str]] = None, per_page:
         "_fields": "id,title,url,subtype",
         "subtype": ",".join(subtypes) if subtypes else ",".join(HANDBOOK_SUBTYPES),
     }
+    if page > 1:
+        params["page"] = str(page)
 
     url = f"{API_BASE_URL}/search?{urllib.parse.urlencode(params)}"
 
     try:
-        with urllib.request.urlopen(url, timeout=REQUEST_TIMEOUT) as response:
-            data = json.loads(response.read().decode())
-    except urllib.error.HTTPError as e:
-        raise RuntimeError(f"HTTP error {e.code}") from e
-    except urllib.error.URLError as e:
-        raise RuntimeError(f"Network error: {e.reason}") from e
+        data, total_pages = fetch_json_page(url, "search", timeout=REQUEST_TIMEOUT)
+    except OSError as e:
+        raise_api_error(e)
+        raise
 
     if not isinstance(data, list):
         error_message = "Unexpected API response"
@@ -69,7 +121,7 @@ def search_handbooks(query: str, subtypes: Optional[List[str]] = None, per_page:
             error_message = data.get("message", error_message)
         raise RuntimeError(error_message)
 
-    return [
+    results = [
         {
             "id": item["id"],
             "title": item["title"],
@@ -78,27 +130,155 @@ def search_handbooks(query: str, subtypes: Optional[List[str]] = None, per_page:
         }
         for item in data
     ]
+    return {"results": results, "total_pages": total_pages}
+
+
+def search_handbooks(
+    query: str,
+    subtypes: list[str] | None = None,
+    per_page: int = 5,
+    offline: bool = False,
+    prefetch_hits: int = 0,
+    passages: bool = False,
+) -> list[dict]:
+    """
+    Search WordPress handbooks.
+
+    With `prefetch_hits`, the documents of that many top hits are fetched
+    into the response cache in the background (see prefetch.py).
+
+    Offline results are ranked with BM25, boosted by each document's link
+    authority (see link_graph.py).
+
+    With `passages` (offline only), the results are the best-matching
+    sections of the corpus instead of documents: each has the anchor,
+    heading, level and `start`/`end` offsets of the section in the
+    document's Markdown, and the section itself as "content".
+    """
+    _validate_subtypes(subtypes)
+
+    if passages:
+        if not offline:
+            raise ValueError("Passage search needs the offline corpus: run sync.py and pass --offline")
+        return _search_passages(query, subtypes or HANDBOOK_SUBTYPES, min(max(1, per_page), 100))
+
+    if offline:
+        if corpus.default_backend() == "sqlite":
+            import sqlite_store as store
+        else:
+            import search_index as store
+        import link_graph
+
+        limit = min(max(1, per_page), 100)
+        results = store.search(query, subtypes or HANDBOOK_SUBTYPES, max(limit, link_graph.RERANK_DEPTH))
+        return link_graph.rerank(results, limit)
+
+    results = search_handbooks_page(query, subtypes, per_page)["results"]
+    prefetch.schedule("handbook", results, prefetch_hits)
+    return results
+
+
+def iter_handbook_results(
+    query: str,
+    subtypes: list[str] | None = None,
+    per_page: int = 5,
+    prefetch_hits: int = 0,
+) -> Iterator[dict]:
+    """
+    Yield every API search result, one page of `per_page` at a time.
+
+    Pages are requested in order until X-WP-TotalPages is reached, and the
+    results of each page are yielded as soon as it is decoded, so only one
+    page is held in memory.
+    """
+    page, total_pages = 1, 1
+    while page <= total_pages:
+        data = daemon.call_or_run(
+            "handbook.search_page", search_handbooks_page,
+            query=query, subtypes=subtypes, per_page=per_page, page=page,
+        )
+        if page == 1:
+            prefetch.schedule("handbook", data["results"], prefetch_hits)
+        yield from data["results"]
+        total_pages = data["total_pages"]
+        page += 1
+
+
+def _print_results(results: Iterable[dict], jsonl: bool) -> None:
+    """Print results as they arrive, as a JSON array or as JSON Lines."""
+    results = iter(results)
+    first = next(results, None)
+    if first is None:
+        print("No results found. Try different keywords.", file=sys.stderr if jsonl else sys.stdout)
+        return
+
+    if jsonl:
+        for result in itertools.chain([first], results):
+            print(json.dumps(result), flush=True)
+        return
+
+    # The same text as json.dumps(list, indent=2), written one item at a time.
+    separator = "[\n"
+    for result in itertools.chain([first], results):
+        sys.stdout.write(separator + "  " + json.dumps(result, indent=2).replace("\n", "\n  "))
+        sys.stdout.flush()
+        separator = ",\n"
+    sys.stdout.write("\n]\n")
 
 
 def main():
     args = sys.argv[1:]
 
+    offline = corpus.offline_default()
+    if "--offline" in args:
+        args.remove("--offline")
+        offline = True
+
+    prefetch_hits = prefetch.prefetch_default()
+    if "--prefetch" in args:
+        index = args.index("--prefetch")
+        try:
+            prefetch_hits = int(args[index + 1])
+        except (IndexError, ValueError):
+            print("Error: --prefetch requires a number", file=sys.stderr)
+            sys.exit(1)
+        del args[index:index + 2]
+
+    passages = "--passages" in args
+    if passages:
+        args.remove("--passages")
+
+    all_pages = "--all" in args
+    if all_pages:
+        args.remove("--all")
+
+    jsonl = "--jsonl" in args
+    if jsonl:
+        args.remove("--jsonl")
+
+    if all_pages and (offline or passages):
+        print("Error: --all pages through the API and cannot be combined with --offline or --passages", file=sys.stderr)
+        sys.exit(1)
+
     if not args:
-        print("Usage: search.py <query> [subtypes] [per_page]", file=sys.stderr)
+        print("Usage: search.py <query> [subtypes] [per_page] [--offline] [--prefetch N] [--passages] [--all] [--jsonl]", file=sys.stderr)
         print('Example: search.py "custom post type" "plugin-handbook" 5', file=sys.stderr)
         sys.exit(1)
 
     query = args[0]
-    subtypes = [s.strip() for s in args[1].split(",")] if len(args) > 1 else None
+    subtypes = [s.strip() for s in args[1].split(",") if s.strip()] if len(args) > 1 else None
     per_page = int(args[2]) if len(args) > 2 else 5
 
     try:
-        results = search_handbooks(query, subtypes, per_page)
-
-        if not results:
-            print("No results found. Try different keywords.")
+        if all_pages:
+            results = iter_handbook_results(query, subtypes, per_page, prefetch_hits)
         else:
-            print(json.dumps(results, indent=2))
+            results = daemon.call_or_run(
+                "handbook.search", search_handbooks,
+                query=query, subtypes=subtypes, per_page=per_page, offline=offline, prefetch_hits=prefetch_hits,
+                passages=passages,
+            )
+        _print_results(results, jsonl)
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
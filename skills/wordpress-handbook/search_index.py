@@ -0,0 +1,577 @@
+#!/usr/bin/env python3
+"""
+BM25 search over the local offline corpus.
+
+Each synced subtype gets an inverted index next to its corpus file. Title,
+excerpt and body are indexed as separate fields; a posting list is a run of
+(document gap, term frequency) pairs varint-encoded into one `array('B')`
+per field, addressed through a lexicon of term -> (offset, length, df).
+Queries score every field with BM25, combine the fields with fixed weights
+and keep the top k results in a heap.
+
+A second index per subtype covers passages: the heading-delimited sections
+of each document's Markdown (see html_convert.markdown_sections), indexed by
+heading and body, so a query can be answered with the best sections rather
+than whole pages.
+
+Indexes are rebuilt automatically when their corpus file is newer, so a
+stale index is never used after a sync.
+
+Index files (also used by symbol_index.py) have a layout of their own rather
+than a Python serialization format, so an index built by one interpreter,
+for instance inside a bundled corpus, reads the same on any other:
+
+    header  FILE_HEADER: magic, byte order and `array("I")` item size of
+            the machine that wrote it, length of the JSON part
+    JSON    the index as a JSON object, in which each `bytes` value (the
+            packed arrays) is replaced by {BLOB_KEY: [offset, length]}
+    blobs   the bytes values, back to back
+
+A file written on a machine with another byte order or item size is rebuilt
+rather than read.
+
+This module is shared by the wordpress-handbook and wordpress-code-reference
+skills and must be kept identical in both skill directories.
+"""
+
+from __future__ import annotations
+
+import heapq
+import html
+import json
+import math
+import os
+import re
+import struct
+import sys
+from array import array
+from collections.abc import Iterable
+
+import corpus
+from html_convert import markdown_sections
+
+INDEX_VERSION = 1
+
+FILE_MAGIC = b"WPINDEX\x01"
+# magic, byte order (0 little, 1 big), item size of array("I"), JSON length
+FILE_HEADER = struct.Struct("<8sBBQ")
+# Marks a bytes value in the JSON part; no index has a key starting with NUL.
+BLOB_KEY = "\0blob"
+_BYTE_ORDER = 0 if sys.byteorder == "little" else 1
+
+# BM25 parameters.
+K1 = 1.2
+B = 0.75
+
+# Relative weight of each field in the combined score.
+FIELD_WEIGHTS = {
+    "title": 3.0,
+    "excerpt": 2.0,
+    "body": 1.0,
+}
+PASSAGE_FIELD_WEIGHTS = {
+    "heading": 2.0,
+    "body": 1.0,
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_TAG_RE = re.compile(r"<[^>]+>")
+_LINK_TARGET_RE = re.compile(r"\]\([^)]*\)")
+
+# Loaded indexes, keyed by path, so a long-lived process parses each file once.
+_loaded: dict[str, object] = {}
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into lowercase alphanumeric tokens (snake_case is split on `_`)."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def plain_text(document: dict, field: str) -> str:
+    """Return a rendered field of an API document as plain text."""
+    value = document.get(field) or {}
+    rendered = value.get("rendered", "") if isinstance(value, dict) else str(value)
+    return html.unescape(_TAG_RE.sub(" ", rendered))
+
+
+def write_index_file(path: str, data: dict) -> None:
+    """Store an index, a dict of JSON values and bytes, in the index file format."""
+    blobs = []
+    size = 0
+
+    def extract(value):
+        nonlocal size
+        if isinstance(value, bytes):
+            blobs.append(value)
+            size += len(value)
+            return {BLOB_KEY: [size - len(value), len(value)]}
+        if isinstance(value, dict):
+            return {key: extract(item) for key, item in value.items()}
+        return value
+
+    meta = json.dumps(extract(data), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def write(tmp_path):
+        with open(tmp_path, "wb") as f:
+            f.write(FILE_HEADER.pack(FILE_MAGIC, _BYTE_ORDER, array("I").itemsize, len(meta)))
+            f.write(meta)
+            for blob in blobs:
+                f.write(blob)
+
+    corpus.write_atomic(path, write)
+
+
+def read_index_file(buffer) -> dict | None:
+    """Return the index stored in the bytes of an index file, or None if this machine cannot read it."""
+    if len(buffer) < FILE_HEADER.size:
+        return None
+    magic, byte_order, item_size, meta_length = FILE_HEADER.unpack_from(buffer, 0)
+    if magic != FILE_MAGIC or byte_order != _BYTE_ORDER or item_size != array("I").itemsize:
+        return None
+    start = FILE_HEADER.size + meta_length
+
+    def blob(value: dict):
+        # Called for every JSON object; only the one-key blob references change.
+        if len(value) != 1 or BLOB_KEY not in value:
+            return value
+        offset, length = value[BLOB_KEY]
+        return bytes(buffer[start + offset:start + offset + length])
+
+    try:
+        return json.loads(bytes(buffer[FILE_HEADER.size:start]), object_hook=blob)
+    except ValueError:
+        return None
+
+
+def _encode_varint(out: array, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _decode_postings(blob: array, offset: int, length: int):
+    """Yield (document ordinal, term frequency) pairs from an encoded posting list."""
+    end = offset + length
+    position = offset
+    doc = 0
+    values = []
+    while position < end:
+        value = shift = 0
+        while True:
+            byte = blob[position]
+            position += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+        values.append(value)
+        if len(values) == 2:
+            doc += values[0]
+            yield doc, values[1]
+            values = []
+
+
+def _build_fields(records: Iterable[dict[str, str]], weights: dict[str, float]) -> dict:
+    """Index the texts of each record (field -> text), numbering records from 0."""
+    field_terms = {field: {} for field in weights}
+    field_lengths = {field: [] for field in weights}
+
+    for ordinal, texts in enumerate(records):
+        for field in weights:
+            tokens = tokenize(texts[field])
+            field_lengths[field].append(len(tokens))
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            terms = field_terms[field]
+            for token, tf in counts.items():
+                terms.setdefault(token, []).append((ordinal, tf))
+
+    fields = {}
+    for field, terms in field_terms.items():
+        blob = array("B")
+        lexicon = {}
+        for term in sorted(terms):
+            offset = len(blob)
+            previous = 0
+            for ordinal, tf in terms[term]:
+                _encode_varint(blob, ordinal - previous)
+                _encode_varint(blob, tf)
+                previous = ordinal
+            lexicon[term] = (offset, len(blob) - offset, len(terms[term]))
+        lengths = field_lengths[field]
+        fields[field] = {
+            "lexicon": lexicon,
+            "postings": blob.tobytes(),
+            "lengths": array("I", lengths).tobytes(),
+            "total_length": sum(lengths),
+        }
+    return fields
+
+
+def _load_fields(stored_fields: dict) -> dict:
+    return {
+        field: {
+            "lexicon": stored["lexicon"],
+            "postings": array("B", stored["postings"]),
+            "lengths": array("I", stored["lengths"]),
+            "total_length": stored["total_length"],
+        }
+        for field, stored in stored_fields.items()
+    }
+
+
+def _dump_fields(fields: dict) -> dict:
+    return {
+        field: {
+            "lexicon": stored["lexicon"],
+            "postings": stored["postings"].tobytes(),
+            "lengths": stored["lengths"].tobytes(),
+            "total_length": stored["total_length"],
+        }
+        for field, stored in fields.items()
+    }
+
+
+def _title(document: dict) -> str:
+    title = document.get("title") or {}
+    return title.get("rendered", "") if isinstance(title, dict) else str(title)
+
+
+class SubtypeIndex:
+    """The inverted index of one subtype."""
+
+    EXTENSION = ".idx"
+
+    def __init__(self, data: dict):
+        self.subtype = data["subtype"]
+        self.doc_ids = array("I", data["doc_ids"])
+        self.titles = data["titles"]
+        self.urls = data["urls"]
+        self.mtime = None
+        self.fields = _load_fields(data["fields"])
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    @classmethod
+    def build(cls, subtype: str, directory: str | None = None) -> "SubtypeIndex":
+        """Build the index of a subtype from its corpus file."""
+        doc_ids, titles, urls = [], [], []
+
+        def records():
+            for document in corpus.iter_documents(subtype, directory):
+                doc_ids.append(document["id"])
+                titles.append(_title(document))
+                urls.append(document.get("link", ""))
+                yield {
+                    "title": plain_text(document, "title"),
+                    "excerpt": plain_text(document, "excerpt"),
+                    "body": plain_text(document, "content"),
+                }
+
+        fields = _build_fields(records(), FIELD_WEIGHTS)
+        return cls({
+            "subtype": subtype,
+            "doc_ids": array("I", doc_ids).tobytes(),
+            "titles": titles,
+            "urls": urls,
+            "fields": fields,
+        })
+
+    def dump(self) -> dict:
+        return {
+            "version": INDEX_VERSION,
+            "subtype": self.subtype,
+            "doc_ids": self.doc_ids.tobytes(),
+            "titles": self.titles,
+            "urls": self.urls,
+            "fields": _dump_fields(self.fields),
+        }
+
+
+class PassageIndex:
+    """The inverted index of the sections of one subtype's documents."""
+
+    EXTENSION = ".pidx"
+
+    def __init__(self, data: dict):
+        self.subtype = data["subtype"]
+        self.doc_ids = array("I", data["doc_ids"])
+        self.titles = data["titles"]
+        self.urls = data["urls"]
+        # Per passage: document ordinal, offsets into the document's Markdown,
+        # heading level, anchor and heading.
+        self.documents = array("I", data["documents"])
+        self.starts = array("I", data["starts"])
+        self.ends = array("I", data["ends"])
+        self.levels = array("B", data["levels"])
+        self.anchors = data["anchors"]
+        self.headings = data["headings"]
+        self.mtime = None
+        self.fields = _load_fields(data["fields"])
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    @classmethod
+    def from_pages(
+        cls, subtype: str, pages: Iterable[tuple[dict, str, list[dict]]]
+    ) -> "PassageIndex":
+        """
+        Index the sections of (document, markdown, sections) triples, as
+        returned for each document by html_convert.markdown_sections.
+        """
+        doc_ids, titles, urls = [], [], []
+        documents, starts, ends, levels, anchors, headings = [], [], [], [], [], []
+
+        def records():
+            for document, markdown, sections in pages:
+                ordinal = len(doc_ids)
+                doc_ids.append(document["id"])
+                titles.append(_title(document))
+                urls.append(document.get("link", ""))
+                for section in sections:
+                    documents.append(ordinal)
+                    starts.append(section["start"])
+                    ends.append(section["end"])
+                    levels.append(section["level"])
+                    anchors.append(section["anchor"])
+                    headings.append(section["heading"])
+                    body = markdown[section["start"]:section["end"]]
+                    yield {
+                        "heading": section["heading"],
+                        "body": _LINK_TARGET_RE.sub("]", body),
+                    }
+
+        fields = _build_fields(records(), PASSAGE_FIELD_WEIGHTS)
+        return cls({
+            "subtype": subtype,
+            "doc_ids": array("I", doc_ids).tobytes(),
+            "titles": titles,
+            "urls": urls,
+            "documents": array("I", documents).tobytes(),
+            "starts": array("I", starts).tobytes(),
+            "ends": array("I", ends).tobytes(),
+            "levels": array("B", levels).tobytes(),
+            "anchors": anchors,
+            "headings": headings,
+            "fields": fields,
+        })
+
+    @classmethod
+    def build(cls, subtype: str, directory: str | None = None) -> "PassageIndex":
+        """Build the passage index of a subtype from its corpus file."""
+        def pages():
+            for document in corpus.iter_documents(subtype, directory):
+                content = document.get("content") or {}
+                rendered = content.get("rendered", "") if isinstance(content, dict) else str(content)
+                yield (document, *markdown_sections(rendered))
+
+        return cls.from_pages(subtype, pages())
+
+    def dump(self) -> dict:
+        return {
+            "version": INDEX_VERSION,
+            "subtype": self.subtype,
+            "doc_ids": self.doc_ids.tobytes(),
+            "titles": self.titles,
+            "urls": self.urls,
+            "documents": self.documents.tobytes(),
+            "starts": self.starts.tobytes(),
+            "ends": self.ends.tobytes(),
+            "levels": self.levels.tobytes(),
+            "anchors": self.anchors,
+            "headings": self.headings,
+            "fields": _dump_fields(self.fields),
+        }
+
+    def passage(self, ordinal: int) -> dict:
+        """Return one passage as {id, title, url, subtype, anchor, heading, level, start, end}."""
+        document = self.documents[ordinal]
+        anchor = self.anchors[ordinal]
+        url = self.urls[document]
+        return {
+            "id": self.doc_ids[document],
+            "title": self.titles[document],
+            "url": f"{url}#{anchor}" if anchor else url,
+            "subtype": self.subtype,
+            "anchor": anchor,
+            "heading": self.headings[ordinal],
+            "level": self.levels[ordinal],
+            "start": self.starts[ordinal],
+            "end": self.ends[ordinal],
+        }
+
+
+def _index_path(subtype: str, directory: str, kind=SubtypeIndex) -> str:
+    return os.path.join(directory, f"{subtype}{kind.EXTENSION}")
+
+
+def build_index(subtype: str, directory: str | None = None, kind=SubtypeIndex):
+    """Build and store the index of a subtype, replacing any previous one."""
+    directory = directory or corpus.default_corpus_dir()
+    index = kind.build(subtype, directory)
+    path = _index_path(subtype, directory, kind)
+
+    write_index_file(path, index.dump())
+    index.mtime = os.stat(path).st_mtime
+    _loaded[path] = index
+    return index
+
+
+def _load_bundled(packed, subtype: str, kind):
+    """Return a subtype's index from a bundle, building it in memory if it has none."""
+    name = f"{subtype}{kind.EXTENSION}"
+    key = f"{packed.path}!{name}"
+    index = _loaded.get(key)
+    if index is not None and index.mtime == packed.stamp:
+        return index
+    data = packed.member(name)
+    if data is not None:
+        data = read_index_file(data)
+    if data is not None and data.get("version") == INDEX_VERSION:
+        index = kind(data)
+    else:
+        index = kind.build(subtype)
+    index.mtime = packed.stamp
+    _loaded[key] = index
+    return index
+
+
+def load_index(subtype: str, directory: str | None = None, kind=SubtypeIndex):
+    """
+    Return the index of a subtype, (re)building it if it is missing or stale.
+
+    `kind` is SubtypeIndex for documents or PassageIndex for passages.
+    """
+    packed = corpus.bundled(subtype, directory)
+    if packed is not None:
+        return _load_bundled(packed, subtype, kind)
+    directory = directory or corpus.default_corpus_dir()
+    path = _index_path(subtype, directory, kind)
+    data_path = corpus.data_path(directory, subtype)
+
+    try:
+        index_mtime = os.stat(path).st_mtime
+    except OSError:
+        index_mtime = None
+    try:
+        data_mtime = os.stat(data_path).st_mtime
+    except OSError:
+        data_mtime = None
+
+    if index_mtime is None or (data_mtime is not None and data_mtime > index_mtime):
+        return build_index(subtype, directory, kind)
+
+    index = _loaded.get(path)
+    if index is not None and index.mtime == index_mtime:
+        return index
+
+    with open(path, "rb") as f:
+        data = read_index_file(f.read())
+    if data is None or data.get("version") != INDEX_VERSION:
+        return build_index(subtype, directory, kind)
+    index = kind(data)
+    index.mtime = index_mtime
+    _loaded[path] = index
+    return index
+
+
+def search(query: str, subtypes: list[str], limit: int, directory: str | None = None) -> list[dict]:
+    """
+    Return the top `limit` documents for a query, ranked by BM25.
+
+    Results have the same {id, title, url, subtype} shape as the REST API
+    search endpoint, plus a "score". Collection statistics (document count,
+    average field length, document frequency) are pooled over all the
+    requested subtypes so scores are comparable across them.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms or limit < 1:
+        return []
+
+    indexes = [load_index(subtype, directory) for subtype in subtypes]
+    results = []
+    for score, index, ordinal in _rank(indexes, terms, FIELD_WEIGHTS, limit):
+        results.append({
+            "id": index.doc_ids[ordinal],
+            "title": index.titles[ordinal],
+            "url": index.urls[ordinal],
+            "subtype": index.subtype,
+            "score": round(score, 4),
+        })
+    return results
+
+
+def rank_passages(query: str, indexes: list[PassageIndex], limit: int) -> list[dict]:
+    """Return the top `limit` passages of the given passage indexes for a query."""
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms or limit < 1:
+        return []
+    return [
+        {**index.passage(ordinal), "score": round(score, 4)}
+        for score, index, ordinal in _rank(indexes, terms, PASSAGE_FIELD_WEIGHTS, limit)
+    ]
+
+
+def search_passages(query: str, subtypes: list[str], limit: int, directory: str | None = None) -> list[dict]:
+    """
+    Return the top `limit` sections of the offline corpus for a query.
+
+    Results are the {id, title, url, subtype, anchor, heading, level, start,
+    end} dicts of PassageIndex.passage plus a "score"; the URL points at the
+    section's anchor, and start/end are offsets into the document's Markdown.
+    """
+    indexes = [load_index(subtype, directory, PassageIndex) for subtype in subtypes]
+    return rank_passages(query, indexes, limit)
+
+
+def _rank(indexes: list, terms: list[str], weights: dict[str, float], limit: int) -> list[tuple]:
+    """Score the records of the indexes with BM25; return the top (score, index, ordinal)."""
+    total_docs = sum(len(index) for index in indexes)
+    if not total_docs:
+        return []
+
+    # Pooled statistics per field.
+    average_length = {}
+    idf = {}
+    for field in weights:
+        total_length = sum(index.fields[field]["total_length"] for index in indexes)
+        average_length[field] = (total_length / total_docs) or 1.0
+        for term in terms:
+            df = sum(
+                index.fields[field]["lexicon"].get(term, (0, 0, 0))[2] for index in indexes
+            )
+            if df:
+                idf[field, term] = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+
+    heap = []
+    for index_number, index in enumerate(indexes):
+        scores: dict[int, float] = {}
+        for field, weight in weights.items():
+            stored = index.fields[field]
+            lengths = stored["lengths"]
+            norm = K1 * (1 - B)
+            scale = K1 * B / average_length[field]
+            for term in terms:
+                entry = stored["lexicon"].get(term)
+                if entry is None:
+                    continue
+                term_weight = weight * idf[field, term] * (K1 + 1)
+                for ordinal, tf in _decode_postings(stored["postings"], entry[0], entry[1]):
+                    denominator = tf + norm + scale * lengths[ordinal]
+                    scores[ordinal] = scores.get(ordinal, 0.0) + term_weight * tf / denominator
+
+        for ordinal, score in scores.items():
+            item = (score, -index_number, -ordinal)
+            if len(heap) < limit:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+
+    return [
+        (score, indexes[-negative_index], -negative_ordinal)
+        for score, negative_index, negative_ordinal in sorted(heap, reverse=True)
+    ]
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+SQLite backend for the offline corpus.
+
+With WP_SKILLS_BACKEND=sqlite, offline searches and lookups are answered
+from `corpus.sqlite3` in the corpus directory instead of the BM25 index and
+the snapshot. The database is a plain SQLite file that can be inspected and
+queried directly:
+
+    documents      one row per document: subtype, id, title, url,
+                   modified_gmt, since, source_file and the stored document
+                   as JSON, with indexes on subtype, id, since and source_file
+    documents_fts  FTS5 table over title and plain-text body, keyed by the
+                   documents rowid
+    sources        the corpus file each subtype was imported from
+
+sync.py imports every subtype it syncs. A subtype whose corpus file has
+changed since its import is re-imported before it is read, as the search
+indexes are rebuilt. A subtype only in the bundled corpus (see bundle.py) is
+imported from the bundle on first use, and again when the bundle changes.
+
+The database runs in WAL mode, so readers in other processes are not blocked
+by an import. Each thread keeps one connection, whose statement cache reuses
+the prepared statements below across lookups.
+
+This module is shared by the wordpress-handbook and wordpress-code-reference
+skills and must be kept identical in both skill directories.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import Iterable
+
+import corpus
+import search_index
+
+DATABASE_NAME = "corpus.sqlite3"
+SCHEMA_VERSION = 1
+
+# Seconds a writer waits for another writer's transaction to finish.
+BUSY_TIMEOUT = 30
+
+# FTS5 column weights for bm25(), in column order (title, body).
+TITLE_WEIGHT = 3.0
+BODY_WEIGHT = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    subtype TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    url TEXT NOT NULL,
+    modified_gmt TEXT,
+    since INTEGER,
+    source_file INTEGER,
+    document TEXT NOT NULL,
+    UNIQUE (subtype, id)
+);
+CREATE INDEX IF NOT EXISTS documents_subtype ON documents (subtype);
+CREATE INDEX IF NOT EXISTS documents_id ON documents (id);
+CREATE INDEX IF NOT EXISTS documents_since ON documents (since);
+CREATE INDEX IF NOT EXISTS documents_source_file ON documents (source_file);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5 (title, body);
+CREATE TABLE IF NOT EXISTS sources (
+    subtype TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+"""
+
+_SELECT_DOCUMENT = "SELECT document FROM documents WHERE subtype = ? AND id = ?"
+_SELECT_SOURCE = "SELECT mtime_ns, size FROM sources WHERE subtype = ?"
+_SEARCH = f"""
+SELECT d.id, d.title, d.url, d.subtype, -bm25(documents_fts, {TITLE_WEIGHT}, {BODY_WEIGHT}) AS score
+FROM documents_fts JOIN documents AS d ON d.rowid = documents_fts.rowid
+WHERE documents_fts MATCH ? AND d.subtype IN (SELECT value FROM json_each(?))
+ORDER BY score DESC
+LIMIT ?
+"""
+
+_local = threading.local()
+
+
+def database_path(directory: str | None = None) -> str:
+    return os.path.join(directory or corpus.default_corpus_dir(), DATABASE_NAME)
+
+
+def connect(directory: str | None = None) -> sqlite3.Connection:
+    """Return this thread's connection to the corpus database, creating the schema."""
+    path = database_path(directory)
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    connection = connections.get(path)
+    if connection is not None:
+        return connection
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None)
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("PRAGMA synchronous = NORMAL")
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+    if version != SCHEMA_VERSION:
+        try:
+            connection.executescript(SCHEMA)
+        except sqlite3.OperationalError as e:
+            connection.close()
+            raise RuntimeError(f"The SQLite backend needs SQLite with FTS5: {e}") from e
+        connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    connections[path] = connection
+    return connection
+
+
+def _stamp(subtype: str, directory: str | None) -> tuple | None:
+    """Return (mtime_ns, size) of the corpus file or bundle a subtype is read from, or None."""
+    try:
+        st = os.stat(corpus.data_path(directory or corpus.default_corpus_dir(), subtype))
+    except OSError:
+        packed = corpus.bundled(subtype, directory)
+        return packed.stamp if packed is not None else None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _first(value):
+    return value[0] if isinstance(value, list) and value else None
+
+
+def import_subtype(subtype: str, directory: str | None = None) -> int:
+    """Replace the stored rows of a subtype with its corpus file (or bundle) and return the row count."""
+    connection = connect(directory)
+    stamp = _stamp(subtype, directory)
+    count = 0
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        connection.execute(
+            "DELETE FROM documents_fts WHERE rowid IN (SELECT rowid FROM documents WHERE subtype = ?)",
+            (subtype,),
+        )
+        connection.execute("DELETE FROM documents WHERE subtype = ?", (subtype,))
+        for document in corpus.iter_documents(subtype, directory):
+            title = document.get("title") or {}
+            cursor = connection.execute(
+                "INSERT INTO documents (subtype, id, title, url, modified_gmt, since, source_file, document)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    subtype,
+                    document["id"],
+                    title.get("rendered", "") if isinstance(title, dict) else str(title),
+                    document.get("link", ""),
+                    document.get("modified_gmt"),
+                    _first(document.get("wp-parser-since")),
+                    _first(document.get("wp-parser-source-file")),
+                    json.dumps(document, separators=(",", ":")),
+                ),
+            )
+            body = " ".join(filter(None, (
+                search_index.plain_text(document, "excerpt"),
+                search_index.plain_text(document, "content"),
+            )))
+            connection.execute(
+                "INSERT INTO documents_fts (rowid, title, body) VALUES (?, ?, ?)",
+                (cursor.lastrowid, search_index.plain_text(document, "title"), body),
+            )
+            count += 1
+        connection.execute(
+            "INSERT OR REPLACE INTO sources (subtype, mtime_ns, size) VALUES (?, ?, ?)",
+            (subtype, *stamp) if stamp else (subtype, 0, 0),
+        )
+        connection.execute("COMMIT")
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    return count
+
+
+def _ensure_current(subtypes: Iterable[str], directory: str | None) -> sqlite3.Connection:
+    connection = connect(directory)
+    for subtype in subtypes:
+        stamp = _stamp(subtype, directory)
+        if stamp is None:
+            raise RuntimeError(
+                f"Offline corpus for {subtype} not found. Run sync.py to download it."
+            )
+        if connection.execute(_SELECT_SOURCE, (subtype,)).fetchone() != stamp:
+            import_subtype(subtype, directory)
+    return connection
+
+
+def search(query: str, subtypes: list[str], limit: int, directory: str | None = None) -> list[dict]:
+    """
+    Return the top `limit` documents for a query, ranked by FTS5's BM25.
+
+    Results have the same {id, title, url, subtype, score} shape as
+    search_index.search; any query term may match.
+    """
+    terms = list(dict.fromkeys(search_index.tokenize(query)))
+    if not terms or limit < 1:
+        return []
+    connection = _ensure_current(subtypes, directory)
+    match = " OR ".join(f'"{term}"' for term in terms)
+    rows = connection.execute(_SEARCH, (match, json.dumps(subtypes), limit))
+    return [
+        {"id": doc_id, "title": title, "url": url, "subtype": subtype, "score": round(score, 4)}
+        for doc_id, title, url, subtype, score in rows
+    ]
+
+
+def get_documents(subtype: str, doc_ids: Iterable[int], directory: str | None = None) -> dict[int, dict]:
+    """Return the stored documents of one subtype for the given IDs, keyed by ID."""
+    connection = _ensure_current([subtype], directory)
+    found = {}
+    for doc_id in doc_ids:
+        row = connection.execute(_SELECT_DOCUMENT, (subtype, doc_id)).fetchone()
+        if row is not None:
+            found[doc_id] = json.loads(row[0])
+    return found
+
+
+def get_document(subtype: str, doc_id: int, directory: str | None = None) -> dict | None:
+    """Return one stored document in API shape, or None if it is not in the database."""
+    return get_documents(subtype, [doc_id], directory).get(doc_id)
@@ -0,0 +1,131 @@
+"""
+Helpers shared by the tests.
+
+Importing this module puts the handbook skill directory on sys.path, so the
+shared modules (identical in both skills) can be imported by name. Scripts
+that differ between the skills are loaded with `load_script`.
+"""
+
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parent.parent
+HANDBOOK_DIR = ROOT / "skills" / "wordpress-handbook"
+CODE_REF_DIR = ROOT / "skills" / "wordpress-code-reference"
+
+if str(HANDBOOK_DIR) not in sys.path:
+    sys.path.insert(0, str(HANDBOOK_DIR))
+
+
+def load_script(skill_dir: Path, name: str):
+    """Import a skill script from `skill_dir` under a module name unique to that skill."""
+    module_name = f"{skill_dir.name.replace('-', '_')}_{name}"
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    if str(skill_dir) not in sys.path:
+        sys.path.append(str(skill_dir))
+    spec = importlib.util.spec_from_file_location(module_name, skill_dir / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def isolate(test, **environ) -> Path:
+    """
+    Give a test its own cache and corpus directories and a quiet environment.
+
+    The daemon, prefetching, the bundle and the rate limiter are switched
+    off unless `environ` sets them. Returns the temporary directory, which
+    is removed when the test ends.
+    """
+    tmp = tempfile.TemporaryDirectory(prefix="wp-skills-test-")
+    test.addCleanup(tmp.cleanup)
+    settings = {
+        key: value for key, value in os.environ.items() if not key.startswith("WP_SKILLS_")
+    }
+    settings.update({
+        "WP_SKILLS_CACHE_DIR": os.path.join(tmp.name, "cache"),
+        "WP_SKILLS_CORPUS_DIR": os.path.join(tmp.name, "corpus"),
+        "WP_SKILLS_DAEMON": "0",
+        "WP_SKILLS_DAEMON_SOCKET": os.path.join(tmp.name, "daemon.sock"),
+        "WP_SKILLS_BUNDLE": "",
+        "WP_SKILLS_PREFETCH": "0",
+        "WP_SKILLS_RATE_LIMIT": "0",
+    })
+    settings.update(environ)
+    patcher = mock.patch.dict(os.environ, settings, clear=True)
+    patcher.start()
+    test.addCleanup(patcher.stop)
+    return Path(tmp.name)
+
+
+def document(doc_id: int, subtype: str = "plugin-handbook", title: str = "", content: str = "",
+             link: str = "", modified: str = "2024-01-01T00:00:00", **fields) -> dict:
+    """Return a document in the shape the REST API and the corpus store use."""
+    title = title or f"Document {doc_id}"
+    return {
+        "id": doc_id,
+        "subtype": subtype,
+        "title": {"rendered": title},
+        "link": link or f"https://developer.wordpress.org/{subtype}/document-{doc_id}/",
+        "excerpt": {"rendered": ""},
+        "content": {"rendered": content or f"<p>{title}</p>"},
+        "modified_gmt": modified,
+        **fields,
+    }
+
+
+class ApiServer:
+    """
+    A local HTTP server answering GET requests from a function.
+
+    `respond(path, headers)` returns (status, headers, body); a body that is
+    not bytes is sent as JSON. Requests are recorded in `requests` as
+    (path, headers, client port) tuples.
+    """
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                server.requests.append((self.path, dict(self.headers), self.client_address[1]))
+                status, headers, body = server.respond(self.path, self.headers)
+                if not isinstance(body, bytes):
+                    body = json.dumps(body).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
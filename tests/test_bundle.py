@@ -0,0 +1,89 @@
+"""Tests for the prebuilt corpus bundle, read in place."""
+
+import gzip
+import os
+import unittest
+import zipfile
+from unittest import mock
+
+import support
+
+import bundle
+import corpus
+import search_index
+import snapshot
+
+SUBTYPE = "plugin-handbook"
+
+
+class BundleTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = support.isolate(self)
+        for cache in (search_index._loaded, snapshot._loaded):
+            self.addCleanup(cache.clear)
+        source = str(self.tmp / "source")
+        corpus.write_subtype(SUBTYPE, [
+            support.document(1, title="Custom Post Types"),
+            support.document(2, title="Shortcodes"),
+        ], source)
+        search_index.build_index(SUBTYPE, source)
+        snapshot.build(source)
+        self.source = source
+        self.path = str(self.tmp / bundle.BUNDLE_NAME)
+        self.summary = bundle.write(source, self.path)
+
+    def use(self, path):
+        patcher = mock.patch.dict(os.environ, {"WP_SKILLS_BUNDLE": path})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_members_are_read_in_place(self):
+        packed = bundle.Bundle(self.path)
+        self.assertEqual(packed.subtypes, [SUBTYPE])
+        self.assertIn("corpus.snap", self.summary["members"])
+        for name in self.summary["members"]:
+            with open(os.path.join(self.source, name), "rb") as f:
+                self.assertEqual(packed.member(name), f.read())
+        self.assertIsNone(packed.member("missing"))
+        with gzip.open(packed.open(corpus.data_path("", SUBTYPE)), "rt") as f:
+            self.assertEqual(len(f.readlines()), 2)
+
+    def test_same_corpus_gives_the_same_bytes(self):
+        again = str(self.tmp / "again.zip")
+        bundle.write(self.source, again)
+        with open(self.path, "rb") as first, open(again, "rb") as second:
+            self.assertEqual(first.read(), second.read())
+
+    def test_bundle_inside_a_skill_archive(self):
+        archive = str(self.tmp / "wordpress-handbook.skill")
+        with zipfile.ZipFile(archive, "w") as f:
+            f.writestr("SKILL.md", "---\nname: wordpress-handbook\n---\n", zipfile.ZIP_DEFLATED)
+            f.write(self.path, bundle.BUNDLE_NAME, zipfile.ZIP_STORED)
+        self.assertEqual(bundle.Bundle(archive).subtypes, [SUBTYPE])
+
+    def test_compressed_members_are_rejected(self):
+        path = str(self.tmp / "compressed.zip")
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as f:
+            f.writestr(corpus.data_path("", SUBTYPE), b"data")
+        with self.assertRaises(ValueError):
+            bundle.Bundle(path)
+        # Only a bundle named in WP_SKILLS_BUNDLE has to work.
+        self.use(path)
+        with self.assertRaises(ValueError):
+            bundle.find(corpus.data_path("", SUBTYPE))
+
+    def test_offline_lookups_fall_back_to_the_bundle(self):
+        self.use(self.path)
+        self.assertEqual(corpus.bundled(SUBTYPE).path, self.path)
+        self.assertEqual([r["id"] for r in search_index.search("shortcodes", [SUBTYPE], 5)], [2])
+        self.assertEqual(snapshot.get_document(SUBTYPE, 1)["title"]["rendered"], "Custom Post Types")
+        self.assertFalse(os.path.exists(corpus.default_corpus_dir()))
+
+        # A subtype synced locally is read from the local corpus.
+        corpus.write_subtype(SUBTYPE, [support.document(3, title="Shortcodes")])
+        self.assertIsNone(corpus.bundled(SUBTYPE))
+        self.assertEqual([r["id"] for r in search_index.search("shortcodes", [SUBTYPE], 5)], [3])
+
+
+if __name__ == "__main__":
+    unittest.main()
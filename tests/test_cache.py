@@ -0,0 +1,82 @@
+"""Tests for the on-disk response cache."""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import support  # noqa: F401
+
+import cache
+import http_client
+
+URL = "https://developer.wordpress.org/wp-json/wp/v2/plugin-handbook/1"
+
+
+def _response(body, status=200, headers=None):
+    return http_client.Response(URL, status, "OK", headers or {}, json.dumps(body).encode())
+
+
+class UnwritableCacheTest(unittest.TestCase):
+    def test_fetch_returns_body_when_cache_cannot_be_written(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            blocker = os.path.join(tmp, "file")
+            with open(blocker, "w") as f:
+                f.write("not a directory")
+            environ = {"WP_SKILLS_CACHE_DIR": os.path.join(blocker, "cache"), "WP_SKILLS_CACHE": "1"}
+            with mock.patch.dict(os.environ, environ), \
+                    mock.patch.object(http_client, "request", return_value=_response({"id": 1})) as request:
+                self.assertEqual(cache.fetch_json(URL), {"id": 1})
+                self.assertEqual(cache.fetch_json(URL), {"id": 1})
+            # Nothing was stored, so both lookups went upstream.
+            self.assertEqual(request.call_count, 2)
+
+
+class ResponseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def stored_bytes(self, store):
+        return sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, names in os.walk(store.directory) for name in names
+        )
+
+    def test_put_and_get(self):
+        store = cache.ResponseCache(self.tmp.name)
+        store.put("https://example.org/a", "body", {"ETag": '"1"', "Last-Modified": None})
+        entry = store.get("https://example.org/a")
+        self.assertEqual(entry["body"], "body")
+        self.assertEqual(entry["headers"], {"ETag": '"1"'})
+        self.assertIsNone(store.get("https://example.org/b"))
+
+    def test_running_size_matches_directory(self):
+        store = cache.ResponseCache(self.tmp.name)
+        for i in range(20):
+            store.put(f"https://example.org/{i}", "x" * 100, {})
+        store.put("https://example.org/0", "y" * 500, {})
+        with open(store.size_path) as f:
+            self.assertEqual(int(f.read()), self.stored_bytes(store))
+
+    def test_eviction_keeps_cache_under_cap(self):
+        store = cache.ResponseCache(self.tmp.name, max_bytes=2000)
+        for i in range(40):
+            store.put(f"https://example.org/{i}", "x" * 100, {})
+        self.assertLessEqual(self.stored_bytes(store), 2000)
+        with open(store.size_path) as f:
+            self.assertEqual(int(f.read()), self.stored_bytes(store))
+        self.assertIsNotNone(store.get("https://example.org/39"))
+
+    def test_missing_size_file_is_recounted(self):
+        store = cache.ResponseCache(self.tmp.name)
+        store.put("https://example.org/a", "x" * 100, {})
+        os.remove(store.size_path)
+        store.put("https://example.org/b", "x" * 100, {})
+        with open(store.size_path) as f:
+            self.assertEqual(int(f.read()), self.stored_bytes(store))
+
+
+if __name__ == "__main__":
+    unittest.main()
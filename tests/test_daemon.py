@@ -0,0 +1,75 @@
+"""Tests for the daemon protocol and the scripts' fallback to in-process work."""
+
+import os
+import threading
+import time
+import unittest
+from unittest import mock
+
+import support
+
+import daemon
+import daemon_server
+
+
+def echo(value):
+    return value
+
+
+class DaemonTest(unittest.TestCase):
+    def setUp(self):
+        tmp = support.isolate(self, WP_SKILLS_DAEMON="1")
+        self.release = threading.Event()
+        self.server = daemon_server.Server(str(tmp / "daemon.sock"), {
+            "test.echo": echo,
+            "test.items": self.items,
+        })
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def items(self, items):
+        for item in items:
+            if item == "wait":
+                self.release.wait(5)
+            else:
+                yield item * 2
+
+    def test_call(self):
+        self.assertEqual(daemon.call("test.echo", {"value": [1, 2]}), [1, 2])
+        self.assertIn("test.echo", daemon.call("ping")["methods"])
+
+    def test_invalid_params_are_reported(self):
+        with self.assertRaises(daemon.RemoteError):
+            daemon.call("test.echo", {"other": 1})
+
+    def test_unknown_method_runs_in_process(self):
+        self.assertEqual(daemon.call_or_run("test.missing", echo, value=3), 3)
+
+    def test_other_settings_run_in_process(self):
+        fallback = mock.Mock(return_value="in-process")
+        with mock.patch.dict(os.environ, {"WP_SKILLS_BACKEND": "sqlite"}):
+            self.assertEqual(daemon.call_or_run("test.echo", fallback, value=1), "in-process")
+            # Connection settings do not matter.
+            self.assertRaises(daemon.Unavailable, daemon.call, "test.echo", {"value": 1})
+        with mock.patch.dict(os.environ, {"WP_SKILLS_DAEMON_IDLE": "5"}):
+            self.assertEqual(daemon.call_or_run("test.echo", fallback, value=1), 1)
+        fallback.assert_called_once_with(value=1)
+
+    def test_batch_results_stream_as_they_complete(self):
+        results = daemon.stream_or_run("test.items", None, [1, "wait", 2])
+        started = time.monotonic()
+        self.assertEqual(next(results), 2)
+        self.assertLess(time.monotonic() - started, 2)
+        self.release.set()
+        self.assertEqual(list(results), [4])
+
+    def test_batch_runs_in_process_without_a_daemon(self):
+        with mock.patch.dict(os.environ, {"WP_SKILLS_DAEMON": "0"}):
+            results = daemon.stream_or_run("test.items", lambda items: (item * 3 for item in items), [1, 2])
+            self.assertEqual(list(results), [3, 6])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+"""Tests for the Markdown export of the handbook skill."""
+
+import hashlib
+import json
+import os
+import unittest
+
+import support
+
+import corpus
+
+export = support.load_script(support.HANDBOOK_DIR, "export")
+
+
+class ExportTest(unittest.TestCase):
+    def setUp(self):
+        self.output = str(support.isolate(self) / "export")
+        corpus.write_subtype("plugin-handbook", [
+            support.document(
+                1, title="Hooks &amp; Filters", link="https://developer.wordpress.org/plugins/hooks/",
+                content="<h2>Actions</h2><p>Use <code>add_action</code>.</p>",
+            ),
+            support.document(2, link="https://developer.wordpress.org/plugins/"),
+        ])
+        corpus.write_subtype("theme-handbook", [support.document(3, "theme-handbook")])
+
+    def export(self, subtypes):
+        return export.export_handbooks(self.output, subtypes, workers=2, offline=True)
+
+    def manifest(self):
+        with open(os.path.join(self.output, export.MANIFEST_NAME), encoding="utf-8") as f:
+            return {entry["path"]: entry for entry in json.load(f)["documents"]}
+
+    def test_documents_are_written_with_front_matter(self):
+        summary = self.export(["plugin-handbook"])
+        self.assertEqual(summary["documents"], 2)
+        with open(os.path.join(self.output, "plugin-handbook", "1-hooks.md"), encoding="utf-8") as f:
+            text = f.read()
+        self.assertTrue(text.startswith('---\ntitle: "Hooks & Filters"\n'))
+        self.assertIn("## Actions\n\nUse `add_action`.", text)
+
+    def test_manifest_checksums_match_the_files(self):
+        self.export(["plugin-handbook"])
+        manifest = self.manifest()
+        self.assertEqual(sorted(manifest), ["plugin-handbook/1-hooks.md", "plugin-handbook/2-plugins.md"])
+        for path, entry in manifest.items():
+            with open(os.path.join(self.output, path), "rb") as f:
+                data = f.read()
+            self.assertEqual(entry["bytes"], len(data))
+            self.assertEqual(entry["sha256"], hashlib.sha256(data).hexdigest())
+
+    def test_reexport_removes_gone_documents_and_keeps_other_subtypes(self):
+        self.export(["plugin-handbook", "theme-handbook"])
+        corpus.write_subtype("plugin-handbook", [support.document(2, link="https://developer.wordpress.org/plugins/")])
+        summary = self.export(["plugin-handbook"])
+        self.assertEqual(summary["removed"], 1)
+        self.assertFalse(os.path.exists(os.path.join(self.output, "plugin-handbook", "1-hooks.md")))
+        self.assertEqual(sorted(self.manifest()), ["plugin-handbook/2-plugins.md", "theme-handbook/3-document-3.md"])
+
+    def test_invalid_subtype(self):
+        with self.assertRaises(ValueError):
+            self.export(["no-such-handbook"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+"""Tests for the batch mode of get_content.py."""
+
+import threading
+import time
+import unittest
+import urllib.parse
+from unittest import mock
+
+import support
+
+import corpus
+import http_client
+
+handbook = support.load_script(support.HANDBOOK_DIR, "get_content")
+code_reference = support.load_script(support.CODE_REF_DIR, "get_content")
+
+
+class OfflineBatchTest(unittest.TestCase):
+    def setUp(self):
+        support.isolate(self)
+        corpus.write_subtype("plugin-handbook", [support.document(i) for i in range(1, 6)])
+
+    def test_results_stream_before_the_input_ends(self):
+        release = threading.Event()
+
+        def items():
+            yield "plugin-handbook", 1
+            release.wait(5)
+            yield "plugin-handbook", 2
+
+        started = time.monotonic()
+        results = handbook.get_handbook_contents(items(), offline=True)
+        first = next(results)
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(first["id"], 1)
+        release.set()
+        self.assertEqual([result["id"] for result in results], [2])
+
+    def test_invalid_and_missing_items_are_reported(self):
+        results = list(handbook.get_handbook_contents(
+            [("plugin-handbook", 1), ("no-such-handbook", 2), ("plugin-handbook", 99)], offline=True,
+        ))
+        by_id = {result["id"]: result for result in results}
+        self.assertEqual(by_id[1]["title"], "Document 1")
+        self.assertIn("Invalid subtype", by_id[2]["error"])
+        self.assertEqual(by_id[99]["error"], "Document not found")
+
+
+class OnlineBatchTest(unittest.TestCase):
+    def setUp(self):
+        support.isolate(self, WP_SKILLS_CACHE="0")
+        self.addCleanup(http_client.close)
+
+    def respond(self, path, headers):
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(path).query)
+        ids = [int(doc_id) for doc_id in query["include"][0].split(",")]
+        return 200, {}, [support.document(doc_id, "wp-parser-function") for doc_id in ids if doc_id != 7]
+
+    def test_ids_of_one_subtype_share_a_request(self):
+        with support.ApiServer(self.respond) as server, \
+                mock.patch.object(code_reference, "API_BASE_URL", server.url):
+            items = [("wp-parser-function", doc_id) for doc_id in range(1, 11)]
+            results = list(code_reference.get_code_ref_contents(items, workers=2))
+        self.assertEqual(len(server.requests), 1)
+        self.assertEqual(sorted(result["id"] for result in results), list(range(1, 11)))
+        self.assertEqual(
+            [result["id"] for result in results if "error" in result], [7],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
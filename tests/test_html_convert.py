@@ -0,0 +1,60 @@
+"""Tests for the HTML conversion shared by the skills."""
+
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import support  # noqa: F401
+
+import html_convert
+from html_convert import html_to_markdown, html_to_text, markdown_sections
+
+
+class PreformattedTest(unittest.TestCase):
+    HTML = (
+        "<p>Before  </p>\n\n\n"
+        '<pre><code class="language-php">$a = 1;  \n\n\n\n$b = 2;\n</code></pre>'
+        "<p>After</p>"
+    )
+
+    def test_markdown_keeps_pre_content(self):
+        self.assertEqual(
+            html_to_markdown(self.HTML),
+            "Before\n\n```php\n$a = 1;  \n\n\n\n$b = 2;\n```\n\nAfter",
+        )
+
+    def test_text_keeps_pre_content(self):
+        self.assertEqual(html_to_text(self.HTML), "Before\n\n$a = 1;  \n\n\n\n$b = 2;\n\nAfter")
+
+    def test_quoted_pre(self):
+        self.assertEqual(
+            html_to_markdown("<blockquote><pre>x\n\n\ny</pre></blockquote>"),
+            "> ```\n> x\n>\n>\n> y\n> ```",
+        )
+
+    def test_blank_lines_outside_pre_are_collapsed(self):
+        self.assertEqual(html_to_markdown("<p>a  </p>\n\n\n\n<div>b</div>"), "a\n\nb")
+
+
+class SectionsTest(unittest.TestCase):
+    def test_heading_markup_is_stripped(self):
+        _, sections = markdown_sections(
+            '<h2><a href="#s1">Section 1</a></h2><p>Text</p><h3>Use <strong>bold</strong></h3><p>More</p>'
+        )
+        self.assertEqual([s["heading"] for s in sections], ["Section 1", "Use bold"])
+        self.assertEqual([s["anchor"] for s in sections], ["section-1", "use-bold"])
+
+
+class TagCacheTest(unittest.TestCase):
+    def test_threads_survive_the_cache_being_replaced(self):
+        def convert(n):
+            source = "".join(f'<p class="c{n}-{i}">{i}</p>' for i in range(50))
+            return html_to_text(source)
+
+        expected = "\n\n".join(str(i) for i in range(50))
+        with mock.patch.object(html_convert, "_TAG_CACHE_SIZE", 8), ThreadPoolExecutor(8) as pool:
+            self.assertEqual(set(pool.map(convert, range(200))), {expected})
+
+
+if __name__ == "__main__":
+    unittest.main()
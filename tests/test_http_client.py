@@ -0,0 +1,58 @@
+"""Tests for the keep-alive HTTP client."""
+
+import gzip
+import unittest
+import urllib.error
+
+import support
+
+import http_client
+
+
+class HttpClientTest(unittest.TestCase):
+    def setUp(self):
+        support.isolate(self, WP_SKILLS_MAX_RETRIES="2")
+        self.addCleanup(http_client.close)
+
+    def test_connection_is_reused(self):
+        with support.ApiServer(lambda path, headers: (200, {}, {"path": path})) as server:
+            for i in range(3):
+                response = http_client.request(f"{server.url}/item/{i}")
+                self.assertEqual(response.status, 200)
+        self.assertEqual(len({port for _, _, port in server.requests}), 1)
+
+    def test_gzip_body_is_decoded(self):
+        body = b'{"content": "' + b"x" * 10000 + b'"}'
+
+        def respond(path, headers):
+            self.assertIn("gzip", headers["Accept-Encoding"])
+            return 200, {"Content-Encoding": "gzip"}, gzip.compress(body)
+
+        with support.ApiServer(respond) as server:
+            self.assertEqual(http_client.request(server.url + "/").body, body)
+
+    def test_not_modified_is_returned(self):
+        with support.ApiServer(lambda path, headers: (304, {}, b"")) as server:
+            response = http_client.request(server.url + "/", {"If-None-Match": '"1"'})
+        self.assertEqual(response.status, 304)
+        self.assertEqual(server.requests[0][1]["If-None-Match"], '"1"')
+
+    def test_error_status_raises(self):
+        with support.ApiServer(lambda path, headers: (404, {}, {"code": "rest_no_route"})) as server:
+            with self.assertRaises(urllib.error.HTTPError) as caught:
+                http_client.request(server.url + "/missing")
+        self.assertEqual(caught.exception.code, 404)
+
+    def test_unavailable_is_retried(self):
+        statuses = [503, 200]
+
+        def respond(path, headers):
+            return statuses.pop(0), {"Retry-After": "0"}, {}
+
+        with support.ApiServer(respond) as server:
+            self.assertEqual(http_client.request(server.url + "/").status, 200)
+        self.assertEqual(len(server.requests), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
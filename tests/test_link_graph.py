@@ -0,0 +1,85 @@
+"""Tests for the link graph of the offline corpus."""
+
+import os
+import unittest
+
+import support
+
+import corpus
+import link_graph
+
+SITE = "https://developer.wordpress.org"
+
+
+def _links(*paths):
+    return "".join(f'<a href="{path}">link</a>' for path in paths)
+
+
+class LinkGraphTest(unittest.TestCase):
+    def setUp(self):
+        support.isolate(self)
+        self.addCleanup(link_graph._loaded.clear)
+        corpus.write_subtype("plugin-handbook", [
+            support.document(1, link=f"{SITE}/plugins/hooks/", content=_links(
+                "/reference/functions/add_action/", f"{SITE}/reference/functions/do_action#notes",
+            )),
+            support.document(2, link=f"{SITE}/plugins/intro/", content=_links(
+                "../../reference/functions/add_action/", "https://example.org/elsewhere/",
+            )),
+        ])
+        corpus.write_subtype("wp-parser-function", [
+            support.document(10, "wp-parser-function", link=f"{SITE}/reference/functions/add_action/",
+                             content=_links("/plugins/hooks/")),
+            support.document(11, "wp-parser-function", link=f"{SITE}/reference/functions/do_action/"),
+            support.document(12, "wp-parser-function", link=f"{SITE}/reference/functions/unlinked/"),
+        ])
+
+    def test_link_key(self):
+        self.assertEqual(link_graph.link_key("/Reference/Functions/add_action#x"), "/reference/functions/add_action/")
+        self.assertEqual(link_graph.link_key("../intro", f"{SITE}/plugins/hooks/"), "/plugins/intro/")
+        self.assertIsNone(link_graph.link_key("https://example.org/plugins/"))
+        self.assertIsNone(link_graph.link_key("mailto:someone@example.org"))
+
+    def test_links_and_authority(self):
+        graph = link_graph.build()
+        self.assertEqual(
+            sorted(link["id"] for link in graph.links("plugin-handbook", 1)), [10, 11],
+        )
+        self.assertGreater(graph.authority("wp-parser-function", 10), graph.authority("wp-parser-function", 12))
+        self.assertIsNone(graph.authority("wp-parser-function", 99))
+
+    def test_related(self):
+        link_graph.build()
+        related = link_graph.related("plugin-handbook", 1, 3)
+        self.assertEqual(related[0]["id"], 10)
+        self.assertLessEqual(len(related), 3)
+        self.assertEqual(link_graph.related("wp-parser-function", 12), [])
+
+    def test_rerank_boosts_authority(self):
+        link_graph.build()
+        results = [
+            {"id": 12, "subtype": "wp-parser-function", "score": 1.0},
+            {"id": 10, "subtype": "wp-parser-function", "score": 1.0},
+            {"id": 5, "subtype": "theme-handbook", "score": 0.5},
+        ]
+        reranked = link_graph.rerank(results, 3)
+        self.assertEqual([result["id"] for result in reranked], [10, 12, 5])
+        self.assertEqual(reranked[2]["score"], 0.5)
+
+    def test_stale_graph_is_used_as_it_is(self):
+        link_graph.build()
+        built = os.stat(link_graph.graph_path()).st_mtime_ns
+        corpus.write_subtype("plugin-handbook", [support.document(3)])
+        self.assertEqual(link_graph.related("plugin-handbook", 1, 1)[0]["id"], 10)
+        self.assertEqual(os.stat(link_graph.graph_path()).st_mtime_ns, built)
+
+    def test_no_graph(self):
+        with self.assertRaises(RuntimeError):
+            link_graph.related("plugin-handbook", 1)
+        results = [{"id": 1, "subtype": "plugin-handbook", "score": 2.0}]
+        self.assertEqual(link_graph.rerank(results, 5), results)
+        self.assertFalse(os.path.exists(link_graph.graph_path()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+"""Tests for the shared rate limiter and circuit breaker."""
+
+import email.utils
+import os
+import time
+import unittest
+from unittest import mock
+
+import support
+
+import rate_limit
+
+HOST = "developer.wordpress.org"
+
+
+class RetryAfterTest(unittest.TestCase):
+    def test_seconds(self):
+        self.assertEqual(rate_limit.retry_after({"Retry-After": " 5 "}), 5.0)
+
+    def test_http_date(self):
+        moment = email.utils.formatdate(time.time() + 60, usegmt=True)
+        self.assertAlmostEqual(rate_limit.retry_after({"Retry-After": moment}), 60, delta=2)
+
+    def test_missing_or_invalid(self):
+        self.assertIsNone(rate_limit.retry_after(None))
+        self.assertIsNone(rate_limit.retry_after({}))
+        self.assertIsNone(rate_limit.retry_after({"Retry-After": "soon"}))
+
+
+class RateLimitTest(unittest.TestCase):
+    def setUp(self):
+        support.isolate(self, WP_SKILLS_RATE_LIMIT="10")
+        self.addCleanup(rate_limit._local_state.clear)
+
+    def state(self):
+        return rate_limit._update(HOST, lambda state, now: dict(state))
+
+    def test_throttling_halves_the_rate(self):
+        rate_limit.acquire(HOST)
+        rate_limit.report(HOST, 429)
+        self.assertEqual(self.state()["rate"], 5.0)
+        rate_limit.report(HOST, 200)
+        self.assertAlmostEqual(self.state()["rate"], 5.0 + rate_limit.RATE_INCREASE)
+
+    def test_rate_never_exceeds_the_ceiling(self):
+        for _ in range(5):
+            rate_limit.report(HOST, 200)
+        self.assertEqual(self.state()["rate"], 10.0)
+
+    def test_long_retry_after_fails_fast(self):
+        rate_limit.report(HOST, 503, pause=rate_limit.MAX_WAIT + 60)
+        with self.assertRaises(rate_limit.CircuitOpen):
+            rate_limit.acquire(HOST)
+
+    def test_circuit_opens_after_repeated_failures(self):
+        for _ in range(rate_limit.FAILURE_THRESHOLD - 1):
+            rate_limit.report(HOST, None)
+        rate_limit.acquire(HOST)
+        rate_limit.report(HOST, 500)
+        with self.assertRaises(rate_limit.CircuitOpen):
+            rate_limit.acquire(HOST)
+
+        # Once the cooldown is over, one probe is let through; it closes the circuit.
+        rate_limit._update(HOST, lambda state, now: state.update(open_until=now - 1))
+        rate_limit.acquire(HOST)
+        self.assertEqual(self.state()["circuit"], "half-open")
+        with self.assertRaises(rate_limit.CircuitOpen):
+            rate_limit.acquire(HOST)
+        rate_limit.report(HOST, 200)
+        self.assertEqual(self.state()["circuit"], "closed")
+        rate_limit.acquire(HOST)
+
+    def test_zero_turns_limiting_off(self):
+        with mock.patch.dict(os.environ, {"WP_SKILLS_RATE_LIMIT": "0"}):
+            for _ in range(rate_limit.FAILURE_THRESHOLD):
+                rate_limit.report(HOST, None)
+            rate_limit.acquire(HOST)
+        self.assertEqual(self.state(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
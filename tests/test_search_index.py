@@ -0,0 +1,75 @@
+"""Tests for the BM25 search index and its file format."""
+
+import os
+import unittest
+
+import support
+
+import corpus
+import search_index
+
+SUBTYPE = "plugin-handbook"
+
+
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        support.isolate(self)
+        self.addCleanup(search_index._loaded.clear)
+        corpus.write_subtype(SUBTYPE, [
+            support.document(1, title="Custom Post Types", content="<p>Register a custom post type.</p>"),
+            support.document(2, title="Taxonomies", content="<p>Attach a taxonomy to a custom post type.</p>"),
+            support.document(3, title="Shortcodes", content="<p>Add a shortcode.</p>"),
+        ])
+
+    def search(self, query):
+        return [result["id"] for result in search_index.search(query, [SUBTYPE], 10)]
+
+    def index_path(self):
+        return search_index._index_path(SUBTYPE, corpus.default_corpus_dir())
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.search("custom post type"), [1, 2])
+        self.assertEqual(self.search("shortcode"), [3])
+        self.assertEqual(self.search("nothing-matches"), [])
+
+    def test_stored_index_round_trips(self):
+        expected = search_index.search("custom post type", [SUBTYPE], 10)
+        with open(self.index_path(), "rb") as f:
+            self.assertTrue(f.read().startswith(search_index.FILE_MAGIC))
+        search_index._loaded.clear()
+        self.assertEqual(search_index.search("custom post type", [SUBTYPE], 10), expected)
+
+    def test_passage_index_round_trips(self):
+        search_index.search_passages("taxonomy", [SUBTYPE], 5)
+        search_index._loaded.clear()
+        passages = search_index.search_passages("taxonomy", [SUBTYPE], 5)
+        self.assertEqual([passage["id"] for passage in passages], [2])
+
+    def test_index_is_rebuilt_after_a_sync(self):
+        self.search("shortcode")
+        corpus.write_subtype(SUBTYPE, [support.document(4, title="Shortcode API")])
+        later = os.stat(self.index_path()).st_mtime + 10
+        os.utime(corpus.data_path(corpus.default_corpus_dir(), SUBTYPE), (later, later))
+        self.assertEqual(self.search("shortcode"), [4])
+
+    def test_unreadable_index_is_rebuilt(self):
+        self.search("shortcode")
+        search_index._loaded.clear()
+        with open(self.index_path(), "r+b") as f:
+            f.write(b"\xe3\x07\x00\x00")
+        self.assertEqual(self.search("shortcode"), [3])
+
+    def test_file_from_another_byte_order_is_not_read(self):
+        data = {"version": search_index.INDEX_VERSION, "names": ["a"], "blob": b"\x01\x02"}
+        path = os.path.join(corpus.default_corpus_dir(), "test.idx")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        search_index.write_index_file(path, data)
+        with open(path, "rb") as f:
+            raw = bytearray(f.read())
+        self.assertEqual(search_index.read_index_file(raw), data)
+        raw[len(search_index.FILE_MAGIC)] ^= 1
+        self.assertIsNone(search_index.read_index_file(raw))
+
+
+if __name__ == "__main__":
+    unittest.main()
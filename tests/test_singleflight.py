@@ -0,0 +1,101 @@
+"""Tests for request coalescing."""
+
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import support  # noqa: F401
+
+import singleflight
+
+
+class GroupTest(unittest.TestCase):
+    def setUp(self):
+        self.group = singleflight.Group()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def slow(self):
+        self.calls += 1
+        self.release.wait(5)
+        return self.calls
+
+    def wait_for_flight(self, key):
+        for _ in range(500):
+            if key in self.group._calls:
+                return
+            time.sleep(0.01)
+        self.fail("the call never started")
+
+    def release_soon(self):
+        # Lets the callers submitted last join the flight before it ends.
+        threading.Timer(0.2, self.release.set).start()
+
+    def test_concurrent_calls_share_one_flight(self):
+        with ThreadPoolExecutor(4) as pool:
+            first = pool.submit(self.group.do, "key", self.slow)
+            self.wait_for_flight("key")
+            others = [pool.submit(self.group.do, "key", self.slow) for _ in range(3)]
+            self.release_soon()
+            self.assertEqual([future.result() for future in [first, *others]], [1, 1, 1, 1])
+        self.assertEqual(self.calls, 1)
+        # The key is forgotten once the call finishes.
+        self.assertEqual(self.group.do("key", self.slow), 2)
+
+    def test_exception_reaches_every_caller(self):
+        def fail():
+            self.release.wait(5)
+            raise ValueError("upstream")
+
+        with ThreadPoolExecutor(2) as pool:
+            first = pool.submit(self.group.do, "key", fail)
+            self.wait_for_flight("key")
+            second = pool.submit(self.group.do, "key", fail)
+            self.release_soon()
+            for future in (first, second):
+                self.assertRaises(ValueError, future.result)
+
+    def test_asyncio_tasks_join_a_thread_flight(self):
+        async def run():
+            return await asyncio.gather(*(self.group.do_async("key", self.slow) for _ in range(3)))
+
+        with ThreadPoolExecutor(1) as pool:
+            leader = pool.submit(self.group.do, "key", self.slow)
+            self.wait_for_flight("key")
+            self.release_soon()
+            self.assertEqual(asyncio.run(run()), [1, 1, 1])
+            self.assertEqual(leader.result(), 1)
+        self.assertEqual(self.calls, 1)
+
+
+class FileLockTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = os.path.join(tmp.name, "locks")
+
+    def test_lock_is_exclusive(self):
+        with singleflight.file_lock(self.directory, "key") as locked:
+            self.assertTrue(locked)
+            # flock is per open file, so a second descriptor in this process contends too.
+            with mock.patch.object(singleflight, "LOCK_WAIT", 0.05), \
+                    singleflight.file_lock(self.directory, "key") as second:
+                self.assertFalse(second)
+        with singleflight.file_lock(self.directory, "key") as locked:
+            self.assertTrue(locked)
+
+    def test_unwritable_directory_runs_unlocked(self):
+        blocker = os.path.join(os.path.dirname(self.directory), "file")
+        with open(blocker, "w") as f:
+            f.write("not a directory")
+        with singleflight.file_lock(os.path.join(blocker, "locks"), "key") as locked:
+            self.assertFalse(locked)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+"""Tests for the memory-mapped corpus snapshot."""
+
+import os
+import unittest
+
+import support
+
+import corpus
+import snapshot
+
+SUBTYPE = "plugin-handbook"
+
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        support.isolate(self)
+        self.addCleanup(snapshot._loaded.clear)
+        # Enough documents for several compressed blocks.
+        corpus.write_subtype(SUBTYPE, [
+            support.document(i, content="<p>" + "text " * 500 + "</p>") for i in range(1, 101)
+        ])
+        corpus.write_subtype("theme-handbook", [support.document(7, "theme-handbook")])
+
+    def test_lookups(self):
+        snapshot.build()
+        self.assertEqual(snapshot.get_document(SUBTYPE, 42), corpus.get_document(SUBTYPE, 42))
+        self.assertEqual(snapshot.get_document("theme-handbook", 7)["subtype"], "theme-handbook")
+        self.assertIsNone(snapshot.get_document(SUBTYPE, 1000))
+        self.assertEqual(sorted(snapshot.get_documents(SUBTYPE, [99, 3, 3, 1000])), [3, 99])
+        self.assertGreater(snapshot.load(rebuild=False).block_count, 1)
+
+    def test_missing_corpus_is_an_error(self):
+        with self.assertRaises(RuntimeError):
+            snapshot.get_document("themes-handbook", 1)
+
+    def test_lookups_never_build_the_snapshot(self):
+        self.assertEqual(snapshot.get_document(SUBTYPE, 5)["id"], 5)
+        self.assertFalse(os.path.exists(snapshot.snapshot_path()))
+
+    def test_stale_subtype_is_read_from_the_corpus(self):
+        snapshot.build()
+        built = os.stat(snapshot.snapshot_path()).st_mtime_ns
+        corpus.write_subtype(SUBTYPE, [support.document(5, title="Changed")])
+        self.assertEqual(snapshot.get_document(SUBTYPE, 5)["title"]["rendered"], "Changed")
+        self.assertIsNone(snapshot.get_document(SUBTYPE, 6))
+        self.assertEqual(os.stat(snapshot.snapshot_path()).st_mtime_ns, built)
+        # Other subtypes are still answered from the snapshot.
+        self.assertTrue(snapshot.load(rebuild=False).is_current("theme-handbook", corpus.default_corpus_dir()))
+
+    def test_replaced_snapshot_is_closed_after_its_lookups(self):
+        old = snapshot.build()
+        with snapshot._reading(SUBTYPE, None) as reading:
+            self.assertIs(reading, old)
+            new = snapshot.build()
+            self.assertIsNot(new, old)
+            self.assertFalse(old.mm.closed)
+            self.assertEqual(reading.get(SUBTYPE, 1)["id"], 1)
+        self.assertTrue(old.mm.closed)
+        snapshot.build()
+        self.assertTrue(new.mm.closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+"""Tests for the SQLite backend of the offline corpus."""
+
+import sqlite3
+import unittest
+from contextlib import closing
+
+import support
+
+import corpus
+import sqlite_store
+
+SUBTYPE = "wp-parser-function"
+
+
+def _has_fts5() -> bool:
+    with closing(sqlite3.connect(":memory:")) as connection:
+        try:
+            connection.execute("CREATE VIRTUAL TABLE t USING fts5(x)")
+        except sqlite3.OperationalError:
+            return False
+    return True
+
+
+@unittest.skipUnless(_has_fts5(), "SQLite without FTS5")
+class SqliteStoreTest(unittest.TestCase):
+    def setUp(self):
+        support.isolate(self, WP_SKILLS_BACKEND="sqlite")
+        self.addCleanup(self.close_connections)
+        corpus.write_subtype(SUBTYPE, [
+            support.document(1, SUBTYPE, title="register_post_type()", content="<p>Registers a post type.</p>",
+                             **{"wp-parser-since": ["2.9.0"]}),
+            support.document(2, SUBTYPE, title="get_posts()", content="<p>Retrieves an array of posts.</p>"),
+            support.document(3, SUBTYPE, title="add_action()", content="<p>Adds a callback to a hook.</p>"),
+        ])
+
+    def close_connections(self):
+        for connection in getattr(sqlite_store._local, "connections", {}).values():
+            connection.close()
+        sqlite_store._local.connections = {}
+
+    def search(self, query):
+        return [result["id"] for result in sqlite_store.search(query, [SUBTYPE], 10)]
+
+    def test_import_and_search(self):
+        self.assertEqual(sqlite_store.import_subtype(SUBTYPE), 3)
+        self.assertEqual(self.search("callback hook"), [3])
+        self.assertEqual(self.search("posts")[0], 2)
+        self.assertEqual(self.search("nothing"), [])
+
+    def test_documents_round_trip(self):
+        found = sqlite_store.get_documents(SUBTYPE, [1, 3, 99])
+        self.assertEqual(sorted(found), [1, 3])
+        self.assertEqual(found[1], corpus.get_document(SUBTYPE, 1))
+        row = sqlite_store.connect().execute("SELECT since FROM documents WHERE id = 1").fetchone()
+        self.assertEqual(row, ("2.9.0",))
+
+    def test_changed_corpus_is_reimported(self):
+        self.assertEqual(self.search("callback"), [3])
+        corpus.write_subtype(SUBTYPE, [support.document(4, SUBTYPE, title="do_action()",
+                                                        content="<p>Calls the callbacks of a hook.</p>")])
+        self.assertEqual(self.search("callback hook"), [4])
+        self.assertIsNone(sqlite_store.get_document(SUBTYPE, 3))
+
+    def test_missing_corpus_is_an_error(self):
+        with self.assertRaises(RuntimeError):
+            sqlite_store.get_document("wp-parser-hook", 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+"""Tests for the identifier index of the code reference skill."""
+
+import unittest
+
+import support
+
+import corpus
+
+symbol_index = support.load_script(support.CODE_REF_DIR, "symbol_index")
+
+NAMES = {
+    "wp-parser-function": ["add_action", "get_post", "get_posts", "post", "the_post", "wp_post"],
+    "wp-parser-hook": ["save_post", "save_post_{$post_type}"],
+    "wp-parser-method": ["WP_Query::get_posts"],
+}
+
+
+class SymbolIndexTest(unittest.TestCase):
+    def setUp(self):
+        support.isolate(self)
+        self.addCleanup(symbol_index._loaded.clear)
+        doc_id = 0
+        for subtype, names in NAMES.items():
+            documents = []
+            for name in names:
+                doc_id += 1
+                documents.append(support.document(doc_id, subtype, title=name))
+            corpus.write_subtype(subtype, documents)
+
+    def lookup(self, query, subtypes=symbol_index.CODE_REF_SUBTYPES, limit=5):
+        return [(result["title"], result["match"]) for result in symbol_index.lookup(query, subtypes, limit)]
+
+    def test_exact_before_prefix(self):
+        self.assertEqual(self.lookup("get_post()", limit=2), [("get_post", "exact"), ("get_posts", "prefix")])
+
+    def test_segment_match(self):
+        self.assertIn(("WP_Query::get_posts", "segment"), self.lookup("query_get_posts"))
+
+    def test_segment_matches_are_filtered_by_subtype_before_truncating(self):
+        self.assertEqual(self.lookup("post", ["wp-parser-hook"], 3), [
+            ("save_post", "segment"), ("save_post_{$post_type}", "segment"),
+        ])
+
+    def test_fuzzy_match(self):
+        self.assertEqual(self.lookup("add_acton", limit=1), [("add_action", "fuzzy")])
+
+    def test_stored_index_round_trips(self):
+        expected = self.lookup("post")
+        symbol_index._loaded.clear()
+        self.assertEqual(self.lookup("post"), expected)
+
+    def test_bounded_distance(self):
+        self.assertEqual(symbol_index.bounded_distance("add_acton", "add_action", 2), 1)
+        self.assertIsNone(symbol_index.bounded_distance("add_action", "get_posts", 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
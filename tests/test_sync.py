@@ -0,0 +1,81 @@
+"""Tests for the offline corpus sync."""
+
+import math
+import unittest
+import urllib.parse
+
+import support
+
+import corpus
+import http_client
+
+
+class FakeCollection:
+    """Answers collection requests for one subtype like the REST API does."""
+
+    def __init__(self, documents):
+        self.documents = {document["id"]: document for document in documents}
+        self.queries = []
+
+    def __call__(self, path, headers):
+        query = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(path).query))
+        self.queries.append(query)
+        documents = sorted(self.documents.values(), key=lambda document: document["id"])
+        if "modified_after" in query:
+            documents = [d for d in documents if d["modified_gmt"] > query["modified_after"]]
+        if query.get("_fields") == "id":
+            documents = [{"id": d["id"]} for d in documents]
+        per_page, page = int(query["per_page"]), int(query["page"])
+        total_pages = max(1, math.ceil(len(documents) / per_page))
+        return 200, {"X-WP-TotalPages": str(total_pages)}, documents[(page - 1) * per_page:page * per_page]
+
+
+class SyncTest(unittest.TestCase):
+    def setUp(self):
+        support.isolate(self)
+        self.addCleanup(http_client.close)
+        self.collection = FakeCollection(
+            [support.document(i, modified=f"2024-01-0{i}T00:00:00") for i in range(1, 6)]
+        )
+
+    def sync(self, server, **options):
+        return corpus.sync_subtype(server.url, "plugin-handbook", **options)
+
+    def stored(self):
+        return {document["id"]: document for document in corpus.iter_documents("plugin-handbook")}
+
+    def test_full_sync_pages_through_the_collection(self):
+        self.collection.documents.update({i: support.document(i) for i in range(6, 251)})
+        with support.ApiServer(self.collection) as server:
+            metadata = self.sync(server)
+        self.assertEqual(metadata["count"], 250)
+        self.assertEqual(metadata["mode"], "full")
+        self.assertEqual(len(self.collection.queries), 3)
+        self.assertEqual(sorted(self.stored()), list(range(1, 251)))
+
+    def test_delta_sync_merges_changes(self):
+        with support.ApiServer(self.collection) as server:
+            self.assertEqual(self.sync(server)["high_water"], "2024-01-05T00:00:00")
+            self.collection.documents[2] = support.document(2, title="Changed", modified="2024-02-01T00:00:00")
+            self.collection.documents[9] = support.document(9, modified="2024-02-02T00:00:00")
+            del self.collection.documents[3]
+            self.collection.queries.clear()
+            metadata = self.sync(server)
+
+        self.assertEqual(metadata["mode"], "delta")
+        self.assertEqual(metadata["changes"], {"added": 1, "updated": 1, "deleted": 1})
+        self.assertEqual(metadata["high_water"], "2024-02-02T00:00:00")
+        # The changed documents are asked for from a day before the mark.
+        self.assertEqual(self.collection.queries[0]["modified_after"], "2024-01-04T00:00:00")
+        stored = self.stored()
+        self.assertEqual(sorted(stored), [1, 2, 4, 5, 9])
+        self.assertEqual(stored[2]["title"]["rendered"], "Changed")
+
+    def test_full_option_downloads_everything(self):
+        with support.ApiServer(self.collection) as server:
+            self.sync(server)
+            self.assertEqual(self.sync(server, full=True)["mode"], "full")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+"""
+Benchmark the WordPress handbook skill against a local API stand-in.
+
+Usage:
+    python benchmark.py run [--fixtures FILE] [--latency MS] [--jitter MS]
+                            [--error-rate R] [--iterations N] [--concurrency N]
+                            [--batch-size N] [--workloads LIST] [--cache]
+                            [--output FILE]
+    python benchmark.py compare <baseline.json> <candidate.json>
+
+`run` starts wp_api_standin.py in a subprocess, points the handbook scripts
+at it and runs these workloads in this process:
+
+    search     - sequential search_handbooks calls
+    single     - sequential get_handbook_content calls
+    batch      - get_handbook_contents over --batch-size documents at a time
+    concurrent - get_handbook_content calls from --concurrency threads
+    convert    - html_to_markdown over every fixture document (no network)
+
+Each workload reports p50/p95/p99 latency, throughput, errors, the process
+peak RSS after it ran, and per-stage timings: network (the HTTP request,
+through the response cache when --cache is given), JSON decode and
+conversion. Results are written as JSON to --output so that two runs can
+be compared with `compare`.
+
+Example:
+    python benchmark.py run --latency 40 --jitter 10 --output before.json
+    python benchmark.py compare before.json after.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TOOLS_DIR = Path(__file__).resolve().parent
+SKILL_DIR = TOOLS_DIR.parent / "skills" / "wordpress-handbook"
+
+RESULTS_VERSION = 1
+WORKLOADS = ["search", "single", "batch", "concurrent", "convert"]
+STAGES = ["network", "decode", "convert"]
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Linearly interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(seconds: list) -> dict:
+    """Latency summary in milliseconds."""
+    values = sorted(value * 1000 for value in seconds)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "min": round(values[0], 3),
+        "mean": round(sum(values) / len(values), 3),
+        "p50": round(percentile(values, 0.50), 3),
+        "p95": round(percentile(values, 0.95), 3),
+        "p99": round(percentile(values, 0.99), 3),
+        "max": round(values[-1], 3),
+        "total": round(sum(values), 3),
+    }
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 1)
+
+
+class StageTimer:
+    """Records per-stage durations by wrapping the functions the scripts call."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {stage: [] for stage in STAGES}
+        self.patched = []  # (module, name, original function) per wrapped function.
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self.lock:
+            self.samples[stage].append(seconds)
+
+    def take(self) -> dict:
+        with self.lock:
+            samples, self.samples = self.samples, {stage: [] for stage in STAGES}
+        return {stage: summarize(values) for stage, values in samples.items() if values}
+
+    def install(self, modules) -> None:
+        cache = modules["cache"]
+        search = modules["search"]
+        get_content = modules["get_content"]
+        convert = get_content.html_to_markdown
+
+        def fetch_json(url, endpoint="document", timeout=cache.REQUEST_TIMEOUT):
+            start = time.perf_counter()
+            entry = cache.fetch(url, endpoint, timeout)
+            fetched = time.perf_counter()
+            data = json.loads(entry["body"])
+            self.add("network", fetched - start)
+            self.add("decode", time.perf_counter() - fetched)
+            return data
+
+        def fetch_json_page(url, endpoint="search", timeout=cache.REQUEST_TIMEOUT):
+            start = time.perf_counter()
+            entry = cache.fetch(url, endpoint, timeout)
+            fetched = time.perf_counter()
+            data = json.loads(entry["body"])
+            self.add("network", fetched - start)
+            self.add("decode", time.perf_counter() - fetched)
+            try:
+                total_pages = int(entry.get("headers", {}).get("X-WP-TotalPages") or 1)
+            except ValueError:
+                total_pages = 1
+            return data, total_pages
+
+        def html_to_markdown(html):
+            start = time.perf_counter()
+            try:
+                return convert(html)
+            finally:
+                self.add("convert", time.perf_counter() - start)
+
+        for module, name, wrapper in [
+            (cache, "fetch_json", fetch_json),
+            (cache, "fetch_json_page", fetch_json_page),
+            (search, "fetch_json_page", fetch_json_page),
+            (get_content, "fetch_json", fetch_json),
+            (get_content, "html_to_markdown", html_to_markdown),
+        ]:
+            self.patched.append((module, name, getattr(module, name)))
+            setattr(module, name, wrapper)
+
+    def uninstall(self) -> None:
+        """Restore the functions install() wrapped."""
+        for module, name, original in reversed(self.patched):
+            setattr(module, name, original)
+        self.patched = []
+
+
+def start_standin(fixtures_path: Path, args) -> tuple:
+    """Start the API stand-in and return (process, base URL)."""
+    command = [
+        sys.executable, str(TOOLS_DIR / "wp_api_standin.py"), "serve",
+        "--fixtures", str(fixtures_path),
+        "--latency", str(args.latency),
+        "--jitter", str(args.jitter),
+        "--error-rate", str(args.error_rate),
+        "--drop-rate", str(args.drop_rate),
+        "--seed", str(args.seed),
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    port = process.stdout.readline().strip()
+    if not port.isdigit():
+        process.kill()
+        raise RuntimeError("API stand-in did not start")
+    return process, f"http://127.0.0.1:{port}/wp-json/wp/v2"
+
+
+def load_skill(api_base_url: str, use_cache: bool) -> dict:
+    """Import the handbook scripts, configured to talk to the stand-in only."""
+    os.environ["WP_SKILLS_OFFLINE"] = "0"
+    os.environ["WP_SKILLS_DAEMON"] = "0"
+    # The client-side rate limit would cap throughput rather than measure it.
+    os.environ.setdefault("WP_SKILLS_RATE_LIMIT", "0")
+    if use_cache:
+        os.environ["WP_SKILLS_CACHE_DIR"] = tempfile.mkdtemp(prefix="wp-skills-bench-")
+    else:
+        os.environ["WP_SKILLS_CACHE"] = "0"
+
+    sys.path.insert(0, str(SKILL_DIR))
+    import cache
+    import get_content
+    import search
+
+    search.API_BASE_URL = api_base_url
+    get_content.API_BASE_URL = api_base_url
+    return {"cache": cache, "search": search, "get_content": get_content}
+
+
+def run_workload(name: str, operations, concurrency: int = 1) -> dict:
+    """Run callables that each return an error count; time each one."""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def timed(operation):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            failed = operation()
+        except Exception:
+            failed = 1
+        elapsed = time.perf_counter() - start
+        with lock:
+            errors += failed
+            if not failed:
+                latencies.append(elapsed)
+
+    start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(timed, operations))
+    else:
+        for operation in operations:
+            timed(operation)
+    wall = time.perf_counter() - start
+
+    return {
+        "operations": len(latencies) + errors,
+        "errors": errors,
+        "wall_s": round(wall, 3),
+        "throughput_per_s": round(len(latencies) / wall, 2) if wall else None,
+        "latency_ms": summarize(latencies),
+    }
+
+
+def build_workloads(modules: dict, fixtures: dict, args) -> dict:
+    search = modules["search"]
+    get_content = modules["get_content"]
+    documents = [
+        (subtype, document["id"])
+        for subtype, stored in sorted(fixtures["documents"].items())
+        for document in stored
+    ]
+    queries = [entry["query"] for entry in fixtures.get("search", [])] or [
+        "register", "block editor", "plugin hook", "template data", "query meta",
+    ]
+    contents = [
+        document["content"]["rendered"]
+        for stored in fixtures["documents"].values()
+        for document in stored
+    ]
+    iterations = args.iterations
+
+    def pick(sequence, count):
+        return [sequence[i % len(sequence)] for i in range(count)]
+
+    def get_one(subtype, doc_id):
+        return lambda: (get_content.get_handbook_content(subtype, doc_id), 0)[1]
+
+    def get_batch(items):
+        def operation():
+            results = list(get_content.get_handbook_contents(items, args.concurrency))
+            return sum(1 for result in results if "error" in result)
+        return operation
+
+    def search_one(query):
+        return lambda: (search.search_handbooks(query, per_page=10), 0)[1]
+
+    def convert_one(html):
+        return lambda: (get_content.html_to_markdown(html), 0)[1]
+
+    batch_items = pick(documents, max(iterations, args.batch_size))
+    batches = [
+        batch_items[i:i + args.batch_size] for i in range(0, len(batch_items), args.batch_size)
+    ]
+    return {
+        "search": ([search_one(query) for query in pick(queries, iterations)], 1, iterations),
+        "single": ([get_one(*item) for item in pick(documents, iterations)], 1, iterations),
+        "batch": ([get_batch(batch) for batch in batches], 1, len(batch_items)),
+        "concurrent": (
+            [get_one(*item) for item in pick(documents, iterations)], args.concurrency, iterations,
+        ),
+        "convert": ([convert_one(html) for html in pick(contents, max(iterations, len(contents)))], 1, None),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=TOOLS_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args) -> dict:
+    sys.path.insert(0, str(TOOLS_DIR))
+    import wp_api_standin
+
+    workloads = [name.strip() for name in args.workloads.split(",") if name.strip()]
+    unknown = [name for name in workloads if name not in WORKLOADS]
+    if unknown:
+        raise ValueError(f"Unknown workloads: {', '.join(unknown)}. Valid: {', '.join(WORKLOADS)}")
+
+    with tempfile.TemporaryDirectory(prefix="wp-skills-bench-") as tmp:
+        if args.fixtures:
+            fixtures_path = args.fixtures
+            fixtures = wp_api_standin.load_fixtures(fixtures_path)
+        else:
+            fixtures = wp_api_standin.generate_fixtures(args.documents, args.seed)
+            fixtures_path = Path(tmp) / "fixtures.json"
+            with open(fixtures_path, "w", encoding="utf-8") as f:
+                json.dump(fixtures, f)
+
+        process, api_base_url = start_standin(fixtures_path, args)
+        timer = StageTimer()
+        try:
+            modules = load_skill(api_base_url, args.cache)
+            timer.install(modules)
+            plans = build_workloads(modules, fixtures, args)
+
+            results = {}
+            for name in workloads:
+                operations, concurrency, documents = plans[name]
+                print(f"Running {name} ({len(operations)} operations)...", file=sys.stderr)
+                if args.warmup and operations:
+                    run_workload(name, operations[:1])
+                    timer.take()
+                result = run_workload(name, operations, concurrency)
+                if documents is not None and name == "batch":
+                    result["documents_per_s"] = round(documents / result["wall_s"], 2) if result["wall_s"] else None
+                result["concurrency"] = concurrency
+                result["stages_ms"] = timer.take()
+                result["peak_rss_mb"] = peak_rss_mb()
+                results[name] = result
+        finally:
+            timer.uninstall()
+            process.terminate()
+            process.wait()
+
+    return {
+        "version": RESULTS_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "fixtures": str(args.fixtures) if args.fixtures else "generated",
+            "documents": sum(len(stored) for stored in fixtures["documents"].values()),
+            "latency_ms": args.latency,
+            "jitter_ms": args.jitter,
+            "error_rate": args.error_rate,
+            "drop_rate": args.drop_rate,
+            "iterations": args.iterations,
+            "concurrency": args.concurrency,
+            "batch_size": args.batch_size,
+            "cache": args.cache,
+            "seed": args.seed,
+        },
+        "workloads": results,
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"{'workload':<11} {'ops':>6} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>9} {'rss MB':>7}")
+    for name, result in report["workloads"].items():
+        latency = result["latency_ms"]
+        print(
+            f"{name:<11} {result['operations']:>6} {result['errors']:>4} "
+            f"{latency.get('p50', 0):>9.2f} {latency.get('p95', 0):>9.2f} {latency.get('p99', 0):>9.2f} "
+            f"{result['throughput_per_s'] or 0:>9.1f} {result['peak_rss_mb'] or 0:>7.1f}"
+        )
+        for stage, summary in result["stages_ms"].items():
+            print(f"  {stage:<9} n={summary['count']:<6} mean {summary['mean']:.3f} ms  p95 {summary['p95']:.3f} ms")
+
+
+def compare(baseline: dict, candidate: dict) -> None:
+    """Print candidate/baseline ratios for the workloads both runs share."""
+    print(f"{'workload':<11} {'metric':<12} {'baseline':>10} {'candidate':>10} {'ratio':>7}")
+    for name, base in baseline["workloads"].items():
+        new = candidate["workloads"].get(name)
+        if new is None:
+            continue
+        rows = [
+            (metric, base["latency_ms"].get(metric), new["latency_ms"].get(metric))
+            for metric in ("p50", "p95", "p99")
+        ]
+        rows.append(("ops/s", base.get("throughput_per_s"), new.get("throughput_per_s")))
+        for stage in STAGES:
+            if stage in base["stages_ms"] and stage in new["stages_ms"]:
+                rows.append((f"{stage} mean", base["stages_ms"][stage]["mean"], new["stages_ms"][stage]["mean"]))
+        for metric, old_value, new_value in rows:
+            if old_value is None or new_value is None:
+                continue
+            ratio = f"{new_value / old_value:.2f}" if old_value else "-"
+            print(f"{name:<11} {metric:<12} {old_value:>10.2f} {new_value:>10.2f} {ratio:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the WordPress handbook skill against a local API stand-in"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmark")
+    run_parser.add_argument("--fixtures", type=Path, help="Fixture file (default: generated fixtures)")
+    run_parser.add_argument("--documents", type=int, default=120, help="Generated documents (default: 120)")
+    run_parser.add_argument("--latency", type=float, default=0.0, help="Stand-in latency per request in ms")
+    run_parser.add_argument("--jitter", type=float, default=0.0, help="Stand-in random extra latency in ms")
+    run_parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with HTTP 500")
+    run_parser.add_argument("--drop-rate", type=float, default=0.0, help="Fraction of connections dropped")
+    run_parser.add_argument("--iterations", type=int, default=200, help="Operations per workload (default: 200)")
+    run_parser.add_argument("--concurrency", type=int, default=8, help="Threads for the concurrent workload (default: 8)")
+    run_parser.add_argument("--batch-size", type=int, default=50, help="Documents per batch (default: 50)")
+    run_parser.add_argument("--workloads", default=",".join(WORKLOADS), help="Comma-separated workloads to run")
+    run_parser.add_argument("--cache", action="store_true", help="Go through the response cache (in a temporary directory)")
+    run_parser.add_argument("--no-warmup", dest="warmup", action="store_false", help="Skip the warm-up operation")
+    run_parser.add_argument("--seed", type=int, default=1, help="Seed for fixtures, jitter and errors")
+    run_parser.add_argument("--output", "-o", type=Path, help="Write results as JSON to this file")
+
+    compare_parser = commands.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("baseline", type=Path)
+    compare_parser.add_argument("candidate", type=Path)
+
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        with open(args.candidate, encoding="utf-8") as f:
+            candidate = json.load(f)
+        compare(baseline, candidate)
+        return
+
+    try:
+        report = run(args)
+    except Exception as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print_report(report)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Created: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
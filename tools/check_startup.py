@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Check the startup cost of the skill scripts.
+
+Usage:
+    python check_startup.py [--budget-ms MS] [--runs N] [--skills LIST]
+
+Each skill's search.py and get_content.py is run in a fresh interpreter with
+`python -X importtime` for these scenarios:
+
+    cached         - online, answered from a pre-filled response cache
+    offline        - --offline, answered from a small local corpus
+
+No scenario may import the network stack or other heavy modules that only
+some paths need (FORBIDDEN_MODULES): a cache hit or an offline lookup must
+not pay for them. The time spent importing modules beyond those of a bare
+interpreter is measured over --runs runs, after a warm-up run that writes
+the bytecode caches, and the median must stay within --budget-ms.
+
+The check exits with status 1 when a scenario fails, imports a forbidden
+module or is over budget, so it can run in CI.
+
+Example:
+    python check_startup.py --budget-ms 40 --runs 9
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+TOOLS_DIR = Path(__file__).resolve().parent
+SKILLS_DIR = TOOLS_DIR.parent / "skills"
+
+# Modules no cached or offline lookup needs.
+FORBIDDEN_MODULES = [
+    "asyncio",
+    "concurrent.futures",
+    "email",
+    "http.client",
+    "socket",
+    "sqlite3",
+    "ssl",
+    "subprocess",
+    "typing",
+    "urllib.error",
+    "urllib.request",
+]
+
+# skill -> (directory, subtype, search function, content function)
+SKILLS = {
+    "handbook": ("wordpress-handbook", "plugin-handbook", "search_handbooks", "get_handbook_content"),
+    "code-reference": (
+        "wordpress-code-reference", "wp-parser-function", "search_code_reference", "get_code_ref_content",
+    ),
+}
+
+QUERY = "action hooks"
+DOCUMENT_ID = 1
+
+# Fills the response cache through a stand-in for http_client.request, then
+# writes the offline corpus. Runs in the skill directory.
+SETUP = """
+import json, sys
+import corpus, get_content, http_client, search
+
+subtype, search_name, content_name, corpus_dir = sys.argv[1:]
+document = json.loads(sys.stdin.read())
+
+def request(url, headers=None, timeout=None):
+    body = [document] if "/search?" in url else document
+    return http_client.Response(url, 200, "OK", {"X-WP-TotalPages": "1"}, json.dumps(body).encode())
+
+http_client.request = request
+getattr(search, search_name)(%(query)r, [subtype], 5)
+getattr(get_content, content_name)(subtype, document["id"])
+corpus.write_subtype(subtype, [document], corpus_dir)
+"""
+
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)")
+
+
+def _document(subtype: str) -> dict:
+    return {
+        "id": DOCUMENT_ID,
+        "title": {"rendered": "Action Hooks"},
+        "url": f"https://developer.wordpress.org/{subtype}/action-hooks/",
+        "link": f"https://developer.wordpress.org/{subtype}/action-hooks/",
+        "subtype": subtype,
+        "excerpt": {"rendered": "<p>Actions let plugins run code at specific points.</p>"},
+        "content": {"rendered": "<h2>Action hooks</h2><p>Use <code>add_action()</code> to hook a callback.</p>"},
+        "modified_gmt": "2024-01-01T00:00:00",
+        "wp-parser-since": ["1.2.0"],
+        "wp-parser-source-file": ["wp-includes/plugin.php"],
+    }
+
+
+def parse_importtime(stderr: str) -> tuple:
+    """Return (imported module names, cumulative µs of the top-level imports)."""
+    modules = set()
+    total = 0
+    for line in stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), match.group(3), match.group(4)
+        modules.add(name)
+        # Nested imports are indented by two more spaces per level.
+        if len(indent) == 1:
+            total += cumulative
+    return modules, total
+
+
+def forbidden(modules: set) -> list:
+    """Return the FORBIDDEN_MODULES entries that were imported, or any of their submodules."""
+    return [
+        module for module in FORBIDDEN_MODULES
+        if any(name == module or name.startswith(module + ".") for name in modules)
+    ]
+
+
+def run(command: list, cwd: Path, env: dict) -> tuple:
+    """Run a command under -X importtime and return (returncode, modules, µs, stderr)."""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", *command],
+        cwd=cwd, env=env, capture_output=True, text=True,
+    )
+    modules, total = parse_importtime(process.stderr)
+    return process.returncode, modules, total, process.stderr
+
+
+def scenarios(subtype: str) -> dict:
+    doc_id = str(DOCUMENT_ID)
+    return {
+        "search (cached)": ["search.py", QUERY, subtype],
+        "get_content (cached)": ["get_content.py", subtype, doc_id],
+        "search (offline)": ["search.py", QUERY, subtype, "--offline"],
+        "get_content (offline)": ["get_content.py", subtype, doc_id, "--offline"],
+    }
+
+
+def check_skill(name: str, workdir: Path, args) -> list:
+    """Run every scenario of one skill and return its report rows."""
+    directory_name, subtype, search_name, content_name = SKILLS[name]
+    skill_dir = SKILLS_DIR / directory_name
+    env = {
+        key: value for key, value in os.environ.items()
+        if not key.startswith("WP_SKILLS_") and key != "PYTHONDONTWRITEBYTECODE"
+    }
+    env.update({
+        "WP_SKILLS_CACHE_DIR": str(workdir / "cache"),
+        "WP_SKILLS_CORPUS_DIR": str(workdir / "corpus"),
+        "WP_SKILLS_DAEMON_SOCKET": str(workdir / "daemon.sock"),
+        "WP_SKILLS_BUNDLE": "",
+        "WP_SKILLS_PREFETCH": "0",
+    })
+
+    setup = subprocess.run(
+        [sys.executable, "-c", SETUP % {"query": QUERY}, subtype, search_name, content_name, env["WP_SKILLS_CORPUS_DIR"]],
+        cwd=skill_dir, env=env, input=json.dumps(_document(subtype)), capture_output=True, text=True,
+    )
+    if setup.returncode != 0:
+        return [(name, "setup", None, [], f"setup failed:\n{setup.stderr}")]
+
+    _, _, baseline, _ = run(["-c", "pass"], skill_dir, env)
+    rows = []
+    for scenario, command in scenarios(subtype).items():
+        # The warm-up run writes bytecode caches and builds the offline indexes.
+        returncode, modules, _, stderr = run(command, skill_dir, env)
+        if returncode != 0:
+            rows.append((name, scenario, None, [], f"exited with {returncode}:\n{stderr[-2000:]}"))
+            continue
+        samples = []
+        for _ in range(args.runs):
+            _, modules, total, _ = run(command, skill_dir, env)
+            samples.append(max(total - baseline, 0) / 1000)
+        rows.append((name, scenario, statistics.median(samples), forbidden(modules), None))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import time of the skill scripts")
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="Median import time allowed per script (default: 50)")
+    parser.add_argument("--runs", type=int, default=5, help="Measured runs per scenario (default: 5)")
+    parser.add_argument("--skills", default=",".join(SKILLS), help="Comma-separated skills to check")
+    args = parser.parse_args()
+
+    names = [s.strip() for s in args.skills.split(",") if s.strip()]
+    unknown = [s for s in names if s not in SKILLS]
+    if unknown:
+        parser.error(f"unknown skills: {', '.join(unknown)}. Valid: {', '.join(SKILLS)}")
+
+    rows = []
+    for name in names:
+        with tempfile.TemporaryDirectory(prefix="wp-skills-startup-") as workdir:
+            rows.extend(check_skill(name, Path(workdir), args))
+
+    failed = False
+    print(f"{'skill':<16} {'scenario':<24} {'imports ms':>10}  result")
+    for name, scenario, milliseconds, modules, error in rows:
+        if error:
+            result = f"FAIL: {error}"
+        elif modules:
+            result = f"FAIL: imports {', '.join(modules)}"
+        elif milliseconds > args.budget_ms:
+            result = f"FAIL: over the {args.budget_ms:g} ms budget"
+        else:
+            result = "ok"
+        failed = failed or result != "ok"
+        shown = f"{milliseconds:.1f}" if milliseconds is not None else "-"
+        print(f"{name:<16} {scenario:<24} {shown:>10}  {result}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
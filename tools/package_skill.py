@@ -3,18 +3,62 @@
 Package a skill directory into a .skill archive for distribution.
 
 Usage:
-    python package_skill.py <skill_directory> --output <output_path>
+    python package_skill.py <skill_directory> --output <output_path> [--force] [--with-corpus]
+    python package_skill.py --all [--skills-dir skills] [--output-dir dist] [--force] [--with-corpus]
 
 Example:
     python package_skill.py skills/wordpress-handbook --output dist/wordpress-handbook.skill
+    python package_skill.py --all --output-dir dist
+
+Archives are reproducible: members are sorted by name and stored with a
+fixed timestamp (SOURCE_DATE_EPOCH, if set, else 1980-01-01) and fixed
+permissions, so the same inputs always produce the same bytes. Members are
+compressed in parallel. A digest of the inputs is kept in the archive
+comment, and an archive whose digest matches is left alone unless --force
+is given.
+
+A skill's prebuilt corpus (corpus.zip, written by `sync.py --bundle`) is
+only packaged with --with-corpus. It is stored uncompressed, like other
+already-compressed files, so the skill can read it in place from the
+archive without extracting it.
 """
 
+from __future__ import annotations
+
 import argparse
+import hashlib
 import os
+import struct
 import sys
+import time
 import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+# Bump when the archive layout changes, so existing archives are rebuilt.
+PACKAGE_FORMAT = 2
+COMPRESSION_LEVEL = 9
+COMMENT_PREFIX = b"wordpress-skills package sha256="
+
+# Directories and files that never belong in an archive.
+SKIP_DIRECTORIES = {"node_modules", "__pycache__"}
+SKIP_SUFFIXES = (".pyc", ".pyo")
+
+# The bundled corpus, packaged only on request.
+CORPUS_BUNDLE = "corpus.zip"
+
+# Already-compressed members, always stored so they can be read in place.
+STORED_SUFFIXES = (".zip", ".gz")
+
+# ZIP structures (APPNOTE.TXT 4.3.7, 4.3.12 and 4.3.16).
+LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+CENTRAL_HEADER = struct.Struct("<4s4B4HL2L5H2L")
+END_OF_CENTRAL_DIRECTORY = struct.Struct("<4s4H2LH")
+VERSION = 20  # 2.0: deflate
+UNIX = 3
+UTF8_NAMES = 0x800
+
 
 def validate_skill_directory(skill_dir: Path) -> bool:
     """Validate that the skill directory contains required files."""
@@ -25,11 +69,119 @@ def validate_skill_directory(skill_dir: Path) -> bool:
     return True
 
 
-def package_skill(skill_dir: Path, output_path: Path) -> bool:
+def _dos_timestamp() -> tuple[int, int]:
+    """Return the (time, date) stored for every member."""
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    moment = time.gmtime(max(int(epoch), 315532800)) if epoch and epoch.isdigit() else None
+    if moment is None:
+        return 0, (1 << 5) | 1  # 1980-01-01 00:00:00
+    return (
+        (moment.tm_hour << 11) | (moment.tm_min << 5) | (moment.tm_sec // 2),
+        ((moment.tm_year - 1980) << 9) | (moment.tm_mon << 5) | moment.tm_mday,
+    )
+
+
+def collect_files(
+    skill_dir: Path, output_path: Path | None = None, with_corpus: bool = False
+) -> list[tuple[str, Path]]:
+    """Return (archive name, path) for every file to package, sorted by name."""
+    files = []
+    for file_path in skill_dir.rglob('*'):
+        if not file_path.is_file() or file_path == output_path:
+            continue
+        relative = file_path.relative_to(skill_dir)
+        if SKIP_DIRECTORIES.intersection(relative.parts[:-1]) or file_path.suffix in SKIP_SUFFIXES:
+            continue
+        if relative.as_posix() == CORPUS_BUNDLE and not with_corpus:
+            continue
+        # The archive name is relative to skill_dir, so SKILL.md is at the root.
+        files.append((relative.as_posix(), file_path))
+    return sorted(files)
+
+
+def _read(file_path: Path) -> tuple[bytes, int]:
+    mode = 0o755 if os.access(file_path, os.X_OK) else 0o644
+    return file_path.read_bytes(), mode
+
+
+def _compress(name: str, data: bytes) -> tuple[int, bytes]:
+    """Return (compression method, bytes) for a member, storing it if deflate does not help."""
+    if name.endswith(STORED_SUFFIXES):
+        return zipfile.ZIP_STORED, data
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+    compressed = compressor.compress(data) + compressor.flush()
+    if len(compressed) < len(data):
+        return zipfile.ZIP_DEFLATED, compressed
+    return zipfile.ZIP_STORED, data
+
+
+def input_digest(members: list[tuple[str, bytes, int]]) -> str:
+    """Hash everything that determines the archive's bytes."""
+    digest = hashlib.sha256(f"{PACKAGE_FORMAT} {COMPRESSION_LEVEL} {_dos_timestamp()}".encode())
+    for name, data, mode in members:
+        digest.update(f"\0{name}\0{mode:o}\0".encode("utf-8"))
+        digest.update(hashlib.sha256(data).digest())
+    return digest.hexdigest()
+
+
+def _archive_digest(path: Path) -> str | None:
+    try:
+        with zipfile.ZipFile(path) as archive:
+            comment = archive.comment
+    except (OSError, zipfile.BadZipFile):
+        return None
+    if not comment.startswith(COMMENT_PREFIX):
+        return None
+    return comment[len(COMMENT_PREFIX):].decode("ascii", "replace")
+
+
+def write_archive(path: Path, members: list[tuple[str, bytes, int]], comment: bytes, executor) -> None:
+    """Write a ZIP archive of (name, data, mode) members, compressing them on `executor`."""
+    dos_time, dos_date = _dos_timestamp()
+    compressed = executor.map(_compress, [name for name, _, _ in members], [data for _, data, _ in members])
+    central = []
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            for (name, data, mode), (method, payload) in zip(members, compressed):
+                encoded = name.encode("utf-8")
+                flags = 0 if encoded.isascii() else UTF8_NAMES
+                crc = zlib.crc32(data)
+                offset = f.tell()
+                f.write(LOCAL_HEADER.pack(
+                    b"PK\x03\x04", VERSION, 0, flags, method, dos_time, dos_date,
+                    crc, len(payload), len(data), len(encoded), 0,
+                ))
+                f.write(encoded)
+                f.write(payload)
+                central.append(CENTRAL_HEADER.pack(
+                    b"PK\x01\x02", VERSION, UNIX, VERSION, 0, flags, method, dos_time, dos_date,
+                    crc, len(payload), len(data), len(encoded), 0, 0, 0, 0,
+                    (0o100000 | mode) << 16, offset,
+                ) + encoded)
+            directory_offset = f.tell()
+            for header in central:
+                f.write(header)
+            f.write(END_OF_CENTRAL_DIRECTORY.pack(
+                b"PK\x05\x06", 0, 0, len(central), len(central),
+                f.tell() - directory_offset, directory_offset, len(comment),
+            ))
+            f.write(comment)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def package_skill(
+    skill_dir: Path, output_path: Path, force: bool = False, executor=None, with_corpus: bool = False
+) -> bool:
     """
     Package a skill directory into a .skill archive.
 
     The archive structure places SKILL.md at the root level (not in a subdirectory).
+    An existing archive built from the same inputs is kept unless `force` is set.
+    The skill's corpus.zip is included only with `with_corpus`.
     """
     if not skill_dir.exists():
         print(f"ERROR: Skill directory not found: {skill_dir}", file=sys.stderr)
@@ -60,28 +212,47 @@ def package_skill(skill_dir: Path, output_path: Path) -> bool:
     # Ensure output directory exists
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # Create the zip archive
-    with zipfile.ZipFile(resolved_output_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for file_path in resolved_skill_dir.rglob('*'):
-            if file_path.is_file():
-                # Skip the output file itself
-                if file_path == resolved_output_path:
-                    continue
-
-                # Skip node_modules
-                if 'node_modules' in file_path.parts:
-                    continue
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor()
+    try:
+        files = collect_files(resolved_skill_dir, resolved_output_path, with_corpus)
+        members = [
+            (name, data, mode)
+            for (name, _), (data, mode) in zip(files, executor.map(_read, [path for _, path in files]))
+        ]
+        digest = input_digest(members)
+        if not force and _archive_digest(resolved_output_path) == digest:
+            print(f"Up to date: {output_path}")
+            return True
 
-                # Calculate the archive name (relative to skill_dir)
-                # This ensures SKILL.md is at the root of the archive
-                arcname = file_path.relative_to(resolved_skill_dir)
-                zipf.write(file_path, arcname)
-                print(f"  Added: {arcname}")
+        write_archive(resolved_output_path, members, COMMENT_PREFIX + digest.encode("ascii"), executor)
+    finally:
+        if own_executor:
+            executor.shutdown()
 
+    for name, _, _ in members:
+        print(f"  Added: {name}")
     print(f"Created: {output_path}")
     return True
 
 
+def package_all(skills_dir: Path, output_dir: Path, force: bool = False, with_corpus: bool = False) -> bool:
+    """Package every skill (a directory with a SKILL.md) under skills_dir into output_dir."""
+    skill_dirs = sorted(path for path in skills_dir.iterdir() if (path / "SKILL.md").is_file())
+    if not skill_dirs:
+        print(f"ERROR: No skills found in {skills_dir}", file=sys.stderr)
+        return False
+
+    success = True
+    with ThreadPoolExecutor() as executor:
+        for skill_dir in skill_dirs:
+            print(f"Packaging skill: {skill_dir.name}")
+            output_path = output_dir / f"{skill_dir.name}.skill"
+            success = package_skill(skill_dir, output_path, force, executor, with_corpus) and success
+    return success
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Package a skill directory into a .skill archive"
@@ -89,17 +260,52 @@ def main():
     parser.add_argument(
         "skill_directory",
         type=Path,
+        nargs="?",
         help="Path to the skill directory (e.g., skills/wordpress-handbook)"
     )
     parser.add_argument(
         "--output", "-o",
         type=Path,
-        required=True,
         help="Output path for the .skill archive (e.g., dist/wordpress-handbook.skill)"
     )
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Package every skill under --skills-dir into --output-dir"
+    )
+    parser.add_argument(
+        "--skills-dir",
+        type=Path,
+        default=Path("skills"),
+        help="Directory holding the skills, with --all (default: skills)"
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=Path("dist"),
+        help="Directory for the archives, with --all (default: dist)"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild archives even when they are up to date"
+    )
+    parser.add_argument(
+        "--with-corpus",
+        action="store_true",
+        help="Include the skill's prebuilt corpus (corpus.zip, from sync.py --bundle)"
+    )
 
     args = parser.parse_args()
 
+    if args.all:
+        if args.skill_directory or args.output:
+            parser.error("--all packages every skill; do not pass a skill directory or --output")
+        sys.exit(0 if package_all(args.skills_dir, args.output_dir, args.force, args.with_corpus) else 1)
+
+    if args.skill_directory is None or args.output is None:
+        parser.error("a skill directory and --output are required (or use --all)")
+
     # Resolve paths
     skill_dir = args.skill_directory.resolve()
     output_path = args.output.resolve()
@@ -110,7 +316,7 @@ def main():
 
     print(f"Packaging skill: {skill_dir.name}")
 
-    success = package_skill(skill_dir, output_path)
+    success = package_skill(skill_dir, output_path, args.force, with_corpus=args.with_corpus)
     sys.exit(0 if success else 1)
 
 
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the developer.wordpress.org REST API.
+
+Usage:
+    python wp_api_standin.py serve [--fixtures FILE] [--port N] [--latency MS]
+                                   [--jitter MS] [--error-rate R] [--drop-rate R]
+                                   [--max-rate RPS]
+    python wp_api_standin.py record --output FILE [--queries "q1,q2"] [--per-page N]
+    python wp_api_standin.py generate --output FILE [--documents N] [--seed N]
+
+`serve` replays a fixture file under /wp-json/wp/v2: the search endpoint,
+single documents (/{subtype}/{id}) and collections (/{subtype}?include=...,
+paged with X-WP-Total/X-WP-TotalPages). Every response can be delayed by a
+fixed latency plus random jitter, and a fraction of requests can fail with
+HTTP 500 or have their connection dropped. With --max-rate, requests beyond
+that many per second are answered with HTTP 429 and Retry-After, like a
+throttling server. The chosen port is printed as the first line of output,
+so `--port 0` picks a free one.
+
+`record` captures fixtures from the live API for a set of search queries;
+`generate` writes deterministic synthetic fixtures shaped like handbook
+pages. Without --fixtures, `serve` uses generated fixtures.
+
+Example:
+    python wp_api_standin.py serve --latency 40 --jitter 20 --error-rate 0.01
+"""
+
+import argparse
+import gzip
+import json
+import random
+import socket
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+API_PREFIX = "/wp-json/wp/v2"
+LIVE_API_BASE_URL = "https://developer.wordpress.org/wp-json/wp/v2"
+
+HANDBOOK_SUBTYPES = [
+    "plugin-handbook",
+    "theme-handbook",
+    "blocks-handbook",
+    "rest-api-handbook",
+    "apis-handbook",
+    "wpcs-handbook",
+    "adv-admin-handbook",
+]
+
+DEFAULT_QUERIES = [
+    "custom post type",
+    "register block",
+    "settings api",
+    "enqueue scripts",
+    "rest api authentication",
+    "template hierarchy",
+]
+
+DOCUMENT_FIELDS = "id,title,link,content,excerpt,modified_gmt"
+
+_WORDS = (
+    "the plugin hook filter action callback function returns value when WordPress "
+    "loads theme template data option block editor register post type query meta"
+).split()
+
+
+def generate_fixtures(documents: int = 120, seed: int = 1) -> dict:
+    """Return synthetic fixtures: handbook-like pages from a few to ~100 KB."""
+    rng = random.Random(seed)
+
+    def paragraph():
+        words = []
+        for _ in range(rng.randint(30, 70)):
+            word = rng.choice(_WORDS)
+            roll = rng.random()
+            if roll < 0.05:
+                words.append(f"<code>{word}()</code>")
+            elif roll < 0.08:
+                words.append(f'<a href="https://developer.wordpress.org/{word}/">{word}</a>')
+            elif roll < 0.1:
+                words.append(f"<strong>{word}</strong>")
+            elif roll < 0.12:
+                words.append("&amp;")
+            else:
+                words.append(word)
+        return "<p>" + " ".join(words) + ".</p>\n"
+
+    def section(number):
+        html = f'<h2 id="s{number}"><a href="#s{number}">Section {number}</a></h2>\n'
+        html += "".join(paragraph() for _ in range(rng.randint(1, 4)))
+        html += "<ul>\n" + "".join(
+            f"<li>{rng.choice(_WORDS)} &#8211; {rng.choice(_WORDS)}</li>\n" for _ in range(rng.randint(2, 6))
+        ) + "</ul>\n"
+        html += '<pre class="wp-block-code"><code lang="php" class="language-php">' + "\n".join(
+            f"add_filter( &#039;{rng.choice(_WORDS)}&#039;, &#039;callback_{line}&#039; );"
+            for line in range(rng.randint(3, 15))
+        ) + "</code></pre>\n"
+        return html
+
+    fixtures = {"search": [], "documents": {subtype: [] for subtype in HANDBOOK_SUBTYPES}}
+    for doc_id in range(1, documents + 1):
+        subtype = HANDBOOK_SUBTYPES[doc_id % len(HANDBOOK_SUBTYPES)]
+        # Mostly short pages with a long tail, like the real handbooks.
+        sections = min(60, int(rng.paretovariate(1.2)) + 1)
+        title = " ".join(rng.choice(_WORDS) for _ in range(3)).capitalize()
+        fixtures["documents"][subtype].append({
+            "id": doc_id,
+            "title": {"rendered": title},
+            "link": f"https://developer.wordpress.org/{subtype}/page-{doc_id}/",
+            "content": {"rendered": "".join(section(n) for n in range(sections))},
+            "excerpt": {"rendered": paragraph()},
+            "modified_gmt": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T00:00:00",
+        })
+    return fixtures
+
+
+def record_fixtures(queries, per_page: int = 10, api_base_url: str = LIVE_API_BASE_URL) -> dict:
+    """Capture search results and the documents they point to from the live API."""
+    def get(url):
+        request = urllib.request.Request(url, headers={"User-Agent": "wordpress-skills-benchmark"})
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return json.loads(response.read().decode("utf-8"))
+
+    fixtures = {"search": [], "documents": {}}
+    wanted = {}
+    for query in queries:
+        params = {
+            "search": query,
+            "per_page": str(per_page),
+            "_fields": "id,title,url,subtype",
+            "subtype": ",".join(HANDBOOK_SUBTYPES),
+        }
+        results = get(f"{api_base_url}/search?{urllib.parse.urlencode(params)}")
+        fixtures["search"].append({"query": query, "results": results})
+        for result in results:
+            wanted.setdefault(result["subtype"], set()).add(result["id"])
+        print(f"  Recorded search: {query} ({len(results)} results)", file=sys.stderr)
+
+    for subtype, doc_ids in wanted.items():
+        params = {
+            "include": ",".join(str(doc_id) for doc_id in sorted(doc_ids)),
+            "per_page": "100",
+            "_fields": DOCUMENT_FIELDS,
+        }
+        documents = get(f"{api_base_url}/{subtype}?{urllib.parse.urlencode(params)}")
+        fixtures["documents"][subtype] = documents
+        print(f"  Recorded {len(documents)} {subtype} documents", file=sys.stderr)
+    return fixtures
+
+
+class FixtureStore:
+    """Fixture lookups in the shapes the REST API returns."""
+
+    def __init__(self, fixtures: dict):
+        self.searches = {entry["query"].lower(): entry["results"] for entry in fixtures.get("search", [])}
+        self.documents = {
+            subtype: {document["id"]: document for document in documents}
+            for subtype, documents in fixtures.get("documents", {}).items()
+        }
+
+    def search(self, query: str, subtypes) -> list:
+        results = self.searches.get(query.lower())
+        if results is None:
+            # Unrecorded query: match titles, so any query returns something useful.
+            terms = query.lower().split()
+            results = [
+                {"id": doc_id, "title": document["title"]["rendered"],
+                 "url": document.get("link", ""), "subtype": subtype}
+                for subtype, documents in self.documents.items()
+                for doc_id, document in documents.items()
+                if any(term in document["title"]["rendered"].lower() for term in terms)
+            ]
+        return [result for result in results if not subtypes or result["subtype"] in subtypes]
+
+    def document(self, subtype: str, doc_id: int):
+        return self.documents.get(subtype, {}).get(doc_id)
+
+    def collection(self, subtype: str, include=None) -> list:
+        documents = self.documents.get(subtype, {})
+        if include is not None:
+            return [documents[doc_id] for doc_id in include if doc_id in documents]
+        return [documents[doc_id] for doc_id in sorted(documents)]
+
+
+def _fields(document: dict, fields) -> dict:
+    return {key: value for key, value in document.items() if key in fields} if fields else document
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Small responses must not wait on Nagle's algorithm, or every keep-alive
+    # request pays an extra delayed-ACK round trip.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        config = self.server.config
+        delay = config["latency"] + config["rng"].uniform(0, config["jitter"])
+        if delay:
+            time.sleep(delay / 1000)
+        roll = config["rng"].random()
+        if roll < config["drop_rate"]:
+            self.close_connection = True
+            self.connection.shutdown(socket.SHUT_RDWR)
+            return
+        if roll < config["drop_rate"] + config["error_rate"]:
+            self.send_json({"code": "injected_error", "message": "Injected server error"}, status=500)
+            return
+        if config["max_rate"] and not self.server.take_token():
+            self.send_json(
+                {"code": "too_many_requests", "message": "Too many requests"},
+                status=429, headers={"Retry-After": "1"},
+            )
+            return
+
+        parsed = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(parsed.query)
+        if not parsed.path.startswith(API_PREFIX + "/"):
+            self.send_json({"code": "rest_no_route", "message": "No route was found."}, status=404)
+            return
+        parts = parsed.path[len(API_PREFIX) + 1:].strip("/").split("/")
+        store = self.server.store
+        fields = query["_fields"][0].split(",") if "_fields" in query else None
+        per_page = int(query.get("per_page", ["10"])[0])
+        page = int(query.get("page", ["1"])[0])
+
+        if parts == ["search"]:
+            subtypes = query["subtype"][0].split(",") if "subtype" in query else None
+            results = store.search(query.get("search", [""])[0], subtypes)
+            self.send_page([_fields(result, fields) for result in results], per_page, page)
+        elif len(parts) == 2 and parts[1].isdigit():
+            document = store.document(parts[0], int(parts[1]))
+            if document is None:
+                self.send_json({"code": "rest_post_invalid_id", "message": "Invalid post ID."}, status=404)
+            else:
+                self.send_json(_fields(document, fields))
+        elif len(parts) == 1 and parts[0] in store.documents:
+            include = None
+            if "include" in query:
+                include = [int(value) for value in query["include"][0].split(",") if value.isdigit()]
+            documents = store.collection(parts[0], include)
+            self.send_page([_fields(document, fields) for document in documents], per_page, page)
+        else:
+            self.send_json({"code": "rest_no_route", "message": "No route was found."}, status=404)
+
+    def send_page(self, items: list, per_page: int, page: int):
+        total_pages = max(1, -(-len(items) // per_page))
+        if page > total_pages:
+            self.send_json(
+                {"code": "rest_post_invalid_page_number", "message": "The page number requested is larger than the number of pages available."},
+                status=400,
+            )
+            return
+        self.send_json(
+            items[(page - 1) * per_page:page * per_page],
+            headers={"X-WP-Total": str(len(items)), "X-WP-TotalPages": str(total_pages)},
+        )
+
+    def send_json(self, data, status: int = 200, headers=None):
+        body = json.dumps(data).encode("utf-8")
+        gzipped = "gzip" in self.headers.get("Accept-Encoding", "")
+        if gzipped:
+            body = gzip.compress(body, compresslevel=5)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StandinServer(ThreadingHTTPServer):
+    """A threading HTTP server with a token bucket for --max-rate."""
+
+    def take_token(self) -> bool:
+        """Return True if a request fits within max_rate requests per second."""
+        rate = self.config["max_rate"]
+        with self.bucket_lock:
+            now = time.monotonic()
+            tokens = min(rate, self.tokens + (now - self.updated) * rate)
+            self.updated = now
+            if tokens < 1:
+                self.tokens = tokens
+                return False
+            self.tokens = tokens - 1
+            return True
+
+
+def make_server(
+    fixtures: dict,
+    port: int = 0,
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+    drop_rate: float = 0.0,
+    seed: int = 1,
+    max_rate: float = 0.0,
+) -> ThreadingHTTPServer:
+    """Create a stand-in server on 127.0.0.1; latency and jitter are in milliseconds."""
+    server = StandinServer(("127.0.0.1", port), StandinHandler)
+    server.daemon_threads = True
+    server.store = FixtureStore(fixtures)
+    server.config = {
+        "latency": latency,
+        "jitter": jitter,
+        "error_rate": error_rate,
+        "drop_rate": drop_rate,
+        "max_rate": max_rate,
+        "rng": random.Random(seed),
+    }
+    server.bucket_lock = threading.Lock()
+    server.tokens = max_rate
+    server.updated = time.monotonic()
+    return server
+
+
+def load_fixtures(path) -> dict:
+    if path is None:
+        return generate_fixtures()
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Local stand-in for the developer.wordpress.org REST API"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="Serve fixtures over HTTP")
+    serve.add_argument("--fixtures", type=Path, help="Fixture file (default: generated fixtures)")
+    serve.add_argument("--port", type=int, default=0, help="Port to listen on (default: any free port)")
+    serve.add_argument("--latency", type=float, default=0.0, help="Added latency per request in ms")
+    serve.add_argument("--jitter", type=float, default=0.0, help="Random extra latency of up to this many ms")
+    serve.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    serve.add_argument("--drop-rate", type=float, default=0.0, help="Fraction of connections closed without a response")
+    serve.add_argument("--max-rate", type=float, default=0.0, help="Answer requests beyond this many per second with HTTP 429")
+    serve.add_argument("--seed", type=int, default=1, help="Seed for jitter and error injection")
+
+    record = commands.add_parser("record", help="Record fixtures from the live API")
+    record.add_argument("--output", "-o", type=Path, required=True, help="Fixture file to write")
+    record.add_argument("--queries", default=",".join(DEFAULT_QUERIES), help="Comma-separated search queries")
+    record.add_argument("--per-page", type=int, default=10, help="Search results per query")
+
+    generate = commands.add_parser("generate", help="Write synthetic fixtures")
+    generate.add_argument("--output", "-o", type=Path, required=True, help="Fixture file to write")
+    generate.add_argument("--documents", type=int, default=120, help="Number of documents")
+    generate.add_argument("--seed", type=int, default=1, help="Random seed")
+
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        server = make_server(
+            load_fixtures(args.fixtures), args.port, args.latency, args.jitter,
+            args.error_rate, args.drop_rate, args.seed, args.max_rate,
+        )
+        print(server.server_address[1], flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    if args.command == "record":
+        queries = [query.strip() for query in args.queries.split(",") if query.strip()]
+        fixtures = record_fixtures(queries, args.per_page)
+    else:
+        fixtures = generate_fixtures(args.documents, args.seed)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(fixtures, f)
+    print(f"Created: {args.output}")
+
+
+if __name__ == "__main__":
+    main()